@@ -0,0 +1,421 @@
+"""Asyncio entry point for the backend: the same Socket.IO events and REST API,
+served by python-socketio's AsyncServer under an ASGI server.
+
+    uvicorn asgi_app:app --port 5000     (or: python asgi_app.py)
+
+Connections are coroutines rather than OS threads. Last.fm and iTunes
+requests go through one pooled httpx.AsyncClient, and biometric pushes,
+recording and mood sampling run as asyncio tasks. Sessions, favorites, the
+track catalog and the caches are backend.py's own objects, and the REST
+routes are backend.py's Flask app, so both modes behave the same.
+"""
+import asyncio
+import random
+import time
+
+import httpx
+import socketio
+from asgiref.wsgi import WsgiToAsgi
+
+import backend
+from backend import (BIOMETRIC_MAX_RATE, BIOMETRIC_MIN_DELTA, EMIT_SECONDS, FIRST_SONG_SECONDS,
+                     HISTORY_INTERVAL, INITIAL_READING_DELAY, MIN_FIRST_BATCH, MUSIC_FETCH_DEADLINE,
+                     QUEUE_REFILL_AT, RECORD_RATE, TRACKS_PER_FETCH, UPSTREAM_ERRORS, UPSTREAM_SECONDS,
+                     FocusTags, clock, favorites, music_cache, playback, prefetcher, sessions, track_catalog)
+from jobs import AsyncSingleFlight
+from music_cache import normalize_query
+from remote_feed import RemoteFeed
+
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+music_flights = AsyncSingleFlight("music_async", timeout=MUSIC_FETCH_DEADLINE + 2)
+
+loop = None
+http = None
+background_tasks = set()
+
+
+def spawn(coro):
+    """Run coro as a task, holding a reference until it finishes."""
+    task = asyncio.ensure_future(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def timed_emit(event, data, to=None):
+    """sio.emit(), recording how long it took."""
+    with EMIT_SECONDS.labels(event=event).time():
+        await sio.emit(event, data, to=to)
+
+def emit_from_thread(event, *args, **kwargs):
+    """backend.server_emit for backend code on other threads (REST routes, the session reaper)."""
+    asyncio.run_coroutine_threadsafe(sio.emit(event, *args, **kwargs), loop)
+
+# Upstream
+
+async def fetch_tag_page(mood_tag, page, timeout=None):
+    """backend.fetch_tag_page over the async client."""
+    async def load():
+        with UPSTREAM_SECONDS.labels(api='lastfm').time():
+            response = await http.get(backend.lastfm_tag_url(mood_tag, page),
+                                      timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else min(5, timeout))
+        response.raise_for_status()
+        return backend.parse_tag_page(response.json())
+
+    return await music_cache.get_or_load_async(f"tag:{mood_tag}:{page}", load) or {'tracks': [], 'total_pages': 0}
+
+async def lookup_itunes(track_name, artist_name):
+    """backend.lookup_itunes over the async client."""
+    query = normalize_query(f"{track_name} {artist_name}")
+
+    async def load():
+        with UPSTREAM_SECONDS.labels(api='itunes').time():
+            response = await http.get(backend.itunes_search_url(query))
+        response.raise_for_status()
+        return backend.parse_itunes_result(response.json())
+
+    return await music_cache.get_or_load_async(f"itunes:{query}", load)
+
+async def resolve_track(track_data, mood_tag):
+    try:
+        result = await lookup_itunes(track_data['name'], track_data['artist'])
+    except Exception as e:
+        UPSTREAM_ERRORS.labels(api='itunes').inc()
+        print(f"iTunes API error for {track_data['name']}: {e}")
+        return None
+
+    return backend.playable_track(track_data, result, mood_tag) if result else None
+
+def fetch_tag_page_blocking(mood_tag, page, timeout=None):
+    """TrackCatalog.fetch_page; the catalog is only ever called off the loop (asyncio.to_thread)."""
+    future = asyncio.run_coroutine_threadsafe(fetch_tag_page(mood_tag, page, timeout), loop)
+    return future.result(timeout=10 if timeout is None else timeout)
+
+def warm_itunes_lookups(tracks):
+    """TrackCatalog.warm: resolve a page of tracks into the music cache on the loop, one at a time."""
+    for track_data in tracks:
+        future = asyncio.run_coroutine_threadsafe(lookup_itunes(track_data['name'], track_data['artist']), loop)
+        try:
+            future.result(timeout=10)
+        except Exception as e:
+            print(f"iTunes warm-up for {track_data['name']} failed: {e}")
+
+def prefetch_category(category):
+    """TrackPrefetcher.fetch, run from the prefetcher's refill thread."""
+    future = asyncio.run_coroutine_threadsafe(stream_music_for_mood(random.choice(FocusTags[category])), loop)
+    return future.result(timeout=MUSIC_FETCH_DEADLINE + 2)
+
+async def stream_music_for_mood(mood_tag, on_tracks=None, min_tracks=MIN_FIRST_BATCH, deadline=MUSIC_FETCH_DEADLINE):
+    """backend.stream_music_for_mood with the iTunes lookups as concurrent tasks; on_tracks is awaited."""
+    deadline_at = time.monotonic() + deadline
+    try:
+        candidates = await asyncio.to_thread(track_catalog.next_candidates, mood_tag, TRACKS_PER_FETCH, deadline_at)
+    except Exception as e:
+        UPSTREAM_ERRORS.labels(api='lastfm').inc()
+        print(f"Music fetch error: {e}")
+        return []
+
+    lookups = [asyncio.ensure_future(resolve_track(track_data, mood_tag)) for track_data in candidates]
+
+    tracks = []
+    batch = []
+    first = True
+    try:
+        for lookup in asyncio.as_completed(lookups, timeout=max(0, deadline_at - time.monotonic())):
+            track = await lookup
+            if not track:
+                continue
+            tracks.append(track)
+            batch.append(track)
+            if on_tracks and (not first or len(batch) >= min_tracks):
+                await on_tracks(batch, first)
+                batch = []
+                first = False
+    except asyncio.TimeoutError:
+        print(f"⏱ Music fetch for {mood_tag} hit the {deadline}s deadline with {len(tracks)} tracks")
+        for lookup in lookups:
+            lookup.cancel()
+
+    if on_tracks and batch:
+        await on_tracks(batch, first)
+    return tracks
+
+async def deliver_music(mood_category, mood_tag, send_tracks, session_id=None):
+    """backend.deliver_music for an async send_tracks."""
+    sent = []
+
+    async def send_unseen(batch, first):
+        fresh = track_catalog.filter_unseen(session_id, batch)
+        if fresh:
+            await send_tracks(fresh, not sent)
+            sent.extend(fresh)
+
+    exclude = (lambda track: track_catalog.has_seen(session_id, track)) if session_id else None
+    tracks = prefetcher.take(mood_category, TRACKS_PER_FETCH, exclude=exclude)
+    if tracks:
+        await send_unseen(tracks, True)
+        return sent
+    try:
+        await music_flights.do(mood_category,
+                               lambda publish: stream_music_for_mood(mood_tag, publish),
+                               listener=send_unseen)
+    except TimeoutError as e:
+        print(f"⏱ {e}")
+    return sent
+
+# Music jobs, as tasks
+
+def music_sender(sid, mood_category, mood_tag=None, first_extra=None, auto=False, on_first=None):
+    """send_tracks for deliver_music: music_update with the first batch (if mood_tag), then more_music_loaded."""
+    async def send_tracks(batch, first):
+        if first and mood_tag:
+            await timed_emit('music_update', {
+                'mood': mood_category,
+                'mood_tag': mood_tag,
+                'tracks': batch,
+                **(first_extra or {})
+            }, to=sid)
+            if on_first:
+                on_first()
+        else:
+            payload = {'mood': mood_category, 'tracks': batch}
+            if auto:
+                payload['auto'] = True
+            await timed_emit('more_music_loaded', payload, to=sid)
+    return send_tracks
+
+async def initial_music(sid, started_at):
+    """backend.initial_music_job: the first mood once some biometrics are in."""
+    await asyncio.sleep(INITIAL_READING_DELAY / clock.speed)
+    session = sessions.get(sid)
+    if session is None or not session.monitoring:
+        return
+
+    mood_category, mood_tag = backend.determine_mood_from_average(session.stats) if len(session.stats) else ("deep_focus", random.choice(FocusTags["deep_focus"]))
+    session.mood = mood_category
+    send_tracks = music_sender(sid, mood_category, mood_tag,
+                               on_first=lambda: FIRST_SONG_SECONDS.observe(time.perf_counter() - started_at))
+    await deliver_music(mood_category, mood_tag, send_tracks, session_id=sid)
+    session.last_music_change = clock.time()
+
+async def more_music(sid, mood_category, auto=False):
+    """backend.more_music_job."""
+    mood_tag = random.choice(FocusTags.get(mood_category, FocusTags['deep_focus']))
+    tracks = await deliver_music(mood_category, mood_tag, music_sender(sid, mood_category, auto=auto), session_id=sid)
+    if not tracks:
+        print(f"❌ No additional tracks found for {mood_category}")
+
+async def next_song(sid, queue_length):
+    """backend.next_song_job: re-evaluate the mood just before sid's song ends."""
+    session = sessions.get(sid)
+    if session is None or not session.monitoring:
+        return
+    mood_category, mood_tag = backend.determine_mood_from_average(session.stats)
+
+    if mood_category != session.mood:
+        print(f"🎵 Song ending. Switching to {mood_category} based on average biometrics")
+        send_tracks = music_sender(sid, mood_category, mood_tag, first_extra={'upcoming': True})
+        if not await deliver_music(mood_category, mood_tag, send_tracks, session_id=sid):
+            return
+        stats = session.stats.snapshot()
+        await timed_emit('mood_change', {
+            'mood': mood_category,
+            'reason': f"Avg HR: {stats['hr']['mean']:.1f} BPM, Avg Blinks: {stats['blinks']['mean']:.1f}/min"
+        }, to=sid)
+        session.mood = mood_category
+    elif queue_length <= QUEUE_REFILL_AT:
+        await more_music(sid, mood_category, auto=True)
+
+    session.stats.clear()
+
+# Biometrics, as tasks
+
+def metrics_moved(last, metrics):
+    """Same rule as metric_subscription.MetricSubscription at BIOMETRIC_MIN_DELTA"""
+    return (last is None
+            or metrics['blink_count'] != last['blink_count']
+            or abs(metrics['heart_rate'] - last['heart_rate']) >= BIOMETRIC_MIN_DELTA
+            or abs(metrics['blinks_per_minute'] - last['blinks_per_minute']) >= BIOMETRIC_MIN_DELTA)
+
+def read_metrics(monitor):
+    hr, blinks_per_min = monitor.get_metrics()
+    return {'heart_rate': hr, 'blinks_per_minute': blinks_per_min, 'blink_count': monitor.get_blink_count()}
+
+async def feed_session(session, monitor):
+    """Push biometric_update to one session's client and record its metrics whenever its monitor changes."""
+    changed = asyncio.Event()
+    notify = lambda *_: loop.call_soon_threadsafe(changed.set)
+    if isinstance(monitor, RemoteFeed):
+        # Pushed by this client's own biometric_sample: no thread needed
+        monitor.add_listener(notify)
+        unsubscribe = lambda: monitor.remove_listener(notify)
+    else:
+        # Camera and replay monitors run on threads anyway; one waiter thread bridges them
+        unsubscribe = monitor.subscribe(notify, min_delta=0, max_rate=RECORD_RATE).cancel
+
+    recorder = session.recorder
+    last_recorded = last_pushed = None
+    next_push = 0.0
+    changed.set()
+    try:
+        while session.monitoring and session.monitor is monitor:
+            try:
+                # The timeout only re-checks that monitoring is still on
+                await asyncio.wait_for(changed.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            changed.clear()
+            metrics = read_metrics(monitor)
+            if recorder and metrics != last_recorded:
+                recorder.append(metrics['heart_rate'], metrics['blinks_per_minute'], metrics['blink_count'],
+                                session.mood)
+                last_recorded = metrics
+            delay = next_push - time.monotonic()
+            if delay > 0:
+                # Rate limited: send whatever is newest once allowed (changes meanwhile are recorded next pass)
+                await asyncio.sleep(delay)
+                metrics = read_metrics(monitor)
+            if metrics_moved(last_pushed, metrics):
+                await timed_emit('biometric_update', backend.biometric_payload(session, metrics), to=session.sid)
+                last_pushed = metrics
+                next_push = time.monotonic() + 1.0 / BIOMETRIC_MAX_RATE
+    finally:
+        unsubscribe()
+
+async def sample_sessions():
+    """backend.biometric_sampling_loop as one task for every session."""
+    while True:
+        for session in sessions.monitoring():
+            try:
+                if backend.sample_session(session):
+                    spawn(next_song(session.sid, 0))
+            except Exception as e:
+                print(f"Error sampling session {session.sid}: {e}")
+        await asyncio.sleep(HISTORY_INTERVAL / clock.speed)
+
+# Socket.IO events
+
+async def open_session(sid):
+    """sessions.open off the loop: opening a new session can evict (and stop) another one."""
+    return await asyncio.to_thread(sessions.open, sid)
+
+@sio.event
+async def connect(sid, environ, auth=None):
+    print('Client connected')
+    await open_session(sid)
+    await timed_emit('connection_response', {'status': 'connected'}, to=sid)
+    # Reconnecting clients pass the favorites version they already have
+    await timed_emit(*backend.favorites_catch_up((auth or {}).get('favorites')), to=sid)
+
+@sio.event
+async def disconnect(sid, *args):
+    print('Client disconnected')
+    await asyncio.to_thread(sessions.close, sid)
+
+@sio.event
+async def start_monitoring(sid, data=None):
+    session = await open_session(sid)
+    if session.monitoring:
+        return
+    print("Starting biometric monitoring...")
+    started_at = time.perf_counter()
+
+    # Building a camera monitor loads the vision models; keep that off the loop
+    monitor = await asyncio.to_thread(backend.create_bio_monitor, (data or {}).get('source'))
+    await asyncio.to_thread(session.start_monitoring, monitor)
+    session.last_music_change = None
+    session.recorder = await asyncio.to_thread(backend.open_recorder, session)
+    spawn(feed_session(session, monitor))
+
+    await timed_emit('monitoring_status', {'status': 'started'}, to=sid)
+    spawn(initial_music(sid, started_at))
+
+@sio.event
+async def stop_monitoring(sid):
+    session = await open_session(sid)
+    await asyncio.to_thread(session.stop_monitoring)
+    prefetcher.clear_trend(sid)
+    await timed_emit('monitoring_status', {'status': 'stopped'}, to=sid)
+
+@sio.event
+async def biometric_sample(sid, data):
+    session = await open_session(sid)
+    if isinstance(session.monitor, RemoteFeed):
+        session.monitor.push(data.get('heart_rate', 0.0), data.get('blinks_per_minute', 0.0),
+                             data.get('blink_count'))
+
+@sio.event
+async def request_more_music(sid, data):
+    mood_category = data.get('mood', (await open_session(sid)).mood or 'deep_focus')
+    print(f"📥 Fetching more songs for {mood_category} mood...")
+    spawn(more_music(sid, mood_category))
+
+@sio.event
+async def queue_low(sid, data):
+    mood_category = data.get('mood', (await open_session(sid)).mood or 'deep_focus')
+    print(f"⚠️ Queue running low! Auto-fetching more {mood_category} songs...")
+    spawn(more_music(sid, mood_category, auto=True))
+
+@sio.on('playback')
+async def handle_playback(sid, data):
+    await open_session(sid)
+    track = (data.get('name'), data.get('artist')) if data.get('name') else None
+    playback.update(sid, data.get('action'), position=data.get('position') or 0.0,
+                    duration=data.get('duration'), track=track, queue_length=data.get('queue_length'))
+
+@sio.event
+async def song_ended(sid, data=None):
+    await open_session(sid)
+    playback.ended(sid, (data or {}).get('queue_length'))
+
+@sio.event
+async def add_to_favorites(sid, track):
+    await open_session(sid)
+    change = favorites.add(track)
+    if change:
+        backend.broadcast_favorites_change(change)
+        await timed_emit('favorite_added', {'success': True}, to=sid)
+    else:
+        await timed_emit('favorite_added', {'success': False, 'message': 'Already in favorites'}, to=sid)
+
+@sio.event
+async def remove_from_favorites(sid, data):
+    await open_session(sid)
+    change = favorites.remove(data.get('name'), data.get('artist'))
+    if change:
+        backend.broadcast_favorites_change(change)
+    await timed_emit('favorite_removed', {'success': True}, to=sid)
+
+@sio.event
+async def sync_favorites(sid, data):
+    await timed_emit(*backend.favorites_catch_up(data), to=sid)
+
+async def startup():
+    """Point backend's shared objects at this loop, then start the background work."""
+    global loop, http
+    loop = asyncio.get_running_loop()
+    http = httpx.AsyncClient(timeout=5, limits=httpx.Limits(max_connections=32, max_keepalive_connections=16))
+
+    backend.server_emit = emit_from_thread
+    track_catalog.fetch_page = fetch_tag_page_blocking
+    track_catalog.warm = warm_itunes_lookups
+    prefetcher.fetch = prefetch_category
+    playback.on_due = lambda sid, queue_length: loop.call_soon_threadsafe(
+        lambda: spawn(next_song(sid, queue_length)))
+
+    prefetcher.start()
+    backend.warm_up_vision()
+    spawn(sample_sessions())
+    print("✅ Async backend running")
+
+async def shutdown():
+    for session in sessions.sessions():
+        await asyncio.to_thread(sessions.close, session.sid)
+    await asyncio.to_thread(backend.monitor_pool.close)
+    await http.aclose()
+
+app = socketio.ASGIApp(sio, other_asgi_app=WsgiToAsgi(backend.app), on_startup=startup, on_shutdown=shutdown)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host=backend.HOST, port=backend.PORT, log_level='warning', timeout_graceful_shutdown=2)
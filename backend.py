@@ -1,15 +1,31 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import random
 import os
+import resource
+import signal
+import sys
 from dotenv import load_dotenv
-from biometrics import BiometricsMonitor
+from biometrics_process import ProcessBiometricsMonitor
 import threading
-from collections import deque
-import json
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from telemetry import REGISTRY
+from music_cache import TieredCache, normalize_query
+from prefetch import TrackPrefetcher
+from jobs import JobExecutor, SingleFlight
+from track_catalog import TrackCatalog
+from favorites_store import FavoritesStore
+from session_store import DOWNSAMPLERS, SERIES, SessionReader, SessionRecorder, list_sessions, prune_sessions
+from replay import Clock, ReplayMonitor, ScaledClock
+from playback import PlaybackTracker
+from session_manager import SessionManager
+from remote_feed import RemoteFeed
+from monitor_pool import MonitorPool
+from message_bus import BusClientManager, open_bus
 
 # Load environment variables
 load_dotenv()
@@ -17,11 +33,66 @@ api_key = os.getenv("LASTFM_API_KEY")
 
 app = Flask(__name__)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# Several workers behind a sticky load balancer share emits and favorites through this bus:
+# "local" (one process) or tcp://host:port of a hub started with `python message_bus.py`
+MESSAGE_BUS = os.getenv("MESSAGE_BUS", "")
+bus = open_bus(MESSAGE_BUS) if MESSAGE_BUS else None
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading',
+                    client_manager=BusClientManager(bus) if bus else None)
 
 # Constants
 LASTFM_API_KEY = api_key
 SONG_DURATION = 30  # iTunes preview duration in seconds
+# "thread": run BiometricsMonitor in this process
+# "process": run it in a worker process and read metrics over shared memory
+BIOMETRICS_WORKER = os.getenv("BIOMETRICS_WORKER", "thread")
+# Webcam index, or a video file, image directory or "synthetic[:bpm]" for offline runs
+BIOMETRICS_SOURCE = os.getenv("BIOMETRICS_SOURCE", "0")
+# Load mediapipe and run the face models once on a background thread at boot, so the
+# first start_monitoring doesn't wait for them; set to 0 on nodes that never open a camera
+BIOMETRICS_WARMUP = os.getenv("BIOMETRICS_WARMUP", "1") == "1"
+# Upstream APIs; point these at mock_upstream.py to run without network access
+LASTFM_API_URL = os.getenv("LASTFM_API_URL", "https://ws.audioscrobbler.com/2.0/")
+ITUNES_API_URL = os.getenv("ITUNES_API_URL", "https://itunes.apple.com/search")
+# Last.fm tag results and iTunes lookups, cached in memory and on disk
+MUSIC_CACHE_PATH = os.getenv("MUSIC_CACHE_PATH", "music_cache.db")
+TRACKS_PER_FETCH = 6
+LASTFM_PAGE_SIZE = 30
+LASTFM_MAX_PAGES = 10  # the catalog cursor wraps back to page 1 after this
+MIN_FIRST_BATCH = 2  # tracks needed before the first batch is sent
+MUSIC_FETCH_DEADLINE = 8.0  # seconds for a whole mood fetch, Last.fm + iTunes
+TREND_READINGS = 3  # EWMA span (in readings) used to guess the next mood for prefetching
+HISTORY_READINGS = 10  # readings averaged for each mood decision
+INITIAL_READING_DELAY = 2.0  # seconds of biometrics to collect before the first song
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "5000"))
+# biometric_update is pushed when HR or blinks/min move this much (or a blink happens)...
+BIOMETRIC_MIN_DELTA = 0.5
+# ...but no more than this many times per second
+BIOMETRIC_MAX_RATE = 4.0
+HISTORY_INTERVAL = 2  # seconds between readings kept for mood averaging
+# Re-evaluate the mood this long before the client's song really ends, so the next tracks are queued in time
+NEXT_SONG_LEAD = 5.0
+QUEUE_REFILL_AT = 2  # also top the queue up when it is this short at a song boundary
+# Every metric change is recorded to disk here, up to RECORD_RATE samples/sec.
+# RECORD_SESSIONS: "camera" (feeds measured by this server), "all" (client-pushed too) or "off";
+# only the newest MAX_RECORDINGS are kept
+SESSIONS_DIR = os.getenv("SESSIONS_DIR", "sessions")
+RECORD_RATE = 30.0
+RECORD_SESSIONS = os.getenv("RECORD_SESSIONS", "camera")
+MAX_RECORDINGS = int(os.getenv("MAX_RECORDINGS", "50"))
+# Replay a recorded session (an id under SESSIONS_DIR, or a path) instead of the camera,
+# with song timing and sampling on a virtual clock running REPLAY_SPEED times faster
+BIOMETRICS_REPLAY = os.getenv("BIOMETRICS_REPLAY")
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "1"))
+# Listener sessions with no client events for this long are closed, oldest first beyond MAX_SESSIONS
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "600"))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "500"))
+# A stopped camera monitor is paused and kept this long for the next start_monitoring
+# (0 tears it down at once); MONITOR_KEEP_CAMERA=1 also leaves the webcam on at a low rate
+MONITOR_KEEP_WARM = float(os.getenv("MONITOR_KEEP_WARM", "300"))
+MONITOR_KEEP_CAMERA = os.getenv("MONITOR_KEEP_CAMERA", "0") == "1"
 
 FocusTags = {
     "low_energy": ["upbeat", "electro", "motivation", "energetic", "dance"],
@@ -29,316 +100,737 @@ FocusTags = {
     "high_stress": ["chillout", "relax", "calm"],
 }
 
+# Telemetry
+UPSTREAM_SECONDS = REGISTRY.histogram('upstream_request_seconds', 'Last.fm / iTunes request latency')
+UPSTREAM_ERRORS = REGISTRY.counter('upstream_errors_total', 'Failed Last.fm / iTunes requests')
+EMIT_SECONDS = REGISTRY.histogram('socket_emit_seconds', 'Time to serialize and send a Socket.IO event')
+FIRST_SONG_SECONDS = REGISTRY.histogram(
+    'time_to_first_song_seconds', 'start_monitoring to first music_update').labels()
+REGISTRY.gauge('process_cpu_seconds', 'CPU time used by the backend process', fn=time.process_time)
+REGISTRY.gauge('process_threads', 'Live threads in the backend process', fn=threading.active_count)
+REGISTRY.gauge('process_peak_rss_bytes', 'Peak resident memory of the backend process',
+               fn=lambda: resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
 # Global state
-bio_monitor = None
-monitoring_active = False
-current_mood = None
-biometric_history = deque(maxlen=10)  # Store last 10 readings for averaging
-favorites_file = "favorites.json"
-
-# Load favorites from file
-def load_favorites():
-    try:
-        if os.path.exists(favorites_file):
-            with open(favorites_file, 'r') as f:
-                return json.load(f)
-        return []
-    except:
-        return []
+# Per-client monitor, readings and mood live in each session; see end_session for teardown.
+# Camera monitors come from and go back to the pool, so stop/start does not rebuild them
+monitor_pool = MonitorPool(lambda: build_camera_monitor(), keep_warm=MONITOR_KEEP_WARM)
+sessions = SessionManager(idle_timeout=SESSION_IDLE_TIMEOUT, max_sessions=MAX_SESSIONS,
+                          on_close=lambda session, reason: end_session(session, reason),
+                          history_readings=HISTORY_READINGS, ewma_span=TREND_READINGS,
+                          release_monitor=monitor_pool.release)
+sampler_thread = None
+BOOTED_AT = time.time()
+# Background load of the face models: cold, warming, ready or error
+vision = {'state': 'cold', 'seconds': None}
+# Drives song timing and history sampling; virtual when replaying
+clock = ScaledClock(REPLAY_SPEED) if BIOMETRICS_REPLAY else Clock()
+favorites_db = os.getenv("FAVORITES_DB", "favorites.db")
+favorites_file = os.getenv("FAVORITES_FILE", "favorites.json")  # legacy list, imported once into the db
+
+# With a bus, every worker reads and writes the same database and learns of other workers' writes
+favorites = FavoritesStore(favorites_db, legacy_json=favorites_file, shared=bus is not None)
+if bus:
+    bus.subscribe('favorites', lambda message: favorites.refresh())
+music_cache = TieredCache(MUSIC_CACHE_PATH)
+
+# Keep-alive connections shared by all upstream calls, and a pool for fan-out
+http = requests.Session()
+http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+http.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+music_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="music")
+
+def timed_emit(event, *args, **kwargs):
+    """emit() from inside a Socket.IO handler, recording how long it took."""
+    with EMIT_SECONDS.labels(event=event).time():
+        emit(event, *args, **kwargs)
+
+def timed_server_emit(event, *args, **kwargs):
+    """socketio.emit() for code running outside a handler, recording how long it took."""
+    with EMIT_SECONDS.labels(event=event).time():
+        server_emit(event, *args, **kwargs)
+
+# Where timed_server_emit sends; asgi_app.py points this at its AsyncServer
+server_emit = socketio.emit
+
+def pipeline_stat(key):
+    """One BiometricsMonitor pipeline counter summed over sessions (averaged for rates; 0 when idle)"""
+    values = [monitor.get_pipeline_stats().get(key, 0)
+              for monitor in (session.monitor for session in sessions.monitoring())
+              if hasattr(monitor, 'get_pipeline_stats')]
+    if not values:
+        return 0
+    return sum(values) / len(values) if key in ('effective_fps', 'rppg_sample_rate', 'latency_ms') else sum(values)
+
+for _stat in ('frames_captured', 'frames_inferred', 'frames_aggregated', 'stale_frames_dropped',
+              'results_dropped', 'capture_overwritten', 'effective_fps', 'rppg_sample_rate', 'latency_ms'):
+    REGISTRY.gauge('biometrics_pipeline', 'BiometricsMonitor pipeline counters',
+                   fn=lambda key=_stat: pipeline_stat(key), stat=_stat)
+
+def create_bio_monitor(source=None):
+    """Build the biometrics monitor for the configured worker mode and source.
+    
+    source='remote' gives a RemoteFeed the client pushes its own metrics into.
+    """
+    if source == 'remote':
+        return RemoteFeed()
+    if BIOMETRICS_REPLAY:
+        path = BIOMETRICS_REPLAY if os.path.isdir(BIOMETRICS_REPLAY) else os.path.join(SESSIONS_DIR, BIOMETRICS_REPLAY)
+        return ReplayMonitor(path, clock=clock)
+    if BIOMETRICS_WORKER == "process":
+        return ProcessBiometricsMonitor(show_ui=False, **camera_monitor_kwargs())
+    return monitor_pool.acquire()
+
+def camera_monitor_kwargs():
+    """BiometricsMonitor arguments for the configured BIOMETRICS_SOURCE"""
+    # The vision stack (cv2, mediapipe) loads on first use, not when the server starts
+    from frame_sources import open_frame_source
+
+    if BIOMETRICS_SOURCE.isdigit():
+        return {'camera_index': int(BIOMETRICS_SOURCE)}
+    source_kwargs = {'duration': None} if BIOMETRICS_SOURCE.startswith('synthetic') else {'loop': True}
+    return {'source': open_frame_source(BIOMETRICS_SOURCE, realtime=True, **source_kwargs)}
+
+def build_camera_monitor():
+    """A new in-process BiometricsMonitor; monitor_pool calls this when it has none idle"""
+    from biometrics import BiometricsMonitor
+
+    return BiometricsMonitor(show_ui=False, keep_camera_open=MONITOR_KEEP_CAMERA, **camera_monitor_kwargs())
+
+def warm_up_vision():
+    """Load the vision stack and prebuild a pooled monitor on a background thread (not when replaying)"""
+    if not BIOMETRICS_WARMUP or BIOMETRICS_REPLAY or vision['state'] != 'cold':
+        return
+    vision['state'] = 'warming'
 
-# Save favorites to file
-def save_favorites(favorites):
+    def run():
+        try:
+            from biometrics import warm_up
+            started_at = time.perf_counter()
+            # In-process monitors are warmed through the pooled monitor's own graphs;
+            # worker processes (or no pooling) just get the models loaded once
+            if BIOMETRICS_WORKER == "process" or not monitor_pool.prewarm(warm_up):
+                warm_up()
+            vision['seconds'] = round(time.perf_counter() - started_at, 3)
+            vision['state'] = 'ready'
+            print(f"👁️ Face models loaded in {vision['seconds']:.2f}s")
+        except Exception as e:
+            vision['state'] = 'error'
+            print(f"Error warming up face models: {e}")
+
+    threading.Thread(target=run, daemon=True, name="vision-warmup").start()
+
+def lastfm_tag_url(mood_tag, page):
+    return f"{LASTFM_API_URL}?method=tag.gettoptracks&tag={mood_tag}&api_key={LASTFM_API_KEY}&format=json&limit={LASTFM_PAGE_SIZE}&page={page}"
+
+def parse_tag_page(lfm_data):
+    """{'tracks': [{'name', 'artist'}], 'total_pages': n} from a tag.gettoptracks response, or None.
+
+    Raises ValueError on a Last.fm error reply, so it is never cached as "no results".
+    """
+    if 'error' in lfm_data:
+        raise ValueError(f"Last.fm error {lfm_data['error']}: {lfm_data.get('message', '')}")
+    if 'tracks' not in lfm_data or 'track' not in lfm_data['tracks']:
+        return None
+    
+    return {
+        'tracks': [{
+            'name': track_data.get('name', ''),
+            'artist': track_data.get('artist', {}).get('name', '')
+        } for track_data in lfm_data['tracks']['track']],
+        'total_pages': int(lfm_data['tracks'].get('@attr', {}).get('totalPages', 0) or 0)
+    }
+
+def itunes_search_url(query):
+    return f"{ITUNES_API_URL}?term={query}&entity=song&limit=1"
+
+def parse_itunes_result(itunes_data):
+    """Preview URL and artwork from an iTunes search response, or None"""
+    if not itunes_data.get('results'):
+        return None
+    result = itunes_data['results'][0]
+    return {
+        'previewUrl': result.get('previewUrl', ''),
+        'artwork': result.get('artworkUrl100', '').replace('100x100', '600x600')
+    }
+
+def playable_track(track_data, result, mood_tag):
+    return {
+        'name': track_data['name'],
+        'artist': track_data['artist'],
+        'previewUrl': result['previewUrl'],
+        'artwork': result['artwork'],
+        'duration': 30,
+        'mood': mood_tag
+    }
+
+def fetch_tag_page(mood_tag, page, timeout=None):
+    """One page of Last.fm top tracks for a tag (cached per tag and page).
+    
+    Returns {'tracks': [{'name', 'artist'}], 'total_pages': n}. A timeout
+    shorter than the usual 5 seconds caps the request (a caller's deadline).
+    """
+    def load():
+        with UPSTREAM_SECONDS.labels(api='lastfm').time():
+            lfm_response = http.get(lastfm_tag_url(mood_tag, page), timeout=5 if timeout is None else min(5, timeout))
+        lfm_response.raise_for_status()
+        return parse_tag_page(lfm_response.json())
+    
+    return music_cache.get_or_load(f"tag:{mood_tag}:{page}", load) or {'tracks': [], 'total_pages': 0}
+
+def lookup_itunes(track_name, artist_name):
+    """iTunes preview URL and artwork for a track, or None (cached per normalized query)."""
+    query = normalize_query(f"{track_name} {artist_name}")
+    
+    def load():
+        with UPSTREAM_SECONDS.labels(api='itunes').time():
+            itunes_response = http.get(itunes_search_url(query), timeout=5)
+        itunes_response.raise_for_status()
+        return parse_itunes_result(itunes_response.json())
+    
+    return music_cache.get_or_load(f"itunes:{query}", load)
+
+def resolve_track(track_data, mood_tag):
+    """Playable track dict for a Last.fm track, or None if iTunes has no preview."""
     try:
-        with open(favorites_file, 'w') as f:
-            json.dump(favorites, f, indent=2)
+        result = lookup_itunes(track_data['name'], track_data['artist'])
     except Exception as e:
-        print(f"Error saving favorites: {e}")
+        UPSTREAM_ERRORS.labels(api='itunes').inc()
+        print(f"iTunes API error for {track_data['name']}: {e}")
+        return None
+    
+    return playable_track(track_data, result, mood_tag) if result else None
 
-favorites = load_favorites()
+def warm_itunes_lookups(tracks):
+    """TrackCatalog.warm: resolve a page of Last.fm tracks into the music cache, one at a time.
 
-def get_music_for_mood(mood_tag):
-    """Fetch multiple tracks for a given mood tag."""
-    try:
-        lfm_url = f"https://ws.audioscrobbler.com/2.0/?method=tag.gettoptracks&tag={mood_tag}&api_key={LASTFM_API_KEY}&format=json&limit=10"
-        lfm_response = requests.get(lfm_url, timeout=5)
-        lfm_data = lfm_response.json()
-        
-        if 'tracks' not in lfm_data or 'track' not in lfm_data['tracks']:
-            return []
-        
-        tracks = []
-        for track_data in lfm_data['tracks']['track'][:6]:
-            track_name = track_data.get('name', '')
-            artist_name = track_data.get('artist', {}).get('name', '')
-            
-            query = f"{track_name} {artist_name}"
-            itunes_url = f"https://itunes.apple.com/search?term={query}&entity=song&limit=1"
-            
-            try:
-                itunes_response = requests.get(itunes_url, timeout=5)
-                itunes_data = itunes_response.json()
-                
-                if itunes_data.get('results'):
-                    result = itunes_data['results'][0]
-                    tracks.append({
-                        'name': track_name,
-                        'artist': artist_name,
-                        'previewUrl': result.get('previewUrl', ''),
-                        'artwork': result.get('artworkUrl100', '').replace('100x100', '600x600'),
-                        'duration': 30,
-                        'mood': mood_tag
-                    })
-            except Exception as e:
-                print(f"iTunes API error for {track_name}: {e}")
-                continue
-        
-        return tracks
+    Runs on the catalog's own warm-up worker, never on music_executor, so it
+    cannot queue ahead of the resolve_track futures a listener is waiting on.
+    """
+    for track_data in tracks:
+        try:
+            lookup_itunes(track_data['name'], track_data['artist'])
+        except Exception as e:
+            print(f"iTunes warm-up for {track_data['name']} failed: {e}")
+
+# Pagination cursor per tag, so refills walk Last.fm pages instead of the same top 6
+track_catalog = TrackCatalog(fetch_tag_page, warm=warm_itunes_lookups, max_pages=LASTFM_MAX_PAGES)
+
+def stream_music_for_mood(mood_tag, on_tracks=None, min_tracks=MIN_FIRST_BATCH, deadline=MUSIC_FETCH_DEADLINE):
+    """Fetch tracks for a mood tag, resolving iTunes lookups concurrently.
     
+    on_tracks(tracks, first) is called from this thread as results arrive:
+    once with the first min_tracks tracks, then once per later track.
+    The deadline covers the Last.fm pages as well as the lookups; lookups
+    still running at the deadline are abandoned. Returns every resolved
+    track.
+    """
+    deadline_at = time.monotonic() + deadline
+    try:
+        candidates = track_catalog.next_candidates(mood_tag, TRACKS_PER_FETCH, deadline_at)
     except Exception as e:
+        UPSTREAM_ERRORS.labels(api='lastfm').inc()
         print(f"Music fetch error: {e}")
         return []
+    
+    futures = [music_executor.submit(resolve_track, track_data, mood_tag)
+               for track_data in candidates]
+    
+    tracks = []
+    batch = []
+    first = True
+    try:
+        for future in as_completed(futures, timeout=max(0, deadline_at - time.monotonic())):
+            track = future.result()
+            if not track:
+                continue
+            tracks.append(track)
+            batch.append(track)
+            if on_tracks and (not first or len(batch) >= min_tracks):
+                on_tracks(batch, first)
+                batch = []
+                first = False
+    except FuturesTimeout:
+        print(f"⏱ Music fetch for {mood_tag} hit the {deadline}s deadline with {len(tracks)} tracks")
+        for future in futures:
+            future.cancel()
+    
+    if on_tracks and batch:
+        on_tracks(batch, first)
+    return tracks
+
+def get_music_for_mood(mood_tag):
+    """Fetch multiple tracks for a given mood tag."""
+    return stream_music_for_mood(mood_tag)
+
+# Slow work started by socket handlers runs here; results go back with to=sid
+jobs = JobExecutor(workers=JOB_WORKERS)
 
-def determine_mood_from_average():
+# Song boundaries from the clients' own play/pause/seek/skip reports
+playback = PlaybackTracker(lambda sid, queue_length: jobs.submit(sid, next_song_job, queue_length),
+                           lead=NEXT_SONG_LEAD)
+
+# One upstream fetch per category at a time, shared by every waiting session
+music_flights = SingleFlight("music", timeout=MUSIC_FETCH_DEADLINE + 2)
+
+# Ready-to-play tracks per category so mood switches skip the network
+prefetcher = TrackPrefetcher(
+    list(FocusTags),
+    lambda category: get_music_for_mood(random.choice(FocusTags[category]))
+)
+
+def determine_mood_from_average(biometric_stats):
     """Determine mood based on average of recent biometric readings."""
-    if not biometric_history:
+    stats = biometric_stats.snapshot()
+    if not stats['count']:
         return "deep_focus", random.choice(FocusTags["deep_focus"])
     
-    # Calculate averages
-    avg_hr = sum(reading['hr'] for reading in biometric_history) / len(biometric_history)
-    avg_blinks = sum(reading['blinks'] for reading in biometric_history) / len(biometric_history)
+    avg_hr = stats['hr']['mean']
+    avg_blinks = stats['blinks']['mean']
     
     print(f"📊 Average metrics - HR: {avg_hr:.1f} BPM, Blinks/min: {avg_blinks:.1f}")
     
-    # Determine mood category based on averages
+    category = classify_mood(avg_hr, avg_blinks)
+    mood_tag = random.choice(FocusTags[category])
+    return category, mood_tag
+
+def classify_mood(avg_hr, avg_blinks):
+    """Mood category for a heart rate / blink rate pair."""
     if avg_hr > 95 or avg_blinks > 20:
-        category = "high_stress"
+        return "high_stress"
     elif 12 <= avg_blinks <= 20 and 50 <= avg_hr <= 95:
-        category = "deep_focus"
+        return "deep_focus"
     elif avg_hr < 50 and avg_blinks < 12:
-        category = "low_energy"
-    else:
-        category = "deep_focus"
+        return "low_energy"
+    return "deep_focus"
+
+def update_mood_trend(session):
+    """Tell the prefetcher which category this session's latest readings are heading into."""
+    stats = session.stats.snapshot()
+    if stats['count']:
+        prefetcher.set_trend(classify_mood(stats['hr']['ewma'], stats['blinks']['ewma']), session.sid)
+
+def deliver_music(mood_category, mood_tag, send_tracks, session_id=None):
+    """Send tracks for a mood from its warm pool, falling back to a live fetch.
     
-    mood_tag = random.choice(FocusTags[category])
-    return category, mood_tag
+    Concurrent fallbacks for the same category share one fetch, and every
+    waiting session receives each batch as it resolves. With a session_id,
+    tracks that session was already sent are held back.
+    """
+    sent = []
+    
+    def send_unseen(batch, first):
+        fresh = track_catalog.filter_unseen(session_id, batch)
+        if fresh:
+            send_tracks(fresh, not sent)
+            sent.extend(fresh)
+    
+    exclude = (lambda track: track_catalog.has_seen(session_id, track)) if session_id else None
+    tracks = prefetcher.take(mood_category, TRACKS_PER_FETCH, exclude=exclude)
+    if tracks:
+        send_unseen(tracks, True)
+        return sent
+    try:
+        music_flights.do(mood_category,
+                         lambda publish: stream_music_for_mood(mood_tag, publish),
+                         listener=send_unseen)
+    except TimeoutError as e:
+        print(f"⏱ {e}")
+    return sent
+
+def biometric_payload(session, metrics):
+    """biometric_update for the latest metrics plus the session's rolling averages."""
+    stats = session.stats.snapshot()
+    return {
+        'heart_rate': round(metrics['heart_rate'], 1),
+        'blinks_per_minute': round(metrics['blinks_per_minute'], 1),
+        'blink_count': metrics['blink_count'],
+        'avg_heart_rate': round(stats['hr']['mean'], 1),
+        'avg_blinks': round(stats['blinks']['mean'], 1),
+        'heart_rate_std': round(stats['hr']['std'], 1)
+    }
 
-def biometric_monitoring_loop():
-    """Main loop that monitors biometrics and collects data for averaging."""
-    global monitoring_active, current_mood, bio_monitor, biometric_history
+def emit_biometric_update(session, metrics):
+    """Push the latest metrics to the session's client (called by its monitor subscription)."""
+    timed_server_emit('biometric_update', biometric_payload(session, metrics), to=session.sid)
+
+def start_session_feeds(session):
+    """Subscribe the session's client (and recorder) to its monitor."""
+    # biometric_update goes out as metrics change; the sampler only samples for averaging
+    session.subscriptions.append(session.monitor.subscribe(
+        lambda metrics: emit_biometric_update(session, metrics),
+        min_delta=BIOMETRIC_MIN_DELTA, max_rate=BIOMETRIC_MAX_RATE))
     
-    print("Biometric monitoring loop started")
-    song_start_time = None
-    last_music_change = time.time()
+    recorder = session.recorder = open_recorder(session)
+    if recorder:
+        session.subscriptions.append(session.monitor.subscribe(
+            lambda metrics: recorder.append(metrics['heart_rate'], metrics['blinks_per_minute'],
+                                            metrics['blink_count'], session.mood),
+            min_delta=0, max_rate=RECORD_RATE))
+
+def open_recorder(session):
+    """A SessionRecorder for the session's feed if RECORD_SESSIONS covers it, else None; prunes old recordings"""
+    if BIOMETRICS_REPLAY or RECORD_SESSIONS == "off":
+        return None
+    if RECORD_SESSIONS != "all" and isinstance(session.monitor, RemoteFeed):
+        return None
+    recorder = SessionRecorder(SESSIONS_DIR)
+    active = {other.recorder.session_id for other in sessions.sessions() if other.recorder}
+    active.add(recorder.session_id)
+    removed = prune_sessions(SESSIONS_DIR, MAX_RECORDINGS, active)
+    print(f"⏺ Recording session {recorder.session_id}" + (f" (removed {len(removed)} old)" if removed else ""))
+    return recorder
+
+def sample_session(session):
+    """Take one reading for mood averaging; True when a client that does not report playback is due a song."""
+    hr, blinks_per_min = session.monitor.get_metrics()
+    session.stats.add(hr, blinks_per_min)
+    update_mood_trend(session)
     
-    while monitoring_active:
-        try:
-            # Get current biometric data
-            hr, blinks_per_min = bio_monitor.get_metrics()
-            blink_count = bio_monitor.get_blink_count()
-            
-            # Store reading for averaging
-            biometric_history.append({
-                'hr': hr,
-                'blinks': blinks_per_min,
-                'timestamp': time.time()
-            })
-            
-            # Emit biometric update to frontend
-            socketio.emit('biometric_update', {
-                'heart_rate': round(hr, 1),
-                'blinks_per_minute': round(blinks_per_min, 1),
-                'blink_count': blink_count,
-                'avg_heart_rate': round(sum(r['hr'] for r in biometric_history) / len(biometric_history), 1) if biometric_history else 0,
-                'avg_blinks': round(sum(r['blinks'] for r in biometric_history) / len(biometric_history), 1) if biometric_history else 0
-            })
-            
-            # Check if song has finished (30 seconds for iTunes preview)
-            current_time = time.time()
-            time_since_last_change = current_time - last_music_change
-            
-            # Only change music after song completes (30 seconds + 2 second buffer)
-            if time_since_last_change >= (SONG_DURATION + 2):
-                # Determine new mood based on averages
-                mood_category, mood_tag = determine_mood_from_average()
-                
-                print(f"🎵 Song completed. Switching to {mood_category} based on average biometrics")
-                
-                # Fetch tracks for this mood
-                tracks = get_music_for_mood(mood_tag)
-                
-                if tracks:
-                    socketio.emit('music_update', {
-                        'mood': mood_category,
-                        'mood_tag': mood_tag,
-                        'tracks': tracks
-                    })
-                    socketio.emit('mood_change', {
-                        'mood': mood_category,
-                        'reason': f"Avg HR: {sum(r['hr'] for r in biometric_history) / len(biometric_history):.1f} BPM, Avg Blinks: {sum(r['blinks'] for r in biometric_history) / len(biometric_history):.1f}/min"
-                    })
-                    
-                    current_mood = mood_category
-                    last_music_change = current_time
-                    # Clear history for next song cycle
-                    biometric_history.clear()
-            
-            time.sleep(2)  # Check every 2 seconds
-            
-        except Exception as e:
-            print(f"Error in monitoring loop: {e}")
-            time.sleep(1)
+    # Clients reporting playback get next_song_job at their real song boundary;
+    # otherwise assume back-to-back previews (30 seconds + 2 second buffer)
+    current_time = clock.time()
+    if session.last_music_change is None:
+        session.last_music_change = current_time
+    if not playback.active(session.sid) and current_time - session.last_music_change >= (SONG_DURATION + 2):
+        print(f"🎵 Song completed for {session.sid}")
+        session.last_music_change = current_time
+        return True
+    return False
+
+def biometric_sampling_loop():
+    """Sample every monitoring session each HISTORY_INTERVAL, on one thread for all of them."""
+    print("Biometric sampling loop started")
+    while True:
+        for session in sessions.monitoring():
+            try:
+                if sample_session(session):
+                    jobs.submit(session.sid, next_song_job, 0)
+            except Exception as e:
+                print(f"Error sampling session {session.sid}: {e}")
+        clock.sleep(HISTORY_INTERVAL)
+
+def start_sampler():
+    global sampler_thread
+    if sampler_thread is None:
+        sampler_thread = threading.Thread(target=biometric_sampling_loop, daemon=True, name="biometric-sampler")
+        sampler_thread.start()
+
+def end_session(session, reason):
+    """Forget a closed session everywhere else that keeps per-sid state."""
+    track_catalog.forget_session(session.sid)
+    playback.forget(session.sid)
+    prefetcher.clear_trend(session.sid)
+    if reason != 'closed':
+        print(f"Session {session.sid} closed ({reason})")
+        timed_server_emit('monitoring_status', {'status': 'stopped', 'reason': reason}, to=session.sid)
+
+def broadcast_favorites_change(change):
+    """Send one favorites change to every client as a versioned delta."""
+    timed_server_emit('favorites_delta', {
+        'epoch': favorites.epoch,
+        'version': change['version'],
+        'changes': [change]
+    })
+    if bus:
+        bus.publish('favorites', {'version': change['version']})
+
+def favorites_catch_up(since):
+    """(event, payload) that brings a client up to date from {'epoch', 'version'}.
     
-    print("Biometric monitoring loop stopped")
+    Just the changes it missed, or a full snapshot when it has none yet,
+    is from an older epoch, or is too far behind the change log.
+    """
+    since = since if isinstance(since, dict) else {}
+    # Client-supplied: anything that is not a non-negative integer version gets a snapshot
+    try:
+        version = int(since['version'])
+    except (KeyError, TypeError, ValueError, OverflowError):
+        version = None
+    changes = favorites.changes_since(since.get('epoch'), version) if version is not None and version >= 0 else None
+    if changes is None:
+        return 'favorites_snapshot', favorites.snapshot()
+    return 'favorites_delta', {
+        'epoch': favorites.epoch,
+        'version': changes[-1]['version'] if changes else version,
+        'changes': changes
+    }
+
+def send_favorites_catch_up(since):
+    """Bring the calling client up to date from {'epoch', 'version'}."""
+    timed_emit(*favorites_catch_up(since))
 
 @app.route('/')
 def index():
     return "Biometric Music Player Backend Running"
 
+@app.route('/api/health', methods=['GET'])
+def health():
+    """Readiness probe: answers as soon as the server is up, whatever the vision stack is doing"""
+    return jsonify({'status': 'ok', 'uptime_seconds': round(time.time() - BOOTED_AT, 3), 'vision': vision})
+
 @app.route('/api/favorites', methods=['GET'])
 def get_favorites():
     """Get all favorite tracks"""
-    return jsonify(favorites)
+    return jsonify(favorites.all())
 
 @app.route('/api/favorites', methods=['POST'])
 def add_favorite():
     """Add a track to favorites"""
-    global favorites
     track = request.json
     
-    # Check if already in favorites
-    if not any(f['name'] == track['name'] and f['artist'] == track['artist'] for f in favorites):
-        favorites.append(track)
-        save_favorites(favorites)
-        socketio.emit('favorites_updated', favorites)
-        return jsonify({'success': True, 'favorites': favorites})
+    change = favorites.add(track)
+    if change:
+        broadcast_favorites_change(change)
+        return jsonify({'success': True, 'favorites': favorites.all()})
     
     return jsonify({'success': False, 'message': 'Already in favorites'})
 
 @app.route('/api/favorites/<int:index>', methods=['DELETE'])
 def remove_favorite(index):
     """Remove a track from favorites"""
-    global favorites
-    
-    if 0 <= index < len(favorites):
-        removed = favorites.pop(index)
-        save_favorites(favorites)
-        socketio.emit('favorites_updated', favorites)
-        return jsonify({'success': True, 'removed': removed, 'favorites': favorites})
+    change = favorites.remove_at(index)
+    if change:
+        broadcast_favorites_change(change)
+        return jsonify({'success': True, 'removed': change['track'], 'favorites': favorites.all()})
     
     return jsonify({'success': False, 'message': 'Invalid index'})
 
+@app.route('/api/sessions', methods=['GET'])
+def get_sessions():
+    """Recorded biometric sessions, newest first"""
+    return jsonify(list_sessions(SESSIONS_DIR))
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    """One session's metrics downsampled for charting.
+    
+    Query params: metrics (comma-separated, default hr,blinks_per_minute),
+    start/end (seconds since the session started), points (default 500)
+    and method (lttb or minmax).
+    """
+    path = os.path.join(SESSIONS_DIR, session_id)
+    if session_id.startswith('.') or not os.path.exists(os.path.join(path, 'meta.json')):
+        return jsonify({'success': False, 'message': 'Unknown session'}), 404
+    
+    metrics = request.args.get('metrics', 'hr,blinks_per_minute').split(',')
+    method = request.args.get('method', 'lttb')
+    if method not in DOWNSAMPLERS or any(m not in SERIES for m in metrics):
+        return jsonify({'success': False, 'message': f"metrics must be in {SERIES}, method in {tuple(DOWNSAMPLERS)}"}), 400
+    start = request.args.get('start', type=float)
+    end = request.args.get('end', type=float)
+    points = max(3, min(request.args.get('points', 500, type=int), 10000))
+    
+    session = SessionReader(path)
+    return jsonify({
+        'id': session_id,
+        'meta': session.meta,
+        'series': {m: session.series(m, start, end, points, method) for m in metrics},
+        'blink_events': session.blink_events(start, end),
+        'moods': session.mood_changes(start, end)
+    })
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics_endpoint():
+    """Hot-path timers and counters as JSON, or Prometheus text with ?format=prometheus"""
+    if request.args.get('format') == 'prometheus':
+        return Response(REGISTRY.to_prometheus(), mimetype='text/plain; version=0.0.4')
+    metrics = REGISTRY.to_json()
+    metrics['music_cache'] = music_cache.stats()
+    metrics['prefetch'] = prefetcher.stats()
+    metrics['jobs'] = jobs.stats()
+    metrics['music_flights'] = music_flights.stats()
+    metrics['catalog'] = track_catalog.stats()
+    metrics['favorites'] = favorites.stats()
+    metrics['playback'] = playback.stats()
+    metrics['sessions'] = sessions.stats()
+    metrics['monitor_pool'] = monitor_pool.stats()
+    return jsonify(metrics)
+
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
     print('Client connected')
-    emit('connection_response', {'status': 'connected'})
-    emit('favorites_updated', favorites)
+    sessions.open(request.sid)
+    timed_emit('connection_response', {'status': 'connected'})
+    # Reconnecting clients pass the favorites version they already have
+    send_favorites_catch_up((auth or {}).get('favorites'))
 
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected')
+    sessions.close(request.sid)
 
-@socketio.on('start_monitoring')
-def handle_start_monitoring():
-    global monitoring_active, bio_monitor, current_mood, biometric_history
+def next_song_job(sid, queue_length):
+    """Re-evaluate the mood just before sid's song ends and queue what plays next.
     
-    if not monitoring_active:
-        print("Starting biometric monitoring...")
-        
-        bio_monitor = BiometricsMonitor(show_ui=False)
-        bio_monitor.start()
+    A new mood replaces the client's queue (flagged upcoming, so the current
+    song keeps playing); an unchanged mood only tops up a short queue.
+    """
+    session = sessions.get(sid)
+    if session is None or not session.monitoring:
+        return
+    mood_category, mood_tag = determine_mood_from_average(session.stats)
+    
+    if mood_category != session.mood:
+        print(f"🎵 Song ending. Switching to {mood_category} based on average biometrics")
         
-        monitoring_active = True
-        current_mood = None
-        biometric_history.clear()
+        def send_tracks(batch, first):
+            if first:
+                timed_server_emit('music_update', {
+                    'mood': mood_category,
+                    'mood_tag': mood_tag,
+                    'tracks': batch,
+                    'upcoming': True
+                }, to=sid)
+            else:
+                timed_server_emit('more_music_loaded', {
+                    'mood': mood_category,
+                    'tracks': batch
+                }, to=sid)
         
-        thread = threading.Thread(target=biometric_monitoring_loop, daemon=True)
-        thread.start()
+        if not deliver_music(mood_category, mood_tag, send_tracks, session_id=sid):
+            return
+        stats = session.stats.snapshot()
+        timed_server_emit('mood_change', {
+            'mood': mood_category,
+            'reason': f"Avg HR: {stats['hr']['mean']:.1f} BPM, Avg Blinks: {stats['blinks']['mean']:.1f}/min"
+        }, to=sid)
+        session.mood = mood_category
+    elif queue_length <= QUEUE_REFILL_AT:
+        more_music_job(sid, mood_category, auto=True)
+    
+    # Clear history for next song cycle
+    session.stats.clear()
+
+def initial_music_job(sid, started_at):
+    """Pick the first mood once some biometrics are in and send its tracks to sid."""
+    session = sessions.get(sid)
+    if session is None or not session.monitoring:
+        return
+    
+    mood_category, mood_tag = determine_mood_from_average(session.stats) if len(session.stats) else ("deep_focus", random.choice(FocusTags["deep_focus"]))
+    session.mood = mood_category
+    
+    def send_tracks(batch, first):
+        if first:
+            timed_server_emit('music_update', {
+                'mood': mood_category,
+                'mood_tag': mood_tag,
+                'tracks': batch
+            }, to=sid)
+            FIRST_SONG_SECONDS.observe(time.perf_counter() - started_at)
+        else:
+            timed_server_emit('more_music_loaded', {
+                'mood': mood_category,
+                'tracks': batch
+            }, to=sid)
+    
+    deliver_music(mood_category, mood_tag, send_tracks, session_id=sid)
+    session.last_music_change = clock.time()
+
+def more_music_job(sid, mood_category, auto=False):
+    """Send more tracks for mood_category to sid."""
+    mood_tag = random.choice(FocusTags.get(mood_category, FocusTags['deep_focus']))
+    
+    def send_tracks(batch, first):
+        payload = {
+            'mood': mood_category,
+            'tracks': batch
+        }
+        if auto:
+            payload['auto'] = True
+        timed_server_emit('more_music_loaded', payload, to=sid)
+    
+    tracks = deliver_music(mood_category, mood_tag, send_tracks, session_id=sid)
+    
+    if not tracks:
+        print(f"❌ No additional tracks found for {mood_category}")
+
+@socketio.on('start_monitoring')
+def handle_start_monitoring(data=None):
+    """Start this client's own monitor; {'source': 'remote'} to push metrics from the client instead"""
+    session = sessions.open(request.sid)
+    
+    if not session.monitoring:
+        print("Starting biometric monitoring...")
+        started_at = time.perf_counter()
         
-        emit('monitoring_status', {'status': 'started'})
+        session.start_monitoring(create_bio_monitor((data or {}).get('source')))
+        session.last_music_change = None
+        start_session_feeds(session)
+        start_sampler()
         
-        # Wait for initial data
-        time.sleep(2)
-        hr, bpm = bio_monitor.get_metrics()
-        mood_category, mood_tag = determine_mood_from_average() if biometric_history else ("deep_focus", random.choice(FocusTags["deep_focus"]))
-        current_mood = mood_category
+        timed_emit('monitoring_status', {'status': 'started'})
         
-        tracks = get_music_for_mood(mood_tag)
-        if tracks:
-            emit('music_update', {
-                'mood': mood_category,
-                'mood_tag': mood_tag,
-                'tracks': tracks
-            })
+        # Wait for initial data off the handler thread
+        jobs.submit(request.sid, initial_music_job, started_at, delay=INITIAL_READING_DELAY / clock.speed)
 
 @socketio.on('stop_monitoring')
 def handle_stop_monitoring():
-    global monitoring_active, bio_monitor
-    
-    monitoring_active = False
-    if bio_monitor:
-        bio_monitor.stop()
-        bio_monitor = None
-    
-    emit('monitoring_status', {'status': 'stopped'})
+    sessions.open(request.sid).stop_monitoring()
+    prefetcher.clear_trend(request.sid)
+    timed_emit('monitoring_status', {'status': 'stopped'})
+
+@socketio.on('biometric_sample')
+def handle_biometric_sample(data):
+    """Metrics measured on the client, for sessions started with source 'remote'"""
+    session = sessions.open(request.sid)
+    if isinstance(session.monitor, RemoteFeed):
+        session.monitor.push(data.get('heart_rate', 0.0), data.get('blinks_per_minute', 0.0),
+                             data.get('blink_count'))
 
 @socketio.on('request_more_music')
 def handle_request_more_music(data):
     """Fetch more songs for current mood when queue runs low"""
-    mood_category = data.get('mood', current_mood or 'deep_focus')
-    mood_tag = random.choice(FocusTags.get(mood_category, FocusTags['deep_focus']))
-    
+    mood_category = data.get('mood', sessions.open(request.sid).mood or 'deep_focus')
     print(f"📥 Fetching more songs for {mood_category} mood...")
-    tracks = get_music_for_mood(mood_tag)
-    
-    if tracks:
-        emit('more_music_loaded', {
-            'mood': mood_category,
-            'tracks': tracks
-        })
-    else:
-        print(f"❌ No additional tracks found for {mood_category}")
+    jobs.submit(request.sid, more_music_job, mood_category)
 
 @socketio.on('queue_low')
 def handle_queue_low(data):
     """Automatically fetch more songs when queue is running low"""
-    mood_category = data.get('mood', current_mood or 'deep_focus')
+    mood_category = data.get('mood', sessions.open(request.sid).mood or 'deep_focus')
     print(f"⚠️ Queue running low! Auto-fetching more {mood_category} songs...")
-    
-    mood_tag = random.choice(FocusTags.get(mood_category, FocusTags['deep_focus']))
-    tracks = get_music_for_mood(mood_tag)
-    
-    if tracks:
-        emit('more_music_loaded', {
-            'mood': mood_category,
-            'tracks': tracks,
-            'auto': True
-        })
+    jobs.submit(request.sid, more_music_job, mood_category, auto=True)
+
+@socketio.on('playback')
+def handle_playback(data):
+    """Client play/pause/seek/skip report, used to time the next mood decision"""
+    sessions.open(request.sid)
+    track = (data.get('name'), data.get('artist')) if data.get('name') else None
+    playback.update(request.sid, data.get('action'), position=data.get('position') or 0.0,
+                    duration=data.get('duration'), track=track, queue_length=data.get('queue_length'))
+
+@socketio.on('song_ended')
+def handle_song_ended(data):
+    """Client's song finished; decides now if the lead-time check has not run yet"""
+    sessions.open(request.sid)
+    playback.ended(request.sid, (data or {}).get('queue_length'))
 
 @socketio.on('add_to_favorites')
 def handle_add_favorite(track):
     """Add track to favorites via WebSocket"""
-    global favorites
-    
-    if not any(f['name'] == track['name'] and f['artist'] == track['artist'] for f in favorites):
-        favorites.append(track)
-        save_favorites(favorites)
-        emit('favorites_updated', favorites, broadcast=True)
-        emit('favorite_added', {'success': True})
+    sessions.open(request.sid)
+    change = favorites.add(track)
+    if change:
+        broadcast_favorites_change(change)
+        timed_emit('favorite_added', {'success': True})
     else:
-        emit('favorite_added', {'success': False, 'message': 'Already in favorites'})
+        timed_emit('favorite_added', {'success': False, 'message': 'Already in favorites'})
 
 @socketio.on('remove_from_favorites')
 def handle_remove_favorite(data):
     """Remove track from favorites via WebSocket"""
-    global favorites
-    
-    track_name = data.get('name')
-    track_artist = data.get('artist')
-    
-    favorites = [f for f in favorites if not (f['name'] == track_name and f['artist'] == track_artist)]
-    save_favorites(favorites)
-    emit('favorites_updated', favorites, broadcast=True)
-    emit('favorite_removed', {'success': True})
+    sessions.open(request.sid)
+    change = favorites.remove(data.get('name'), data.get('artist'))
+    if change:
+        broadcast_favorites_change(change)
+    timed_emit('favorite_removed', {'success': True})
+
+@socketio.on('sync_favorites')
+def handle_sync_favorites(data):
+    """Client noticed a gap in favorites_delta versions; resend from its version"""
+    send_favorites_catch_up(data)
 
 if __name__ == '__main__':
     print("=" * 60)
@@ -346,6 +838,11 @@ if __name__ == '__main__':
     print("=" * 60)
     print("✅ Make sure your webcam is connected!")
     print("✅ Make sure biometrics.py is in the same folder!")
-    print("✅ Backend running on http://localhost:5000")
+    print(f"✅ Backend running on http://localhost:{PORT}")
     print("=" * 60)
-    socketio.run(app, host='0.0.0.0', port=5000, debug=False, use_reloader=False)
\ No newline at end of file
+    prefetcher.start()
+    warm_up_vision()
+    # SIGTERM exits like Ctrl-C, so atexit hooks (favorites flush) still run
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # allow_unsafe_werkzeug: also start when launched without a TTY (e.g. by benchmarks.py load --spawn)
+    socketio.run(app, host=HOST, port=PORT, debug=False, use_reloader=False, allow_unsafe_werkzeug=True)
\ No newline at end of file
@@ -0,0 +1,804 @@
+"""Reproducible performance benchmarks for the Focus Buddy backend.
+
+Run a single suite with e.g. `python benchmarks.py rppg`.
+"""
+import argparse
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+def _synthetic_pulse(bpm, frames, fps=30, noise=0.5, seed=0):
+    """Green channel averages for a face with a pulse at a known BPM"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(frames) / fps
+    return 120 + 2.0 * np.sin(2 * np.pi * (bpm / 60) * t) + rng.normal(0, noise, frames)
+
+
+def _fft_heart_rate(green_values, fps):
+    """Reference estimator: the original full-FFT SimpleRPPG.calculate_heart_rate"""
+    signal = np.array(list(green_values))
+    signal = signal - np.mean(signal)
+
+    fft = np.fft.fft(signal)
+    freqs = np.fft.fftfreq(len(signal), 1/fps)
+
+    valid_idx = np.where((freqs >= 0.8) & (freqs <= 3.0))[0]
+    fft_abs = np.abs(fft[valid_idx])
+    peak_freq = abs(freqs[valid_idx[np.argmax(fft_abs)]])
+
+    hr = peak_freq * 60
+    return hr if 45 <= hr <= 180 else 0
+
+
+def bench_rppg(args):
+    """Per-frame cost of the full-FFT estimator vs the sliding DFT"""
+    from biometrics import SimpleRPPG
+
+    samples = _synthetic_pulse(args.bpm, args.frames, fps=args.fps)
+
+    # Full FFT on every frame, as SimpleRPPG used to do
+    buffer = deque(maxlen=args.buffer_size)
+    fft_hr = 0
+    start = time.perf_counter()
+    for value in samples:
+        buffer.append(value)
+        if len(buffer) >= args.buffer_size:
+            fft_hr = _fft_heart_rate(buffer, args.fps)
+    fft_elapsed = time.perf_counter() - start
+
+    # Sliding DFT over the heart-rate band only
+    rppg = SimpleRPPG(buffer_size=args.buffer_size, fps=args.fps)
+    sdft_hr = 0
+    start = time.perf_counter()
+    for value in samples:
+        sdft_hr = rppg.add_sample(value)
+    sdft_elapsed = time.perf_counter() - start
+
+    fft_us = fft_elapsed / args.frames * 1e6
+    sdft_us = sdft_elapsed / args.frames * 1e6
+    print(f"rPPG per-frame cost over {args.frames} frames (buffer={args.buffer_size}, bins={len(rppg._bins)})")
+    print(f"  full FFT     : {fft_us:8.2f} us/frame  -> HR {fft_hr:.1f}")
+    print(f"  sliding DFT  : {sdft_us:8.2f} us/frame  -> HR {sdft_hr:.1f}")
+    print(f"  speedup      : {fft_us / sdft_us:8.2f}x  (true HR {args.bpm:.1f})")
+
+
+def _describe(samples_ms):
+    samples_ms = np.asarray(samples_ms)
+    return (f"mean {samples_ms.mean():7.2f} ms  p50 {np.percentile(samples_ms, 50):7.2f} ms  "
+            f"p95 {np.percentile(samples_ms, 95):7.2f} ms")
+
+
+def bench_pipeline(args):
+    """Per-stage latency and end-to-end frames/sec of BiometricsMonitor on a frame source"""
+    from biometrics import BiometricsMonitor
+    from frame_sources import open_frame_source
+
+    kwargs = {'duration': args.duration} if args.source.startswith('synthetic') else {}
+    source = open_frame_source(args.source, **kwargs)
+    monitor = BiometricsMonitor(source=source, inference_workers=args.workers)
+
+    # Serial pass: time each stage in isolation
+    capture_ms, inference_ms, aggregate_ms = [], [], []
+    source.open()
+    while True:
+        start = time.perf_counter()
+        success, frame = source.read()
+        if not success:
+            break
+        capture_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        green_avg, ear = monitor._infer_frame(frame, monitor.face_mesh, monitor.face_detection)
+        inference_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        if green_avg is not None:
+            monitor.rppg.add_sample(green_avg, source.frame_time)
+        if ear is not None:
+            monitor.blink_detector.update(ear, source.frame_time)
+        aggregate_ms.append((time.perf_counter() - start) * 1000)
+    source.release()
+
+    print(f"Per-stage latency over {len(capture_ms)} frames from {args.source}")
+    print(f"  capture     : {_describe(capture_ms)}")
+    print(f"  inference   : {_describe(inference_ms)}")
+    print(f"  aggregation : {_describe(aggregate_ms)}")
+
+    # Threaded pass: the real pipeline, as fast as the source allows
+    monitor = BiometricsMonitor(source=source, inference_workers=args.workers)
+    start = time.perf_counter()
+    monitor.start()
+    while monitor._running:
+        time.sleep(0.05)
+    monitor.stop()
+    elapsed = time.perf_counter() - start
+
+    stats = monitor.get_pipeline_stats()
+    print(f"Pipeline throughput ({args.workers} inference worker(s))")
+    print(f"  frames/sec  : {stats['frames_aggregated'] / elapsed:7.1f}")
+    print(f"  stats       : {stats}")
+
+
+def _seconds_to_heart_rate(monitor, timeout=60.0):
+    """start() the monitor and wait for its first non-zero heart rate"""
+    start = time.perf_counter()
+    monitor.start()
+    while time.perf_counter() - start < timeout:
+        if monitor.get_metrics()[0] > 0:
+            return time.perf_counter() - start
+        time.sleep(0.01)
+    return float('nan')
+
+
+def bench_resume(args):
+    """Time to the first valid heart rate: new monitor per start vs a paused one from MonitorPool"""
+    from biometrics import BiometricsMonitor
+    from frame_sources import SyntheticFaceSource
+    from monitor_pool import MonitorPool
+
+    def build():
+        source = SyntheticFaceSource(bpm=args.bpm, duration=None, realtime=True)
+        return BiometricsMonitor(source=source, rppg_keep_seconds=args.keep)
+
+    # As backend.py used to: stop, drop, build a new one
+    start = time.perf_counter()
+    monitor = build()
+    built = time.perf_counter() - start
+    rebuild = built + _seconds_to_heart_rate(monitor)
+    monitor.stop()
+
+    pool = MonitorPool(build, keep_warm=600)
+    rows = [('rebuild on start', rebuild)]
+    monitor = pool.acquire()
+    _seconds_to_heart_rate(monitor)
+    for pause in args.pauses:
+        pool.release(monitor)
+        time.sleep(pause)
+        monitor = pool.acquire()
+        rows.append((f"resume after {pause:g}s pause", _seconds_to_heart_rate(monitor)))
+    pool.release(monitor)
+    pool.close()
+
+    print(f"Time to first valid heart rate ({args.bpm:g} BPM synthetic face, rPPG kept for {args.keep:g}s)")
+    for label, seconds in rows:
+        print(f"  {label:24}: {seconds * 1000:9.1f} ms")
+    print(f"  pool                    : {pool.stats()}")
+
+
+def bench_accuracy(args):
+    """HR accuracy of SimpleRPPG and blink accuracy of BlinkDetector on synthetic ground truth"""
+    from biometrics import BlinkDetector, SimpleRPPG
+    from frame_sources import SyntheticFaceSource
+
+    print(f"Heart rate on synthetic faces ({args.duration:.0f} s each)")
+    errors = []
+    for bpm in args.bpms:
+        source = SyntheticFaceSource(bpm=bpm, duration=args.duration, noise=args.noise, seed=int(bpm))
+        rppg = SimpleRPPG(fps=source.fps)
+        hr = 0
+        source.open()
+        while True:
+            success, frame = source.read()
+            if not success:
+                break
+            hr = rppg.process_frame(frame)
+        errors.append(abs(hr - bpm))
+        print(f"  true {bpm:6.1f} BPM -> estimated {hr:6.1f} BPM (error {abs(hr - bpm):5.1f})")
+    print(f"  mean absolute error: {np.mean(errors):.2f} BPM")
+
+    source = SyntheticFaceSource(duration=args.duration * 4, seed=1)
+    detector = BlinkDetector()
+    rng = np.random.default_rng(1)
+    detected = []
+    for i in range(int(source.duration * source.fps)):
+        t = i / source.fps
+        ear = source.ear_at(t) + rng.normal(0, args.ear_noise)
+        if detector.update(ear, t):
+            detected.append(t)
+
+    # A detection matches a scripted blink if it starts within the blink duration
+    matched = sum(1 for t in source.blink_times
+                  if any(0 <= d - t <= source.blink_duration for d in detected))
+    precision = matched / len(detected) if detected else 0.0
+    recall = matched / len(source.blink_times) if len(source.blink_times) else 0.0
+    print(f"Blink detection over {source.duration:.0f} s (EAR noise {args.ear_noise})")
+    print(f"  scripted {len(source.blink_times)}, detected {len(detected)}, "
+          f"precision {precision:.2f}, recall {recall:.2f}")
+
+
+LOAD_MOODS = ("low_energy", "deep_focus", "high_stress")
+
+
+class _LoadClient:
+    """One simulated browser tab: a Socket.IO client plus the events it received"""
+
+    def __init__(self, url, index):
+        import socketio
+
+        self.url = url
+        self.index = index
+        self.received = 0
+        self._events = queue.Queue()
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('*', self._on_event)
+
+    def _on_event(self, event, *args):
+        self.received += 1
+        self._events.put((event, time.perf_counter()))
+
+    def drain(self):
+        while not self._events.empty():
+            self._events.get_nowait()
+
+    def expect(self, names, sent_at, timeout):
+        """Milliseconds from sent_at until one of names arrives, or None on timeout"""
+        deadline = time.perf_counter() + timeout
+        while True:
+            try:
+                event, arrived_at = self._events.get(timeout=max(0, deadline - time.perf_counter()))
+            except queue.Empty:
+                return None
+            if event in names:
+                return (arrived_at - sent_at) * 1000
+
+
+def _run_load_client(client, args, latencies, lock):
+    def record(name, latency_ms):
+        with lock:
+            latencies.setdefault(name, [])
+            if latency_ms is None:
+                latencies.setdefault(name + ' timeouts', []).append(0)
+            else:
+                latencies[name].append(latency_ms)
+
+    try:
+        sent_at = time.perf_counter()
+        client.sio.connect(client.url, wait_timeout=args.timeout)
+        record('connect', client.expect({'connection_response'}, sent_at, args.timeout))
+        # Client-side metrics, so the server runs no vision pipeline per client
+        client.sio.emit('start_monitoring', {'source': 'remote'})
+
+        for round_index in range(args.rounds):
+            mood = LOAD_MOODS[(client.index + round_index) % len(LOAD_MOODS)]
+            client.sio.emit('biometric_sample', {'heart_rate': 60 + client.index % 40, 'blinks_per_minute': 15})
+            client.drain()
+            sent_at = time.perf_counter()
+            client.sio.emit('queue_low', {'mood': mood})
+            record('queue_low', client.expect({'more_music_loaded'}, sent_at, args.timeout))
+
+            client.drain()
+            sent_at = time.perf_counter()
+            client.sio.emit('add_to_favorites', {
+                'name': f"Load Track {client.index}-{round_index}",
+                'artist': 'Load Test',
+                'previewUrl': '',
+                'artwork': '',
+                'mood': mood,
+            })
+            record('add_to_favorites', client.expect({'favorite_added'}, sent_at, args.timeout))
+            time.sleep(args.think_time)
+    except Exception as e:
+        record('errors', None)
+        print(f"  client {client.index} failed: {e}")
+    finally:
+        if client.sio.connected:
+            client.sio.disconnect()
+
+
+def _server_gauge(url, name):
+    import requests
+
+    metrics = requests.get(f"{url}/api/metrics", timeout=5).json()
+    return metrics[name]['series'][0]['value']
+
+
+def _server_cpu_seconds(url):
+    return _server_gauge(url, 'process_cpu_seconds')
+
+
+def _spawn_offline_backend(args, script="backend.py"):
+    """Mock upstream in this process, the backend (`script`) in a child process pointed at it"""
+    from mock_upstream import serve
+    import requests
+
+    mock, upstream = serve(args.mock_port, latency=args.upstream_latency,
+                           error_rate=args.upstream_error_rate, catalog_size=args.catalog_size)
+    workdir = tempfile.mkdtemp(prefix="focus-buddy-load-")
+    env = dict(os.environ,
+               LASTFM_API_URL=f"http://127.0.0.1:{args.mock_port}/2.0/",
+               ITUNES_API_URL=f"http://127.0.0.1:{args.mock_port}/search",
+               FAVORITES_DB=os.path.join(workdir, "favorites.db"),
+               FAVORITES_FILE="",
+               MUSIC_CACHE_PATH="",
+               SESSIONS_DIR=os.path.join(workdir, "sessions"),
+               BIOMETRICS_SOURCE="synthetic")
+    backend = subprocess.Popen([sys.executable, script], env=env,
+                               cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            requests.get(args.url, timeout=1)
+            return mock, upstream, backend
+        except requests.ConnectionError:
+            time.sleep(0.5)
+    backend.kill()
+    mock.shutdown()
+    raise RuntimeError(f"{script} did not come up within 60s")
+
+
+def _run_load(args, script="backend.py"):
+    """Drive args.clients clients against args.url (spawning `script` with --spawn)"""
+    mock = upstream = backend = None
+    if args.spawn:
+        mock, upstream, backend = _spawn_offline_backend(args, script)
+
+    try:
+        cpu_before = _server_cpu_seconds(args.url)
+        latencies = {}
+        lock = threading.Lock()
+        clients = [_LoadClient(args.url, i) for i in range(args.clients)]
+        threads = [threading.Thread(target=_run_load_client, args=(client, args, latencies, lock), daemon=True)
+                   for client in clients]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+            time.sleep(args.ramp / max(1, args.clients))
+        # Every client is connected once the ramp is over
+        peak_threads = _server_gauge(args.url, 'process_threads')
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        cpu_used = _server_cpu_seconds(args.url) - cpu_before
+        peak_rss = _server_gauge(args.url, 'process_peak_rss_bytes')
+    finally:
+        if backend is not None:
+            backend.terminate()
+            backend.wait(timeout=10)
+        if mock is not None:
+            mock.shutdown()
+
+    return {
+        'elapsed': elapsed,
+        'latencies': latencies,
+        'received': sum(client.received for client in clients),
+        'cpu': cpu_used,
+        'threads': peak_threads,
+        'rss': peak_rss,
+        'upstream': upstream.counts if upstream is not None else None,
+    }
+
+
+def bench_load(args):
+    """Socket.IO event latency and server CPU under many concurrent clients"""
+    result = _run_load(args)
+    latencies = result['latencies']
+    elapsed = result['elapsed']
+
+    print(f"Load test: {args.clients} clients x {args.rounds} rounds against {args.url} in {elapsed:.1f} s")
+    for name in ('connect', 'queue_low', 'add_to_favorites'):
+        samples = latencies.get(name, [])
+        timeouts = len(latencies.get(name + ' timeouts', []))
+        summary = _describe(samples) + f"  p99 {np.percentile(samples, 99):7.2f} ms" if samples else "no responses"
+        print(f"  {name:17}: {summary}  ({len(samples)} ok, {timeouts} timed out)")
+    print(f"  client errors    : {len(latencies.get('errors timeouts', []))}")
+    print(f"  events received  : {result['received']}")
+    print(f"  server CPU       : {result['cpu']:.2f} s ({result['cpu'] / elapsed * 100:.0f}% of one core)")
+    print(f"  server threads   : {result['threads']:.0f} with every client connected")
+    if result['upstream'] is not None:
+        print(f"  upstream calls   : {result['upstream']}")
+
+
+SERVER_MODES = (("threading", "backend.py"), ("asgi", "asgi_app.py"))
+
+
+def bench_servers(args):
+    """The load test against backend.py (threading) and asgi_app.py (asyncio), side by side"""
+    args.spawn = True
+    results = {}
+    for mode, script in SERVER_MODES:
+        print(f"Running {args.clients} clients against {script}...")
+        results[mode] = _run_load(args, script)
+
+    print(f"{args.clients} clients x {args.rounds} rounds, upstream latency {args.upstream_latency * 1000:.0f} ms")
+    print(f"  {'':9} {'queue_low p50':>14} {'p99':>9} {'favorite p50':>13} {'p99':>9} "
+          f"{'threads':>8} {'RSS MB':>7} {'CPU s':>7} {'errors':>7}")
+    for mode, _ in SERVER_MODES:
+        result = results[mode]
+        queue_low = result['latencies'].get('queue_low') or [float('nan')]
+        favorite = result['latencies'].get('add_to_favorites') or [float('nan')]
+        errors = sum(len(result['latencies'].get(name, []))
+                     for name in ('errors timeouts', 'queue_low timeouts', 'add_to_favorites timeouts'))
+        print(f"  {mode:9} {np.percentile(queue_low, 50):11.1f} ms {np.percentile(queue_low, 99):6.1f} ms "
+              f"{np.percentile(favorite, 50):10.1f} ms {np.percentile(favorite, 99):6.1f} ms "
+              f"{result['threads']:8.0f} {result['rss'] / 2**20:7.0f} {result['cpu']:7.2f} {errors:7}")
+
+
+def _load_client_process(url, first_index, count, options, results):
+    """`count` load clients against one worker, in their own process; puts their latencies on results"""
+    args = argparse.Namespace(**options)
+    latencies = {}
+    lock = threading.Lock()
+    clients = [_LoadClient(url, first_index + i) for i in range(count)]
+    threads = [threading.Thread(target=_run_load_client, args=(client, args, latencies, lock), daemon=True)
+               for client in clients]
+    for thread in threads:
+        thread.start()
+        time.sleep(args.ramp / max(1, count))
+    for thread in threads:
+        thread.join()
+    results.put(latencies)
+
+
+def _spawn_workers(count, args, workdir):
+    """`count` backend.py workers on consecutive ports, sharing the bus, favorites and music cache"""
+    import requests
+
+    env = dict(os.environ,
+               LASTFM_API_URL=f"http://127.0.0.1:{args.mock_port}/2.0/",
+               ITUNES_API_URL=f"http://127.0.0.1:{args.mock_port}/search",
+               FAVORITES_DB=os.path.join(workdir, "favorites.db"),
+               FAVORITES_FILE="",
+               MUSIC_CACHE_PATH=os.path.join(workdir, "music_cache.db"),
+               SESSIONS_DIR=os.path.join(workdir, "sessions"),
+               BIOMETRICS_SOURCE="synthetic",
+               MESSAGE_BUS=f"tcp://127.0.0.1:{args.bus_port}")
+    urls = [f"http://127.0.0.1:{args.base_port + i}" for i in range(count)]
+    workers = [subprocess.Popen([sys.executable, "backend.py"], env=dict(env, PORT=str(args.base_port + i)),
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+               for i in range(count)]
+    deadline = time.time() + 120
+    for url in urls:
+        while True:
+            try:
+                requests.get(url, timeout=1)
+                break
+            except requests.ConnectionError:
+                if time.time() > deadline:
+                    for worker in workers:
+                        worker.kill()
+                    raise RuntimeError(f"worker at {url} did not come up within 120s")
+                time.sleep(0.5)
+    return urls, workers
+
+
+def bench_scaling(args):
+    """Throughput as workers are added, each with the same number of clients (weak scaling)"""
+    import multiprocessing
+
+    import requests
+    from message_bus import serve_hub
+    from mock_upstream import serve
+
+    mock, _ = serve(args.mock_port, latency=args.upstream_latency, catalog_size=args.catalog_size)
+    hub = serve_hub(args.bus_port)
+    options = {'rounds': args.rounds, 'think_time': 0.0, 'timeout': args.timeout, 'ramp': args.ramp}
+    rows = []
+    try:
+        for count in args.workers:
+            workdir = tempfile.mkdtemp(prefix="focus-buddy-scaling-")
+            urls, workers = _spawn_workers(count, args, workdir)
+            try:
+                results = multiprocessing.Queue()
+                clients = [multiprocessing.Process(target=_load_client_process,
+                                                   args=(url, i * args.clients_per_worker, args.clients_per_worker,
+                                                         options, results))
+                           for i, url in enumerate(urls)]
+                start = time.perf_counter()
+                for process in clients:
+                    process.start()
+                latencies = {}
+                for _ in clients:
+                    for name, samples in results.get().items():
+                        latencies.setdefault(name, []).extend(samples)
+                for process in clients:
+                    process.join()
+                elapsed = time.perf_counter() - start
+
+                # Every worker must list the same favorites, in the same order
+                lists = [requests.get(f"{url}/api/favorites", timeout=5).json() for url in urls]
+                consistent = all(favorites == lists[0] for favorites in lists)
+            finally:
+                for worker in workers:
+                    worker.terminate()
+                for worker in workers:
+                    worker.wait(timeout=10)
+
+            responses = len(latencies.get('queue_low', [])) + len(latencies.get('add_to_favorites', []))
+            errors = sum(len(latencies.get(name, []))
+                         for name in ('errors timeouts', 'queue_low timeouts', 'add_to_favorites timeouts'))
+            rows.append((count, responses / elapsed, latencies.get('queue_low') or [float('nan')],
+                         len(lists[0]), consistent, errors))
+    finally:
+        hub.shutdown()
+        mock.shutdown()
+
+    print(f"Weak scaling: {args.clients_per_worker} clients per worker x {args.rounds} rounds, "
+          f"{os.cpu_count()} CPUs")
+    print(f"  {'workers':>7} {'responses/s':>12} {'efficiency':>11} {'queue_low p50':>14} {'p99':>9} "
+          f"{'favorites':>10} {'consistent':>11} {'errors':>7}")
+    base = rows[0][1] / rows[0][0]
+    for count, throughput, queue_low, favorites, consistent, errors in rows:
+        print(f"  {count:7} {throughput:12.1f} {throughput / (count * base) * 100:10.0f}% "
+              f"{np.percentile(queue_low, 50):11.1f} ms {np.percentile(queue_low, 99):6.1f} ms "
+              f"{favorites:10} {'yes' if consistent else 'NO':>11} {errors:7}")
+
+
+def _import_times(modules, env):
+    """[(name, depth, cumulative ms)] for `import modules` in a fresh interpreter, from python -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modules}"], env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times.append((name.strip(), depth, int(cumulative) / 1000))
+    return times
+
+
+def _time_boot(env):
+    """(ms until /api/health answers, ms until the face models are loaded or None) for one backend.py start"""
+    import requests
+
+    url = f"http://127.0.0.1:{env['PORT']}/api/health"
+    start = time.perf_counter()
+    backend = subprocess.Popen([sys.executable, "backend.py"], env=env,
+                               cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    ready_ms = vision_ms = None
+    try:
+        while time.perf_counter() - start < 60:
+            try:
+                health = requests.get(url, timeout=1).json()
+            except requests.ConnectionError:
+                time.sleep(0.01)
+                continue
+            if ready_ms is None:
+                ready_ms = (time.perf_counter() - start) * 1000
+            if health['vision']['state'] in ('cold', 'error'):
+                break
+            if health['vision']['state'] == 'ready':
+                vision_ms = (time.perf_counter() - start) * 1000
+                break
+            time.sleep(0.01)
+    finally:
+        backend.terminate()
+        backend.wait(timeout=10)
+    if ready_ms is None:
+        raise RuntimeError("backend.py did not come up within 60s")
+    return ready_ms, vision_ms
+
+
+def bench_startup(args):
+    """Import time and readiness of a cold backend.py start, optionally appended to a history file"""
+    from mock_upstream import serve
+
+    mock, _ = serve(args.mock_port)
+    workdir = tempfile.mkdtemp(prefix="focus-buddy-startup-")
+    env = dict(os.environ,
+               LASTFM_API_URL=f"http://127.0.0.1:{args.mock_port}/2.0/",
+               ITUNES_API_URL=f"http://127.0.0.1:{args.mock_port}/search",
+               FAVORITES_DB=os.path.join(workdir, "favorites.db"),
+               FAVORITES_FILE="",
+               MUSIC_CACHE_PATH="",
+               SESSIONS_DIR=os.path.join(workdir, "sessions"),
+               BIOMETRICS_SOURCE="synthetic",
+               BIOMETRICS_WARMUP="0" if args.no_warmup else "1",
+               PORT=str(args.port))
+    import_ms, vision_import_ms, ready_ms, vision_ms = [], [], [], []
+    try:
+        for _ in range(args.runs):
+            times = _import_times("backend", env)
+            import_ms.append(times[-1][2])
+            vision_import_ms.append(sum(ms for _, depth, ms in _import_times("biometrics, mediapipe", env)
+                                        if depth == 0))
+            ready, vision = _time_boot(env)
+            ready_ms.append(ready)
+            if vision is not None:
+                vision_ms.append(vision)
+    finally:
+        mock.shutdown()
+
+    record = {
+        'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'commit': subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip(),
+        'import_ms': round(float(np.median(import_ms)), 1),
+        'ready_ms': round(float(np.median(ready_ms)), 1),
+        'vision_import_ms': round(float(np.median(vision_import_ms)), 1),
+        'vision_ready_ms': round(float(np.median(vision_ms)), 1) if vision_ms else None,
+    }
+    print(f"Cold start of backend.py, median of {args.runs} run(s)")
+    print(f"  import backend      : {record['import_ms']:8.1f} ms")
+    print(f"  /api/health answers : {record['ready_ms']:8.1f} ms after spawn")
+    print(f"  vision stack import : {record['vision_import_ms']:8.1f} ms (deferred until first monitor)")
+    if record['vision_ready_ms'] is not None:
+        print(f"  face models warm    : {record['vision_ready_ms']:8.1f} ms after spawn (background)")
+    print("Slowest imports under backend (cumulative)")
+    for name, _, ms in sorted((t for t in times if t[1] == 1), key=lambda t: -t[2])[:args.top]:
+        print(f"  {name:40} {ms:8.1f} ms")
+
+    if args.history:
+        previous = None
+        if os.path.exists(args.history):
+            with open(args.history) as f:
+                lines = f.read().splitlines()
+            previous = json.loads(lines[-1]) if lines else None
+        with open(args.history, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        if previous:
+            print(f"Since {previous['commit']} ({previous['time']}): "
+                  f"import {record['import_ms'] - previous['import_ms']:+.1f} ms, "
+                  f"ready {record['ready_ms'] - previous['ready_ms']:+.1f} ms")
+
+
+def _generate_session(directory, minutes, seed=0):
+    """Record a scripted session: calm, then stressed, then low energy, in thirds"""
+    from session_store import SessionRecorder
+
+    rng = np.random.default_rng(seed)
+    recorder = SessionRecorder(directory)
+    phases = ((65, 15), (105, 25), (48, 8))
+    samples = int(minutes * 60 * 30)
+    blink_count = 0
+    for i in range(samples):
+        hr, blinks = phases[min(2, i * 3 // samples)]
+        if rng.random() < blinks / 60 / 30:
+            blink_count += 1
+        recorder.append(hr + rng.normal(0, 2), blinks + rng.normal(0, 1), blink_count,
+                        t=recorder.started_at + i / 30)
+    recorder.close()
+    return recorder.path
+
+
+def bench_replay(args):
+    """Run the backend mood/song decision loop over a recorded session at replay speed"""
+    from mock_upstream import serve
+
+    workdir = tempfile.mkdtemp(prefix="focus-buddy-replay-")
+    session = args.session or _generate_session(workdir, args.generate)
+    mock, _ = serve(args.mock_port, latency=0.01)
+    os.environ.update(
+        BIOMETRICS_REPLAY=os.path.abspath(session),
+        REPLAY_SPEED=str(args.speed),
+        LASTFM_API_URL=f"http://127.0.0.1:{args.mock_port}/2.0/",
+        ITUNES_API_URL=f"http://127.0.0.1:{args.mock_port}/search",
+        MUSIC_CACHE_PATH="",
+        FAVORITES_DB=os.path.join(workdir, "favorites.db"),
+        FAVORITES_FILE="",
+        SESSIONS_DIR=workdir,
+    )
+    import backend
+
+    client = backend.socketio.test_client(backend.app)
+    start = time.perf_counter()
+    client.emit('start_monitoring')
+    time.sleep(0.5)
+    monitor = backend.sessions.monitoring()[0].monitor
+    duration = monitor.duration
+    while monitor._running and time.perf_counter() - start < duration / args.speed + 30:
+        time.sleep(0.1)
+    elapsed = time.perf_counter() - start
+    received = client.get_received()
+    client.emit('stop_monitoring')
+    mock.shutdown()
+
+    changes = [event['args'][0] for event in received if event['name'] == 'mood_change']
+    updates = sum(1 for event in received if event['name'] == 'biometric_update')
+    print(f"Replayed {duration / 60:.1f} min of {session} at {args.speed:g}x in {elapsed:.1f} s")
+    print(f"  biometric_update events: {updates}")
+    print(f"  mood changes           : {len(changes)} "
+          f"over about {duration / (backend.SONG_DURATION + 2):.0f} song boundaries")
+    for change in changes:
+        print(f"    {change['mood']:12} {change['reason']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    suites = parser.add_subparsers(dest="suite", required=True)
+
+    rppg = suites.add_parser("rppg", help="SimpleRPPG per-frame cost")
+    rppg.add_argument("--frames", type=int, default=9000)
+    rppg.add_argument("--buffer-size", type=int, default=150)
+    rppg.add_argument("--fps", type=int, default=30)
+    rppg.add_argument("--bpm", type=float, default=72.0)
+    rppg.set_defaults(func=bench_rppg)
+
+    pipeline = suites.add_parser("pipeline", help="BiometricsMonitor stage latency and throughput")
+    pipeline.add_argument("--source", default="synthetic",
+                          help="camera index, video file, image directory or synthetic[:bpm]")
+    pipeline.add_argument("--duration", type=float, default=10.0, help="synthetic source length in seconds")
+    pipeline.add_argument("--workers", type=int, default=1)
+    pipeline.set_defaults(func=bench_pipeline)
+
+    accuracy = suites.add_parser("accuracy", help="HR and blink accuracy on synthetic ground truth")
+    accuracy.add_argument("--bpms", type=float, nargs="+", default=[55, 72, 90, 120, 150])
+    accuracy.add_argument("--duration", type=float, default=20.0)
+    accuracy.add_argument("--noise", type=float, default=0.5)
+    accuracy.add_argument("--ear-noise", type=float, default=0.002)
+    accuracy.set_defaults(func=bench_accuracy)
+
+    load = suites.add_parser("load", help="Socket.IO latency percentiles and server CPU under concurrent clients")
+    load.add_argument("--url", default="http://127.0.0.1:5000")
+    load.add_argument("--clients", type=int, default=200)
+    load.add_argument("--rounds", type=int, default=3, help="queue_low + add_to_favorites rounds per client")
+    load.add_argument("--ramp", type=float, default=5.0, help="seconds over which clients connect")
+    load.add_argument("--think-time", type=float, default=0.5, help="pause between rounds")
+    load.add_argument("--timeout", type=float, default=15.0, help="seconds to wait for each response")
+    load.add_argument("--spawn", action="store_true",
+                      help="start mock_upstream.py and backend.py locally instead of using --url as is")
+    load.add_argument("--mock-port", type=int, default=8765)
+    load.add_argument("--upstream-latency", type=float, default=0.08)
+    load.add_argument("--upstream-error-rate", type=float, default=0.01)
+    load.add_argument("--catalog-size", type=int, default=500)
+    load.set_defaults(func=bench_load)
+
+    servers = suites.add_parser("servers", help="Load test against the threading and asyncio servers, side by side")
+    servers.add_argument("--url", default="http://127.0.0.1:5000")
+    servers.add_argument("--clients", type=int, default=200)
+    servers.add_argument("--rounds", type=int, default=3)
+    servers.add_argument("--ramp", type=float, default=5.0)
+    servers.add_argument("--think-time", type=float, default=0.5)
+    servers.add_argument("--timeout", type=float, default=15.0)
+    servers.add_argument("--mock-port", type=int, default=8765)
+    servers.add_argument("--upstream-latency", type=float, default=0.08)
+    servers.add_argument("--upstream-error-rate", type=float, default=0.01)
+    servers.add_argument("--catalog-size", type=int, default=500)
+    servers.set_defaults(func=bench_servers)
+
+    scaling = suites.add_parser("scaling", help="Throughput of 1..N backend workers sharing a message bus")
+    scaling.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    scaling.add_argument("--clients-per-worker", type=int, default=30)
+    scaling.add_argument("--rounds", type=int, default=5)
+    scaling.add_argument("--ramp", type=float, default=2.0)
+    scaling.add_argument("--timeout", type=float, default=15.0)
+    scaling.add_argument("--base-port", type=int, default=5001)
+    scaling.add_argument("--bus-port", type=int, default=5600)
+    scaling.add_argument("--mock-port", type=int, default=8765)
+    scaling.add_argument("--upstream-latency", type=float, default=0.02)
+    scaling.add_argument("--catalog-size", type=int, default=500)
+    scaling.set_defaults(func=bench_scaling)
+
+    resume = suites.add_parser("resume", help="Time to first heart rate after stop/start, cold vs pooled")
+    resume.add_argument("--bpm", type=float, default=72.0)
+    resume.add_argument("--pauses", type=float, nargs="+", default=[2.0, 10.0])
+    resume.add_argument("--keep", type=float, default=5.0, help="rppg_keep_seconds for the pooled monitor")
+    resume.set_defaults(func=bench_resume)
+
+    startup = suites.add_parser("startup", help="Backend import time and time to a healthy server")
+    startup.add_argument("--runs", type=int, default=3)
+    startup.add_argument("--top", type=int, default=8, help="Slowest imports to list")
+    startup.add_argument("--no-warmup", action="store_true", help="Start with BIOMETRICS_WARMUP=0")
+    startup.add_argument("--history", help="Append the result to this JSON-lines file and compare with the last entry")
+    startup.add_argument("--port", type=int, default=5002)
+    startup.add_argument("--mock-port", type=int, default=8765)
+    startup.set_defaults(func=bench_startup)
+
+    replay = suites.add_parser("replay", help="Backend decision loop over a recorded session, faster than real time")
+    replay.add_argument("--session", help="session directory recorded by the backend (default: generate one)")
+    replay.add_argument("--generate", type=float, default=10.0, help="minutes of scripted session to generate")
+    replay.add_argument("--speed", type=float, default=50.0)
+    replay.add_argument("--mock-port", type=int, default=8766)
+    replay.set_defaults(func=bench_replay)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
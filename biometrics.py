@@ -1,24 +1,75 @@
 import cv2
-import mediapipe as mp
 import numpy as np
 import warnings
+import math
 import os
+import queue
 import threading
 import time
 from collections import deque
 
+from frame_sources import CameraSource
+from metric_subscription import MetricSubscription
+from telemetry import REGISTRY
+
 # Suppress warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 
+# Hot-path timers, bound once so per-frame cost is a single observe()
+_stage_seconds = REGISTRY.histogram('biometrics_stage_seconds', 'Per-frame time spent in each biometrics stage')
+CAPTURE_SECONDS = _stage_seconds.labels(stage='capture')
+COLOR_CONVERSION_SECONDS = _stage_seconds.labels(stage='color_conversion')
+FACE_DETECTION_SECONDS = _stage_seconds.labels(stage='face_detection')
+FACE_MESH_SECONDS = _stage_seconds.labels(stage='face_mesh')
+RPPG_SECONDS = _stage_seconds.labels(stage='rppg')
+BLINK_SECONDS = _stage_seconds.labels(stage='blink')
+FRAME_LATENCY_SECONDS = REGISTRY.histogram(
+    'biometrics_frame_latency_seconds', 'Capture to metrics update latency per frame').labels()
+FRAMES_DROPPED = REGISTRY.counter('biometrics_frames_dropped_total', 'Frames dropped by the pipeline')
+
 
 class SimpleRPPG:
-    """Simple rPPG implementation using green channel FFT"""
-    def __init__(self, buffer_size=150, fps=30):
+    """Simple rPPG implementation using a sliding DFT over the heart-rate band.
+
+    Samples live in a fixed NumPy ring buffer and only the DFT bins that can
+    fall between min_freq and max_freq are tracked, so each new sample costs
+    O(bins) instead of a full FFT over the window. Bin frequencies depend on
+    the rate samples actually arrive at, which drops by the pipeline push
+    below `fps`; it is estimated from the sample timestamps (gaps over
+    `max_gap` seconds, such as a pause, are left out) and bins are tracked
+    for rates down to `min_rate`.
+    """
+    def __init__(self, buffer_size=150, fps=30, min_freq=0.8, max_freq=3.0, resync_interval=None,
+                 min_rate=None, max_gap=1.0):
         self.buffer_size = buffer_size
         self.fps = fps
-        self.green_values = deque(maxlen=buffer_size)
-        self.timestamps = deque(maxlen=buffer_size)
+        self.min_freq = min_freq
+        self.max_freq = max_freq
+        self.max_gap = max_gap
+        self.green_values = np.zeros(buffer_size)
+        self.timestamps = np.zeros(buffer_size)
+        self._head = 0
+        self._count = 0
+        
+        # Seconds from each sample to the one before it (0 when unknown or a gap), summed as we go
+        self._intervals = np.zeros(buffer_size)
+        self._interval_sum = 0.0
+        self._interval_count = 0
+        self._last_timestamp = None
+        
+        # Only bins that can land inside the heart-rate band at rates from min_rate to fps are needed
+        min_rate = min_rate or fps / 3
+        first = max(1, math.ceil(min_freq * buffer_size / fps))
+        last = min(buffer_size // 2, math.floor(max_freq * buffer_size / min_rate))
+        self._bins = np.arange(first, last + 1)
+        self._twiddle = np.exp(2j * np.pi * self._bins / buffer_size)
+        self._basis = np.exp(-2j * np.pi * np.outer(self._bins, np.arange(buffer_size)) / buffer_size)
+        self._spectrum = np.zeros(len(self._bins), dtype=complex)
+        
+        # Periodically recompute the bins exactly to cancel floating point drift
+        self.resync_interval = resync_interval or buffer_size
+        self._since_resync = 0
         
     def process_frame(self, frame, face_roi=None):
         """Extract green channel average from face region"""
@@ -33,39 +84,88 @@ class SimpleRPPG:
             green_channel = face_region[:, :, 1]
             green_avg = np.mean(green_channel)
             
-            self.green_values.append(green_avg)
-            self.timestamps.append(time.time())
-            
-            if len(self.green_values) >= self.buffer_size:
-                return self.calculate_heart_rate()
-            
-            return 0
+            return self.add_sample(green_avg)
             
         except Exception as e:
             return 0
     
+    def add_sample(self, value, timestamp=None):
+        """Push one green channel sample and return the current heart rate (0 until the buffer is full).
+
+        Without a timestamp the sample is taken to follow the previous one at `fps`.
+        """
+        if timestamp is None:
+            timestamp = time.time() if self._last_timestamp is None else self._last_timestamp + 1 / self.fps
+        interval = float(timestamp - self._last_timestamp) if self._last_timestamp is not None else 0.0
+        if not 0 < interval <= self.max_gap:
+            interval = 0.0
+        self._last_timestamp = timestamp
+        
+        oldest = self.green_values[self._head]
+        oldest_interval = float(self._intervals[self._head])
+        self.green_values[self._head] = value
+        self.timestamps[self._head] = timestamp
+        self._intervals[self._head] = interval
+        self._interval_sum += interval - oldest_interval
+        self._interval_count += int(interval > 0) - int(oldest_interval > 0)
+        self._head = (self._head + 1) % self.buffer_size
+        self._count = min(self._count + 1, self.buffer_size)
+        
+        self._since_resync += 1
+        if self._since_resync >= self.resync_interval:
+            self._resync()
+        else:
+            # Sliding DFT: drop the oldest sample, add the newest, rotate
+            self._spectrum = (self._spectrum + (value - oldest)) * self._twiddle
+        
+        if self._count >= self.buffer_size:
+            return self.calculate_heart_rate()
+        
+        return 0
+    
+    def _resync(self):
+        """Recompute the tracked bins directly from the ring buffer (O(N * bins))"""
+        ordered = np.roll(self.green_values, -self._head)
+        self._spectrum = self._basis @ ordered
+        self._interval_sum = float(self._intervals.sum())
+        self._interval_count = int(np.count_nonzero(self._intervals))
+        self._since_resync = 0
+    
+    def effective_rate(self):
+        """Samples per second over the buffered window (`fps` until two samples have arrived)"""
+        if self._interval_count == 0 or self._interval_sum <= 0:
+            return float(self.fps)
+        return self._interval_count / self._interval_sum
+    
+    def reset(self):
+        """Discard all buffered samples"""
+        self.green_values[:] = 0
+        self.timestamps[:] = 0
+        self._intervals[:] = 0
+        self._interval_sum = 0.0
+        self._interval_count = 0
+        self._last_timestamp = None
+        self._head = 0
+        self._count = 0
+        self._spectrum[:] = 0
+        self._since_resync = 0
+    
     def calculate_heart_rate(self):
-        """Calculate heart rate from green channel signal using FFT"""
+        """Calculate heart rate from the tracked heart-rate band bins"""
         try:
-            if len(self.green_values) < 60:
+            if self._count < min(60, self.buffer_size) or len(self._bins) == 0:
                 return 0
-                
-            signal = np.array(list(self.green_values))
-            signal = signal - np.mean(signal)
-            
-            fft = np.fft.fft(signal)
-            freqs = np.fft.fftfreq(len(signal), 1/self.fps)
-            
-            valid_idx = np.where((freqs >= 0.8) & (freqs <= 3.0))[0]
             
-            if len(valid_idx) == 0:
+            # Bin k is k cycles per window, whatever rate the window was sampled at
+            freqs = self._bins * self.effective_rate() / self.buffer_size
+            in_band = (freqs >= self.min_freq) & (freqs <= self.max_freq)
+            if not in_band.any():
                 return 0
             
-            fft_abs = np.abs(fft[valid_idx])
-            peak_idx = valid_idx[np.argmax(fft_abs)]
-            peak_freq = abs(freqs[peak_idx])
+            # The mean only affects the DC bin, so no detrending is needed here
+            peak_idx = np.argmax(np.where(in_band, np.abs(self._spectrum), -1.0))
             
-            hr = peak_freq * 60
+            hr = freqs[peak_idx] * 60
             
             if 45 <= hr <= 180:
                 return hr
@@ -75,61 +175,289 @@ class SimpleRPPG:
             return 0
 
 
+# FaceMesh landmarks bounding the forehead (upper sides, hairline, glabella)
+FOREHEAD_LANDMARKS = (109, 338, 10, 9)
+
+
+def forehead_roi_from_landmarks(landmarks, frame_width, frame_height, min_size=8):
+    """Pixel (x, y, w, h) forehead ROI from FaceMesh landmarks, or None if too small"""
+    xs = [landmarks[i].x for i in FOREHEAD_LANDMARKS]
+    ys = [landmarks[i].y for i in FOREHEAD_LANDMARKS]
+    
+    x0 = max(0, int(min(xs) * frame_width))
+    y0 = max(0, int(min(ys) * frame_height))
+    x1 = min(frame_width, int(max(xs) * frame_width))
+    y1 = min(frame_height, int(max(ys) * frame_height))
+    
+    if x1 - x0 < min_size or y1 - y0 < min_size:
+        return None
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+class BlinkDetector:
+    """Counts blinks from the eye aspect ratio with an open/closed latch"""
+    def __init__(self, threshold=0.012, window_seconds=60):
+        self.threshold = threshold
+        self.window_seconds = window_seconds
+        self.blink_count = 0
+        self.blinks_per_minute = 0.0
+        self.blink_timestamps = deque()
+        self.eye_closed = False
+    
+    def update(self, ear, timestamp):
+        """Feed one EAR reading; returns True when a new blink starts"""
+        if ear >= self.threshold:
+            self.eye_closed = False
+            return False
+        if self.eye_closed:
+            return False
+        
+        self.eye_closed = True
+        self.blink_count += 1
+        self.blink_timestamps.append(timestamp)
+        self._update_blinks_per_minute(timestamp)
+        return True
+    
+    def _update_blinks_per_minute(self, current_time):
+        """Calculate blinks per minute"""
+        cutoff_time = current_time - self.window_seconds
+        
+        while self.blink_timestamps and self.blink_timestamps[0] < cutoff_time:
+            self.blink_timestamps.popleft()
+        
+        num_blinks = len(self.blink_timestamps)
+        if num_blinks > 0:
+            time_span = current_time - self.blink_timestamps[0]
+            if time_span > 0:
+                self.blinks_per_minute = (num_blinks / time_span) * 60
+            else:
+                self.blinks_per_minute = 0.0
+        else:
+            self.blinks_per_minute = 0.0
+
+
+class LatestFrameSlot:
+    """Single-slot mailbox that only ever holds the newest item.
+    
+    Putting a new item overwrites an unread one (counted in `dropped`), so
+    slow consumers always work on fresh data instead of a growing backlog.
+    After close(), blocked and later puts return at once without the item.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+        self._closed = False
+        self.dropped = 0
+        
+    def put(self, item, block=False, timeout=None):
+        """Publish item; with block=True wait for the previous one to be taken instead of dropping it"""
+        with self._cond:
+            if block and self._item is not None:
+                self._cond.wait_for(lambda: self._item is None or self._closed, timeout)
+            if self._closed:
+                return
+            if self._item is not None:
+                self.dropped += 1
+            self._seq += 1
+            self._item = (self._seq, item)
+            self._cond.notify()
+    
+    def get(self, timeout=None):
+        """Take the newest (seq, item), or None if nothing arrived within timeout"""
+        with self._cond:
+            if self._item is None:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            self._cond.notify_all()
+            return item
+    
+    def empty(self):
+        with self._cond:
+            return self._item is None
+    
+    def wake_all(self):
+        with self._cond:
+            self._cond.notify_all()
+    
+    def close(self):
+        """Release every blocked put (dropping its item) and get"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+    
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+
+
+def warm_up(monitor=None):
+    """Load mediapipe and run one FaceMesh/FaceDetection pass, so the first monitor starts fast.
+
+    With a monitor the pass goes through that monitor's own graphs instead
+    of a throwaway pair. Returns the seconds it took. Safe to call from a
+    background thread, as long as nothing else is using the monitor yet.
+    """
+    start = time.perf_counter()
+    blank = np.zeros((480, 640, 3), dtype=np.uint8)
+    if monitor is not None:
+        monitor.face_mesh.process(blank)
+        monitor.face_detection.process(blank)
+        return time.perf_counter() - start
+
+    import mediapipe as mp
+
+    with mp.solutions.face_mesh.FaceMesh(refine_landmarks=True) as face_mesh, \
+            mp.solutions.face_detection.FaceDetection() as face_detection:
+        face_mesh.process(blank)
+        face_detection.process(blank)
+    return time.perf_counter() - start
+
+
 class BiometricsMonitor:
-    """Thread-safe biometrics monitor using webcam and MediaPipe"""
+    """Thread-safe biometrics monitor using webcam and MediaPipe.
+    
+    Frames flow through three stages connected by bounded hand-offs:
+    capture (newest frame + timestamp in a LatestFrameSlot), inference
+    (`inference_workers` threads running MediaPipe, skipping frames older
+    than `max_frame_age`) and aggregation (one thread feeding rPPG and
+    blink state in frame order). Every hand-off drops instead of queueing.
     
-    def __init__(self, camera_index=0, fps=30, blink_window_seconds=60, show_ui=False):
+    pause() idles the pipeline without tearing it down: the threads and
+    face models stay, a live camera is either released or kept open at
+    `idle_fps` (`keep_camera_open`), and the rPPG buffer is kept, so a
+    resume within `rppg_keep_seconds` reports heart rate straight away.
+    """
+    
+    def __init__(self, camera_index=0, fps=30, blink_window_seconds=60, show_ui=False, roi_source="mesh",
+                 inference_workers=1, max_frame_age=0.25, aggregation_queue_size=8, source=None,
+                 keep_camera_open=False, idle_fps=2.0, rppg_keep_seconds=30.0):
         self.camera_index = camera_index
+        # Any frame_sources.FrameSource; defaults to the webcam
+        self.source = source if source is not None else CameraSource(camera_index, fps=fps)
         self.fps = fps
         self.blink_window_seconds = blink_window_seconds
         self.show_ui = show_ui
+        # "mesh": forehead ROI from FaceMesh, detector only as a fallback
+        # "detection": always run FaceDetection for the ROI
+        self.roi_source = roi_source
+        self.inference_workers = max(1, inference_workers)
+        self.max_frame_age = max_frame_age
+        self.keep_camera_open = keep_camera_open
+        self.idle_fps = idle_fps
+        self.rppg_keep_seconds = rppg_keep_seconds
         
         self._lock = threading.Lock()
         self._heart_rate = 0.0
         self._blinks_per_minute = 0.0
         self._blink_count = 0
+        # Bumped whenever a metric changes; subscribers wait on _changed
+        self._changed = threading.Condition(self._lock)
+        self._version = 0
+        self._wakeups = 0
         self._latest_frame = None
         
-        self._blink_timestamps = deque()
+        self.blink_detector = BlinkDetector(window_seconds=blink_window_seconds)
         
         self._running = False
-        self._thread = None
-        self._eye_closed = False
+        self._threads = []
+        self._paused_at = None
+        self._resumed = threading.Event()
+        
+        # Stage hand-offs
+        self._frame_slot = LatestFrameSlot()
+        self._results = queue.Queue(maxsize=aggregation_queue_size)
+        self._stats = {
+            'frames_captured': 0,
+            'capture_failures': 0,
+            'frames_inferred': 0,
+            'stale_frames_dropped': 0,
+            'results_dropped': 0,
+            'out_of_order_dropped': 0,
+            'frames_aggregated': 0,
+        }
+        self._latency_ms = 0.0
+        self._started_at = None
         
         # Initialize custom rPPG
         self.rppg = SimpleRPPG(buffer_size=150, fps=fps)
         
-        # Initialize MediaPipe
+        # Initialize MediaPipe (extra inference workers build their own graphs).
+        # Imported here: mediapipe takes most of a second to load, and only monitors need it
+        import mediapipe as mp
+
         self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
+        self.mp_face_detection = mp.solutions.face_detection
+        self.face_mesh, self.face_detection = self._create_models()
+    
+    def _create_models(self):
+        """Build one FaceMesh / FaceDetection pair (MediaPipe graphs are not shareable across threads)"""
+        face_mesh = self.mp_face_mesh.FaceMesh(
             refine_landmarks=True,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
-        
-        self.mp_face_detection = mp.solutions.face_detection
-        self.face_detection = self.mp_face_detection.FaceDetection(min_detection_confidence=0.5)
+        face_detection = self.mp_face_detection.FaceDetection(min_detection_confidence=0.5)
+        return face_mesh, face_detection
         
     def start(self):
-        """Start monitoring thread"""
+        """Start the capture, inference and aggregation threads (or resume a paused monitor)"""
         if self._running:
+            if self._paused_at is not None:
+                self.resume()
+                return
             print("BiometricsMonitor already running")
             return
             
         self._running = True
-        self._thread = threading.Thread(target=self._monitor_loop, daemon=True)
-        self._thread.start()
-        print("BiometricsMonitor started")
+        self._frame_slot.reopen()
+        self._started_at = time.time()
+        self._threads = [threading.Thread(target=self._capture_loop, daemon=True)]
+        for worker_id in range(self.inference_workers):
+            self._threads.append(threading.Thread(target=self._inference_loop, args=(worker_id,), daemon=True))
+        self._threads.append(threading.Thread(target=self._aggregate_loop, daemon=True))
+        
+        for thread in self._threads:
+            thread.start()
+        print(f"BiometricsMonitor started ({self.inference_workers} inference worker(s))")
         
     def stop(self):
-        """Stop monitoring thread"""
+        """Stop all pipeline threads"""
         if not self._running:
             return
             
         self._running = False
-        if self._thread:
-            self._thread.join(timeout=2.0)
+        self._paused_at = None
+        self._resumed.set()
+        self._frame_slot.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
         print("BiometricsMonitor stopped")
+    
+    def pause(self):
+        """Stop feeding frames through the pipeline, keeping everything needed to resume()"""
+        if not self._running or self._paused_at is not None:
+            return
+        self._resumed.clear()
+        self._paused_at = time.time()
+        print("BiometricsMonitor paused")
+    
+    def resume(self):
+        """Continue after pause(); the last heart rate stands if the pause was short enough"""
+        if self._paused_at is None:
+            return
+        paused_for = time.time() - self._paused_at
+        if paused_for > self.rppg_keep_seconds:
+            # Too old to stand in for the current pulse: measure from scratch
+            self.rppg.reset()
+            with self._lock:
+                if self._heart_rate:
+                    self._heart_rate = 0.0
+                    self._metrics_changed()
+        self._paused_at = None
+        self._resumed.set()
+        print(f"BiometricsMonitor resumed after {paused_for:.1f}s")
         
     def get_metrics(self):
         """Get current biometric metrics (thread-safe)"""
@@ -140,90 +468,241 @@ class BiometricsMonitor:
         """Get total blink count"""
         with self._lock:
             return self._blink_count
-            
-    def _update_blinks_per_minute(self):
-        """Calculate blinks per minute"""
-        current_time = time.time()
-        cutoff_time = current_time - self.blink_window_seconds
-        
-        while self._blink_timestamps and self._blink_timestamps[0] < cutoff_time:
-            self._blink_timestamps.popleft()
+    
+    def wait_for_update(self, version, timeout=None):
+        """Block until the metrics differ from `version` (or timeout / wake_subscribers).
         
-        num_blinks = len(self._blink_timestamps)
-        if num_blinks > 0:
-            time_span = current_time - self._blink_timestamps[0]
-            if time_span > 0:
-                self._blinks_per_minute = (num_blinks / time_span) * 60
-            else:
-                self._blinks_per_minute = 0.0
-        else:
-            self._blinks_per_minute = 0.0
+        Returns (version, {'heart_rate', 'blinks_per_minute', 'blink_count'}).
+        """
+        with self._changed:
+            wakeups = self._wakeups
+            self._changed.wait_for(lambda: self._version != version or self._wakeups != wakeups, timeout)
+            return self._version, {
+                'heart_rate': self._heart_rate,
+                'blinks_per_minute': self._blinks_per_minute,
+                'blink_count': self._blink_count,
+            }
+    
+    def wake_subscribers(self):
+        """Release every wait_for_update call so cancelled subscribers can exit"""
+        with self._changed:
+            self._wakeups += 1
+            self._changed.notify_all()
     
-    def _monitor_loop(self):
-        """Main monitoring loop"""
-        cap = cv2.VideoCapture(self.camera_index)
+    def subscribe(self, callback, min_delta=0.5, max_rate=5.0):
+        """Push metrics to callback when they change; see MetricSubscription"""
+        return MetricSubscription(self, callback, min_delta=min_delta, max_rate=max_rate)
+    
+    def _metrics_changed(self):
+        """Wake subscribers; call with _lock held after changing a metric"""
+        self._version += 1
+        self._changed.notify_all()
+    
+    def get_pipeline_stats(self):
+        """Per-stage counters, drop counts, the rPPG sample rate and capture-to-metrics latency"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['latency_ms'] = round(self._latency_ms, 2)
+        stats['capture_overwritten'] = self._frame_slot.dropped
+        elapsed = time.time() - self._started_at if self._started_at else 0
+        stats['effective_fps'] = round(stats['frames_aggregated'] / elapsed, 2) if elapsed > 0 else 0.0
+        stats['rppg_sample_rate'] = round(self.rppg.effective_rate(), 2)
+        return stats
+    
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+            
+    def _capture_loop(self):
+        """Stage 1: keep the newest frame and its timestamp in the frame slot"""
+        source = self.source
         
-        if not cap.isOpened():
+        if not source.open():
             print("❌ ERROR: Could not open camera!")
             self._running = False
+            self._frame_slot.wake_all()
             return
         
         print("✅ Camera opened successfully. Starting biometrics monitoring...")
-        frame_count = 0
         
         try:
             while self._running:
-                success, frame = cap.read()
+                if self._paused_at is not None:
+                    self._idle_capture(source)
+                    continue
+                with CAPTURE_SECONDS.time():
+                    success, frame = source.read()
                 if not success:
+                    self._count('capture_failures')
+                    if not source.live:
+                        break
                     continue
                 
-                frame_count += 1
+                self._count('frames_captured')
+                self._latest_frame = frame
+                # Offline sources are consumed losslessly; live frames overwrite stale ones
+                self._frame_slot.put((source.frame_time, time.time(), frame), block=not source.live)
+            
+            # End of an offline source: let the pipeline drain, then stop
+            while self._running and not (self._frame_slot.empty() and self._results.empty()):
+                time.sleep(0.01)
+            self._running = False
                 
-                # Get face ROI
-                face_roi = None
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                face_results = self.face_detection.process(rgb_frame)
+        except Exception as e:
+            print(f"❌ Capture loop error: {e}")
+            self._running = False
+        finally:
+            source.release()
+            self._frame_slot.wake_all()
+    
+    def _idle_capture(self, source):
+        """Capture while paused: read a live camera at idle_fps and drop the frames, or release it until resumed"""
+        if self.keep_camera_open and source.live:
+            source.read()
+            self._resumed.wait(1.0 / self.idle_fps)
+            return
+        source.release()
+        self._resumed.wait()
+        if self._running and not source.open():
+            print("❌ ERROR: Could not reopen camera!")
+            self._running = False
+    
+    def _inference_loop(self, worker_id):
+        """Stage 2: run MediaPipe on fresh frames and hand compact results to aggregation"""
+        if worker_id == 0:
+            face_mesh, face_detection = self.face_mesh, self.face_detection
+        else:
+            face_mesh, face_detection = self._create_models()
+        
+        try:
+            while self._running:
+                item = self._frame_slot.get(timeout=0.1)
+                if item is None:
+                    continue
+                seq, (timestamp, captured_at, frame) = item
                 
-                if face_results.detections:
-                    detection = face_results.detections[0]
-                    bbox = detection.location_data.relative_bounding_box
-                    h, w = frame.shape[:2]
-                    x = int(bbox.xmin * w)
-                    y = int(bbox.ymin * h)
-                    width = int(bbox.width * w)
-                    height = int(bbox.height * h)
-                    face_roi = (max(0, x), max(0, y), width, height)
+                # Never spend inference time on a live frame that is already stale
+                if self.source.live and time.time() - captured_at > self.max_frame_age:
+                    self._count('stale_frames_dropped')
+                    FRAMES_DROPPED.labels(reason='stale').inc()
+                    continue
                 
-                # Heart rate processing
-                hr = self.rppg.process_frame(frame, face_roi)
+                green_avg, ear = self._infer_frame(frame, face_mesh, face_detection)
+                self._count('frames_inferred')
                 
-                if hr > 0:
-                    with self._lock:
-                        self._heart_rate = round(hr, 1)
+                try:
+                    if self.source.live:
+                        self._results.put_nowait((seq, timestamp, captured_at, green_avg, ear))
+                    else:
+                        self._results.put((seq, timestamp, captured_at, green_avg, ear))
+                except queue.Full:
+                    self._count('results_dropped')
+                    FRAMES_DROPPED.labels(reason='aggregation_full').inc()
+                    
+        except Exception as e:
+            print(f"❌ Inference worker {worker_id} error: {e}")
+        finally:
+            if worker_id != 0:
+                face_mesh.close()
+                face_detection.close()
+    
+    def _infer_frame(self, frame, face_mesh, face_detection):
+        """Return (green channel ROI mean, eye aspect ratio or None) for one frame"""
+        with COLOR_CONVERSION_SECONDS.time():
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        h, w = frame.shape[:2]
+        
+        # Face mesh drives both the rPPG ROI and blink detection
+        with FACE_MESH_SECONDS.time():
+            mesh_results = face_mesh.process(rgb_frame)
+        landmarks = None
+        if mesh_results.multi_face_landmarks:
+            landmarks = mesh_results.multi_face_landmarks[0].landmark
+        
+        # Get face ROI
+        face_roi = None
+        if self.roi_source == "mesh" and landmarks is not None:
+            face_roi = forehead_roi_from_landmarks(landmarks, w, h)
+        
+        # Detector only runs when the mesh could not provide a ROI
+        if face_roi is None:
+            with FACE_DETECTION_SECONDS.time():
+                face_results = face_detection.process(rgb_frame)
+            
+            if face_results.detections:
+                detection = face_results.detections[0]
+                bbox = detection.location_data.relative_bounding_box
+                x = int(bbox.xmin * w)
+                y = int(bbox.ymin * h)
+                width = int(bbox.width * w)
+                height = int(bbox.height * h)
+                face_roi = (max(0, x), max(0, y), width, height)
+        
+        if face_roi is not None:
+            x, y, rw, rh = face_roi
+            face_region = frame[y:y+rh, x:x+rw]
+        else:
+            face_region = frame[h//4:3*h//4, w//4:3*w//4]
+        green_avg = float(np.mean(face_region[:, :, 1])) if face_region.size else None
+        
+        ear = None
+        if landmarks is not None:
+            left_eye_top = landmarks[159].y
+            left_eye_bot = landmarks[145].y
+            right_eye_top = landmarks[386].y
+            right_eye_bot = landmarks[374].y
+            
+            ear = ((left_eye_bot - left_eye_top) + (right_eye_bot - right_eye_top)) / 2.0
+        
+        return green_avg, ear
+    
+    def _aggregate_loop(self):
+        """Stage 3: fold inference results into rPPG and blink state in frame order"""
+        last_seq = 0
+        frame_count = 0
+        
+        try:
+            while self._running or not self._results.empty():
+                try:
+                    seq, timestamp, captured_at, green_avg, ear = self._results.get(timeout=0.1)
+                except queue.Empty:
+                    continue
                 
-                # Blink detection
-                mesh_results = self.face_mesh.process(rgb_frame)
+                # Parallel workers can finish out of order; older results are useless now
+                if seq <= last_seq:
+                    self._count('out_of_order_dropped')
+                    FRAMES_DROPPED.labels(reason='out_of_order').inc()
+                    continue
+                last_seq = seq
+                frame_count += 1
                 
-                if mesh_results.multi_face_landmarks:
-                    landmarks = mesh_results.multi_face_landmarks[0].landmark
-                    
-                    left_eye_top = landmarks[159].y
-                    left_eye_bot = landmarks[145].y
-                    right_eye_top = landmarks[386].y
-                    right_eye_bot = landmarks[374].y
-                    
-                    ear = ((left_eye_bot - left_eye_top) + (right_eye_bot - right_eye_top)) / 2.0
+                # Heart rate processing
+                if green_avg is not None:
+                    with RPPG_SECONDS.time():
+                        hr = self.rppg.add_sample(green_avg, timestamp)
                     
-                    if ear < 0.012:
-                        if not self._eye_closed:
-                            current_time = time.time()
-                            with self._lock:
-                                self._blink_count += 1
-                                self._blink_timestamps.append(current_time)
-                                self._update_blinks_per_minute()
-                            self._eye_closed = True
-                    else:
-                        self._eye_closed = False
+                    if hr > 0:
+                        with self._lock:
+                            if round(hr, 1) != self._heart_rate:
+                                self._heart_rate = round(hr, 1)
+                                self._metrics_changed()
+                
+                # Blink detection
+                if ear is not None:
+                    with BLINK_SECONDS.time():
+                        blinked = self.blink_detector.update(ear, timestamp)
+                    if blinked:
+                        with self._lock:
+                            self._blink_count = self.blink_detector.blink_count
+                            self._blinks_per_minute = self.blink_detector.blinks_per_minute
+                            self._metrics_changed()
+                
+                latency = time.time() - captured_at
+                FRAME_LATENCY_SECONDS.observe(latency)
+                latency_ms = latency * 1000
+                with self._lock:
+                    self._stats['frames_aggregated'] += 1
+                    self._latency_ms = 0.9 * self._latency_ms + 0.1 * latency_ms
                 
                 # Debug output every 30 frames
                 if frame_count % 30 == 0:
@@ -231,7 +710,7 @@ class BiometricsMonitor:
                     print(f"📊 Frame {frame_count}: HR={hr_display:.1f} BPM, Blinks/min={bpm_display:.1f}, Total blinks={self._blink_count}")
                 
                 if self.show_ui and self._latest_frame is not None:
-                    display_frame = frame.copy()
+                    display_frame = self._latest_frame.copy()
                     hr_display, bpm_display = self.get_metrics()
                     
                     hr_color = (0, 255, 0) if hr_display > 0 else (0, 0, 255)
@@ -247,13 +726,11 @@ class BiometricsMonitor:
                         self._running = False
                         break
                 
-                time.sleep(0.01)
-                
         except Exception as e:
-            print(f"❌ Monitor loop error: {e}")
+            print(f"❌ Aggregation loop error: {e}")
         finally:
-            cap.release()
-            cv2.destroyAllWindows()
+            if self.show_ui:
+                cv2.destroyAllWindows()
             print(f"✅ Monitor stopped. Total frames: {frame_count}")
 
 
@@ -0,0 +1,177 @@
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from metric_subscription import MetricSubscription
+
+# Shared float64 slots written by the worker and read by the proxy.
+# SEQ is a seqlock counter: odd while the worker is mid-write.
+# VERSION is the worker monitor's metrics version (changes only with the metrics).
+SEQ, HEART_RATE, BLINKS_PER_MINUTE, BLINK_COUNT, HEARTBEAT, VERSION = range(6)
+NUM_SLOTS = 6
+
+# A write is a handful of stores; a reader still seeing an odd SEQ after this
+# many tries is looking at a stalled or dead worker
+READ_RETRIES = 1000
+
+
+def _worker_main(shm_name, stop_event, changed, monitor_kwargs, publish_interval):
+    """Child process entry point: run a BiometricsMonitor and publish its metrics"""
+    from biometrics import BiometricsMonitor
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray((NUM_SLOTS,), dtype=np.float64, buffer=shm.buf)
+
+    monitor = BiometricsMonitor(**monitor_kwargs)
+    monitor.start()
+    try:
+        version = 0
+        while not stop_event.is_set():
+            # Publish as soon as metrics change, and every publish_interval as a heartbeat
+            new_version, metrics = monitor.wait_for_update(version, timeout=publish_interval)
+
+            slots[SEQ] += 1
+            slots[HEART_RATE] = metrics['heart_rate']
+            slots[BLINKS_PER_MINUTE] = metrics['blinks_per_minute']
+            slots[BLINK_COUNT] = metrics['blink_count']
+            slots[HEARTBEAT] = time.time()
+            slots[VERSION] = new_version
+            slots[SEQ] += 1
+
+            if new_version != version:
+                version = new_version
+                with changed:
+                    changed.notify_all()
+    finally:
+        monitor.stop()
+        del slots
+        shm.close()
+
+
+class ProcessBiometricsMonitor:
+    """BiometricsMonitor proxy whose capture and inference run in a child process.
+
+    The child publishes metrics into a small shared-memory block, so reads
+    here never touch a pipe or the GIL-heavy vision stack. Exposes the same
+    start/stop/get_metrics/get_blink_count/subscribe API as BiometricsMonitor;
+    the worker signals metric changes through a cross-process condition.
+    """
+
+    def __init__(self, publish_interval=0.05, **monitor_kwargs):
+        self.publish_interval = publish_interval
+        self.monitor_kwargs = monitor_kwargs
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._shm = None
+        self._slots = None
+        self._stop_event = None
+        self._process = None
+        self._changed = self._ctx.Condition()
+        self._wakeups = 0
+        self._shm_lock = threading.Lock()  # held while reading the slots and while tearing them down
+        self._last_read = np.zeros(NUM_SLOTS)
+
+    @property
+    def _running(self):
+        return self._process is not None and self._process.is_alive()
+
+    def start(self):
+        """Spawn the worker process"""
+        if self._process is not None:
+            print("ProcessBiometricsMonitor already running")
+            return
+
+        self._shm = shared_memory.SharedMemory(create=True, size=NUM_SLOTS * 8)
+        self._slots = np.ndarray((NUM_SLOTS,), dtype=np.float64, buffer=self._shm.buf)
+        self._slots[:] = 0
+
+        self._stop_event = self._ctx.Event()
+        self._process = self._ctx.Process(
+            target=_worker_main,
+            args=(self._shm.name, self._stop_event, self._changed, self.monitor_kwargs, self.publish_interval),
+            daemon=True,
+        )
+        self._process.start()
+        print(f"ProcessBiometricsMonitor started (pid {self._process.pid})")
+
+    def stop(self):
+        """Stop the worker process and release the shared memory"""
+        if self._process is None:
+            return
+
+        self._stop_event.set()
+        self._process.join(timeout=5.0)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=1.0)
+        self._process = None
+
+        with self._shm_lock:
+            self._slots = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+            self._last_read = np.zeros(NUM_SLOTS)
+        print("ProcessBiometricsMonitor stopped")
+
+    def _read(self):
+        """Consistent snapshot of the shared slots (retries while the worker is mid-write).
+
+        If the worker died mid-write, or is stuck in one, the last consistent
+        snapshot is returned instead of spinning forever.
+        """
+        with self._shm_lock:
+            slots = self._slots
+            if slots is None:
+                return np.zeros(NUM_SLOTS)
+            for attempt in range(READ_RETRIES):
+                seq = slots[SEQ]
+                snapshot = slots.copy()
+                if seq % 2 == 0 and slots[SEQ] == seq:
+                    self._last_read = snapshot
+                    return snapshot
+                if attempt % 64 == 63 and not self._running:
+                    break
+            return self._last_read.copy()
+
+    def get_metrics(self):
+        """Get current biometric metrics"""
+        snapshot = self._read()
+        return float(snapshot[HEART_RATE]), float(snapshot[BLINKS_PER_MINUTE])
+
+    def get_blink_count(self):
+        """Get total blink count"""
+        return int(self._read()[BLINK_COUNT])
+
+    def wait_for_update(self, version, timeout=None):
+        """Block until the published metrics differ from `version` (or timeout / wake_subscribers).
+
+        Returns (version, {'heart_rate', 'blinks_per_minute', 'blink_count'}).
+        """
+        with self._changed:
+            wakeups = self._wakeups
+            self._changed.wait_for(lambda: self._read()[VERSION] != version or self._wakeups != wakeups, timeout)
+        snapshot = self._read()
+        return snapshot[VERSION], {
+            'heart_rate': float(snapshot[HEART_RATE]),
+            'blinks_per_minute': float(snapshot[BLINKS_PER_MINUTE]),
+            'blink_count': int(snapshot[BLINK_COUNT]),
+        }
+
+    def wake_subscribers(self):
+        """Release every wait_for_update call so cancelled subscribers can exit"""
+        with self._changed:
+            self._wakeups += 1
+            self._changed.notify_all()
+
+    def subscribe(self, callback, min_delta=0.5, max_rate=5.0):
+        """Push metrics to callback when they change; see MetricSubscription"""
+        return MetricSubscription(self, callback, min_delta=min_delta, max_rate=max_rate)
+
+    def seconds_since_update(self):
+        """Age of the last published metrics, or None before the first publish"""
+        heartbeat = self._read()[HEARTBEAT]
+        return time.time() - heartbeat if heartbeat else None
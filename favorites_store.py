@@ -0,0 +1,316 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+
+from music_cache import connect_wal
+from telemetry import REGISTRY
+
+FAVORITES_COMMIT_SECONDS = REGISTRY.histogram('favorites_commit_seconds', 'Favorites group commit latency').labels()
+FAVORITES_BATCH_SIZE = REGISTRY.histogram('favorites_commit_batch_size', 'Writes per favorites group commit',
+                                          buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)).labels()
+
+
+def favorite_key(track):
+    return (track['name'], track['artist'])
+
+
+class FavoritesStore:
+    """Favorite tracks indexed by (name, artist), persisted to SQLite.
+
+    Membership, add and remove by key are dict operations on an in-memory
+    insertion-ordered index. Writes are queued and a background writer
+    commits everything that has queued up in one transaction (group
+    commit), so handlers never wait on disk; whatever is still queued is
+    flushed at interpreter exit. Once more rows have been deleted than are
+    live, the database is vacuumed to reclaim the space, at most once
+    every `compact_interval` seconds.
+
+    Every add and remove gets the next version number and is kept in a
+    bounded change log, so clients can catch up from the version they last
+    saw (changes_since) instead of re-downloading the list. Versions are
+    only comparable within one `epoch`, which changes on every restart.
+
+    With shared=True several processes can use the same database: every
+    write is its own transaction that also appends to a change table, so
+    versions and the epoch come from the database and agree everywhere.
+    refresh() pulls in changes other processes made; reads call it first.
+    """
+
+    def __init__(self, path="favorites.db", legacy_json=None, commit_interval=0.02, max_batch=512,
+                 compact_min_deletes=1000, compact_interval=300.0, max_changes=1000, shared=False):
+        self.path = path
+        self.shared = shared
+        self.max_changes = max_changes
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.compact_min_deletes = compact_min_deletes
+        self.compact_interval = compact_interval
+
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # (name, artist) -> track
+        self._snapshot = None
+        self._seq = 0
+        self.epoch = f"{time.time_ns():x}"
+        self._version = 0
+        self._changes = deque(maxlen=max_changes)
+        self._writes = queue.Queue()
+        self._deletes_since_compact = 0
+        self._last_compact = time.time()
+        self._stats = {'commits': 0, 'writes': 0, 'compactions': 0}
+
+        self._db = connect_wal(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS favorites ("
+            "seq INTEGER PRIMARY KEY, name TEXT NOT NULL, artist TEXT NOT NULL, track TEXT NOT NULL, "
+            "UNIQUE (name, artist))"
+        )
+        self._db.commit()
+        if shared:
+            self._open_shared()
+        for seq, track in self._db.execute("SELECT seq, track FROM favorites ORDER BY seq"):
+            track = json.loads(track)
+            self._index[favorite_key(track)] = track
+            self._seq = seq
+
+        if not self._index and legacy_json and os.path.exists(legacy_json):
+            self._import_json(legacy_json)
+
+        REGISTRY.gauge('favorites_count', 'Tracks in the favorites store', fn=lambda: len(self._index))
+        if not shared:
+            threading.Thread(target=self._writer_loop, daemon=True, name="favorites-writer").start()
+            # add/remove return before their commit; don't let exit drop the last batch
+            atexit.register(self.flush)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, track):
+        return favorite_key(track) in self._index
+
+    def all(self):
+        """Every favorite in insertion order (a shared snapshot; do not mutate)"""
+        with self._lock:
+            self._refresh()
+            return self._all()
+
+    def snapshot(self):
+        """{'epoch', 'version', 'favorites'} taken atomically"""
+        with self._lock:
+            self._refresh()
+            return {'epoch': self.epoch, 'version': self._version, 'favorites': self._all()}
+
+    def refresh(self):
+        """Apply changes other processes committed since the last look (shared mode)"""
+        with self._lock:
+            self._refresh()
+
+    def changes_since(self, epoch, version):
+        """Changes after version, or None if the caller needs a full snapshot instead"""
+        with self._lock:
+            self._refresh()
+            if epoch != self.epoch or version is None or version > self._version:
+                return None
+            missed = self._version - version
+            if missed > len(self._changes) or missed > len(self._index):
+                # Fell out of the change log, or the list itself is smaller
+                return None
+            return list(islice(self._changes, len(self._changes) - missed, None))
+
+    def add(self, track):
+        """Append track unless it is already a favorite; returns the change, or None"""
+        key = favorite_key(track)
+        if self.shared:
+            return self._write_shared('add', track)
+        with self._lock:
+            if key in self._index:
+                return None
+            self._index[key] = track
+            self._seq += 1
+            self._writes.put(('put', self._seq, track))
+            return self._record('add', track)
+
+    def remove(self, name, artist):
+        """Remove the favorite with this name and artist; returns the change, or None"""
+        if self.shared:
+            return self._write_shared('remove', {'name': name, 'artist': artist})
+        with self._lock:
+            track = self._index.pop((name, artist), None)
+            if track is None:
+                return None
+            self._writes.put(('delete', name, artist))
+            return self._record('remove', track)
+
+    def remove_at(self, index):
+        """Remove by list position, for the REST API (linear in the position)"""
+        with self._lock:
+            if not 0 <= index < len(self._index):
+                return None
+            key = next(k for i, k in enumerate(self._index) if i == index)
+        return self.remove(*key)
+
+    def flush(self, timeout=5.0):
+        """Block until every write queued so far is committed"""
+        if self.shared:
+            return True  # shared-mode writes commit before returning
+        done = threading.Event()
+        self._writes.put(('flush', done))
+        return done.wait(timeout)
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats['entries'] = len(self._index)
+        stats['version'] = self._version
+        stats['pending'] = self._writes.qsize()
+        return stats
+
+    def _all(self):
+        if self._snapshot is None:
+            self._snapshot = list(self._index.values())
+        return self._snapshot
+
+    def _record(self, op, track):
+        self._snapshot = None
+        self._version += 1
+        change = {'version': self._version, 'op': op, 'track': track}
+        self._changes.append(change)
+        return change
+
+    def _open_shared(self):
+        """Create the shared epoch and change table, and start from their state"""
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS favorites_meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS favorites_changes ("
+                "version INTEGER PRIMARY KEY AUTOINCREMENT, op TEXT NOT NULL, track TEXT NOT NULL)"
+            )
+            self._db.execute("INSERT OR IGNORE INTO favorites_meta (key, value) VALUES ('epoch', ?)", (self.epoch,))
+        self.epoch = self._db.execute("SELECT value FROM favorites_meta WHERE key = 'epoch'").fetchone()[0]
+        rows = self._db.execute(
+            "SELECT version, op, track FROM favorites_changes ORDER BY version DESC LIMIT ?", (self.max_changes,)
+        ).fetchall()
+        for version, op, track in reversed(rows):
+            self._changes.append({'version': version, 'op': op, 'track': json.loads(track)})
+        self._version = rows[0][0] if rows else 0
+
+    def _refresh(self):
+        if not self.shared:
+            return
+        rows = self._db.execute(
+            "SELECT version, op, track FROM favorites_changes WHERE version > ? ORDER BY version", (self._version,)
+        ).fetchall()
+        for version, op, track in rows:
+            self._apply(version, op, json.loads(track))
+
+    def _apply(self, version, op, track):
+        """Mirror a committed change in memory; call with _lock held"""
+        key = favorite_key(track)
+        if op == 'add':
+            self._index[key] = track
+        else:
+            track = self._index.pop(key, track)
+        self._snapshot = None
+        self._version = version
+        change = {'version': version, 'op': op, 'track': track}
+        self._changes.append(change)
+        return change
+
+    def _write_shared(self, op, track):
+        """One add/remove as its own transaction; the database lock orders writers across processes"""
+        start = time.perf_counter()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Nobody else can write now, so after catching up the index is current
+                self._refresh()
+                key = favorite_key(track)
+                if (key in self._index) == (op == 'add'):
+                    self._db.rollback()
+                    return None
+                if op == 'add':
+                    self._db.execute("INSERT INTO favorites (name, artist, track) VALUES (?, ?, ?)",
+                                     (track['name'], track['artist'], json.dumps(track)))
+                else:
+                    track = self._index[key]
+                    self._db.execute("DELETE FROM favorites WHERE name = ? AND artist = ?", key)
+                version = self._db.execute("INSERT INTO favorites_changes (op, track) VALUES (?, ?)",
+                                           (op, json.dumps(track))).lastrowid
+                if version % self.max_changes == 0:
+                    self._db.execute("DELETE FROM favorites_changes WHERE version <= ?",
+                                     (version - self.max_changes,))
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+            change = self._apply(version, op, track)
+        self._stats['commits'] += 1
+        self._stats['writes'] += 1
+        FAVORITES_COMMIT_SECONDS.observe(time.perf_counter() - start)
+        FAVORITES_BATCH_SIZE.observe(1)
+        return change
+
+    def _import_json(self, path):
+        try:
+            with open(path, 'r') as f:
+                tracks = json.load(f)
+        except Exception as e:
+            print(f"Error importing favorites from {path}: {e}")
+            return
+        for track in tracks:
+            self.add(track)
+        print(f"Imported {len(self._index)} favorites from {path}")
+
+    def _writer_loop(self):
+        while True:
+            batch = [self._writes.get()]
+            # Let concurrent writers pile on so they share one commit
+            time.sleep(self.commit_interval)
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch):
+        waiters = [op[1] for op in batch if op[0] == 'flush']
+        ops = [op for op in batch if op[0] != 'flush']
+        start = time.perf_counter()
+        try:
+            with self._db:
+                for op in ops:
+                    if op[0] == 'put':
+                        _, seq, track = op
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO favorites (seq, name, artist, track) VALUES (?, ?, ?, ?)",
+                            (seq, track['name'], track['artist'], json.dumps(track)),
+                        )
+                    else:
+                        _, name, artist = op
+                        self._db.execute("DELETE FROM favorites WHERE name = ? AND artist = ?", (name, artist))
+                        self._deletes_since_compact += 1
+            if ops:
+                self._stats['commits'] += 1
+                self._stats['writes'] += len(ops)
+                FAVORITES_COMMIT_SECONDS.observe(time.perf_counter() - start)
+                FAVORITES_BATCH_SIZE.observe(len(ops))
+            self._maybe_compact()
+        except Exception as e:
+            print(f"Error saving favorites: {e}")
+        for done in waiters:
+            done.set()
+
+    def _maybe_compact(self):
+        deletes = self._deletes_since_compact
+        if deletes < self.compact_min_deletes or deletes < len(self._index):
+            return
+        if time.time() - self._last_compact < self.compact_interval:
+            return
+        self._db.execute("VACUUM")
+        self._deletes_since_compact = 0
+        self._last_compact = time.time()
+        self._stats['compactions'] += 1
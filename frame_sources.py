@@ -0,0 +1,212 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+class FrameSource:
+    """Base class for frames fed into BiometricsMonitor.
+
+    Mirrors the cv2.VideoCapture calls the monitor needs (open, read,
+    release) and adds `frame_time`, the timestamp of the last frame read.
+    Live sources produce frames in real time and may be dropped under load;
+    offline sources are consumed losslessly and can run faster than real time.
+    """
+    live = False
+
+    def __init__(self, fps=30, realtime=False):
+        self.fps = fps
+        self.realtime = realtime
+        self.frame_time = 0.0
+        self.frames_read = 0
+        self._start = None
+
+    def open(self):
+        self._start = time.time()
+        self.frames_read = 0
+        return True
+
+    def read(self):
+        """Return (success, BGR frame) like cv2.VideoCapture.read"""
+        frame = self._next_frame()
+        if frame is None:
+            return False, None
+
+        # Offline sources run on a virtual timeline anchored at open()
+        self.frame_time = self._start + self.frames_read / self.fps
+        self.frames_read += 1
+        if self.realtime:
+            delay = self.frame_time - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        return True, frame
+
+    def _next_frame(self):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+
+class CameraSource(FrameSource):
+    """Webcam frames through cv2.VideoCapture"""
+    live = True
+
+    def __init__(self, camera_index=0, fps=30):
+        super().__init__(fps=fps, realtime=True)
+        self.camera_index = camera_index
+        self._cap = None
+
+    def open(self):
+        self._cap = cv2.VideoCapture(self.camera_index)
+        return self._cap.isOpened()
+
+    def read(self):
+        success, frame = self._cap.read()
+        if success:
+            self.frame_time = time.time()
+            self.frames_read += 1
+        return success, frame
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class VideoFileSource(FrameSource):
+    """Frames from a recorded video file"""
+
+    def __init__(self, path, fps=None, realtime=False, loop=False):
+        super().__init__(fps=fps or 30, realtime=realtime)
+        self.path = path
+        self.loop = loop
+        self._fps_override = fps
+        self._cap = None
+
+    def open(self):
+        self._cap = cv2.VideoCapture(self.path)
+        if not self._cap.isOpened():
+            return False
+        if not self._fps_override:
+            self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 30
+        return super().open()
+
+    def _next_frame(self):
+        success, frame = self._cap.read()
+        if not success and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = self._cap.read()
+        return frame if success else None
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class ImageDirectorySource(FrameSource):
+    """Frames from a directory of images, in filename order"""
+
+    def __init__(self, path, fps=30, realtime=False, loop=False):
+        super().__init__(fps=fps, realtime=realtime)
+        self.path = path
+        self.loop = loop
+        self._files = []
+        self._index = 0
+
+    def open(self):
+        self._files = sorted(
+            os.path.join(self.path, name) for name in os.listdir(self.path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self._index = 0
+        return bool(self._files) and super().open()
+
+    def _next_frame(self):
+        if self._index >= len(self._files):
+            if not self.loop:
+                return None
+            self._index = 0
+        frame = cv2.imread(self._files[self._index])
+        self._index += 1
+        return frame
+
+
+class SyntheticFaceSource(FrameSource):
+    """Face-like patch with an injected pulse at a known BPM and scripted blinks.
+
+    `bpm` and `blink_times` (seconds from the start) are the ground truth;
+    `ear_at(t)` gives the matching eye aspect ratio trace for blink tests.
+    """
+    OPEN_EAR = 0.03
+    CLOSED_EAR = 0.005
+
+    def __init__(self, bpm=72.0, fps=30, duration=60.0, blink_times=None, blink_duration=0.15,
+                 size=(480, 640), pulse_amplitude=2.0, noise=0.5, seed=0, realtime=False):
+        super().__init__(fps=fps, realtime=realtime)
+        self.bpm = bpm
+        self.duration = duration
+        self.blink_duration = blink_duration
+        self.pulse_amplitude = pulse_amplitude
+        self.noise = noise
+        self._rng = np.random.default_rng(seed)
+        if blink_times is None:
+            # Roughly 15 blinks/min with some jitter
+            blink_times = np.arange(2.0, duration or 60.0, 4.0)
+            blink_times = blink_times + self._rng.uniform(-0.5, 0.5, len(blink_times))
+        self.blink_times = np.sort(np.asarray(blink_times, dtype=float))
+
+        height, width = size
+        center = (width // 2, height // 2)
+        axes = (width // 6, height // 4)
+        self._frames = {}
+        for closed in (False, True):
+            frame = np.full((height, width, 3), 60, dtype=np.uint8)
+            cv2.ellipse(frame, center, axes, 0, 0, 360, (140, 160, 200), -1)
+            for dx in (-axes[0] // 2, axes[0] // 2):
+                eye = (center[0] + dx, center[1] - axes[1] // 4)
+                eye_axes = (axes[0] // 5, 2 if closed else axes[1] // 10)
+                cv2.ellipse(frame, eye, eye_axes, 0, 0, 360, (40, 30, 30), -1)
+            self._frames[closed] = frame
+
+        face_mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.ellipse(face_mask, center, axes, 0, 0, 360, 1, -1)
+        self._face_pixels = face_mask.astype(bool)
+
+    def eye_closed_at(self, t):
+        idx = np.searchsorted(self.blink_times, t, side='right') - 1
+        return idx >= 0 and t - self.blink_times[idx] < self.blink_duration
+
+    def ear_at(self, t):
+        return self.CLOSED_EAR if self.eye_closed_at(t) else self.OPEN_EAR
+
+    def _next_frame(self):
+        t = self.frames_read / self.fps
+        if self.duration is not None and t >= self.duration:
+            return None
+
+        frame = self._frames[self.eye_closed_at(t)].copy()
+        pulse = self.pulse_amplitude * np.sin(2 * np.pi * (self.bpm / 60) * t) + self._rng.normal(0, self.noise)
+        green = frame[:, :, 1]
+        green[self._face_pixels] = np.clip(green[self._face_pixels].astype(np.int16) + round(pulse), 0, 255)
+        return frame
+
+
+def open_frame_source(spec, **kwargs):
+    """Build a frame source from a camera index, video path, image directory or 'synthetic[:bpm]'"""
+    if isinstance(spec, FrameSource):
+        return spec
+    if isinstance(spec, int) or str(spec).isdigit():
+        return CameraSource(int(spec), **kwargs)
+    if str(spec).startswith('synthetic'):
+        _, _, bpm = str(spec).partition(':')
+        if bpm:
+            kwargs.setdefault('bpm', float(bpm))
+        return SyntheticFaceSource(**kwargs)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, **kwargs)
+    return VideoFileSource(spec, **kwargs)
@@ -0,0 +1,314 @@
+import asyncio
+import queue
+import threading
+import time
+
+from telemetry import REGISTRY
+
+JOB_WAIT_SECONDS = REGISTRY.histogram('job_queue_wait_seconds', 'Time jobs spend queued before running')
+JOB_RUN_SECONDS = REGISTRY.histogram('job_run_seconds', 'Job run time')
+JOBS = REGISTRY.counter('jobs_total', 'Jobs by outcome')
+
+
+class JobExecutor:
+    """Bounded worker pool for work kicked off by Socket.IO handlers.
+
+    Handlers call submit(sid, fn, ...) and return straight away; a worker
+    later runs fn(sid, ...), which pushes its results back to that client
+    with socketio.emit(..., to=sid). At most `workers` jobs run at once and
+    at most `max_queue` wait; anything beyond that is rejected.
+    """
+
+    def __init__(self, workers=4, max_queue=256, name="jobs"):
+        self.workers = workers
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._running = 0
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0}
+
+        REGISTRY.gauge('job_queue_depth', 'Jobs waiting for a worker', fn=self._queue.qsize, executor=name)
+        REGISTRY.gauge('jobs_running', 'Jobs currently running', fn=lambda: self._running, executor=name)
+
+    def start(self):
+        if self._threads:
+            return
+        self._threads = [threading.Thread(target=self._worker, daemon=True, name=f"{self.name}-{i}")
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, sid, fn, *args, delay=0, **kwargs):
+        """Queue fn(sid, *args, **kwargs); returns False if the queue is full.
+
+        With delay > 0 the job is queued after that many seconds instead.
+        """
+        self.start()
+        job = (sid, fn, args, kwargs)
+        if delay > 0:
+            timer = threading.Timer(delay, self._enqueue, args=(job,))
+            timer.daemon = True
+            timer.start()
+            return True
+        return self._enqueue(job)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['running'] = self._running
+        stats['queued'] = self._queue.qsize()
+        return stats
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+        JOBS.labels(executor=self.name, outcome=key).inc()
+
+    def _enqueue(self, job):
+        try:
+            self._queue.put_nowait((time.perf_counter(), job))
+        except queue.Full:
+            self._count('rejected')
+            print(f"⚠️ {self.name} queue full, dropping {job[1].__name__} for {job[0]}")
+            return False
+        self._count('submitted')
+        return True
+
+    def _worker(self):
+        while True:
+            enqueued_at, (sid, fn, args, kwargs) = self._queue.get()
+            started_at = time.perf_counter()
+            JOB_WAIT_SECONDS.labels(executor=self.name).observe(started_at - enqueued_at)
+            with self._lock:
+                self._running += 1
+            try:
+                fn(sid, *args, **kwargs)
+                self._count('completed')
+            except Exception as e:
+                self._count('failed')
+                print(f"Job {fn.__name__} for {sid} failed: {e}")
+            finally:
+                with self._lock:
+                    self._running -= 1
+                JOB_RUN_SECONDS.labels(executor=self.name, job=fn.__name__).observe(time.perf_counter() - started_at)
+
+
+FLIGHTS = REGISTRY.counter('single_flight_calls_total', 'Single-flight calls by role')
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error', 'events', 'listeners')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.events = []
+        self.listeners = []
+
+
+class _Subscriber:
+    """A SingleFlight listener and how many of the flight's events it has been given"""
+    __slots__ = ('listener', 'cursor', 'lock')
+
+    def __init__(self, listener):
+        self.listener = listener
+        self.cursor = 0
+        self.lock = threading.Lock()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key (the leader) runs fn(publish); callers that
+    arrive while it is running join instead of starting their own call.
+    Everything the leader publishes is fanned out to every caller's
+    listener, with a replay for late joiners, and all callers get the same
+    return value. Joiners give up after `timeout` seconds.
+
+    Listeners are never called under the shared lock: each has a cursor
+    into the flight's events, and whichever thread finds it behind (its
+    own catch-up or the leader's publish) delivers the missing events in
+    order, so a slow listener only ever holds up its own deliveries.
+    """
+
+    def __init__(self, name, timeout=10.0):
+        self.name = name
+        self.timeout = timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {'leaders': 0, 'coalesced': 0, 'timeouts': 0}
+
+    def do(self, key, fn, listener=None, timeout=None):
+        subscriber = _Subscriber(listener) if listener is not None else None
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            if subscriber is not None:
+                flight.listeners.append(subscriber)
+        self._count('leaders' if leader else 'coalesced')
+
+        if leader:
+            return self._lead(key, flight, fn)
+
+        if subscriber is not None:
+            # Catch up on what was already published
+            self._drain(flight, subscriber)
+        if not flight.done.wait(timeout or self.timeout):
+            with self._lock:
+                if subscriber in flight.listeners:
+                    flight.listeners.remove(subscriber)
+            self._count('timeouts')
+            raise TimeoutError(f"{self.name} call for {key} still running after {timeout or self.timeout}s")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._flights)
+        return stats
+
+    def _lead(self, key, flight, fn):
+        def publish(*args):
+            with self._lock:
+                flight.events.append(args)
+                subscribers = list(flight.listeners)
+            for subscriber in subscribers:
+                self._drain(flight, subscriber)
+
+        try:
+            flight.result = fn(publish)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _drain(self, flight, subscriber):
+        """Deliver the events subscriber has not seen yet, unless another thread already is"""
+        while subscriber.lock.acquire(blocking=False):
+            try:
+                while True:
+                    with self._lock:
+                        pending = flight.events[subscriber.cursor:]
+                        subscriber.cursor += len(pending)
+                    if not pending:
+                        break
+                    for args in pending:
+                        self._deliver(subscriber.listener, args)
+            finally:
+                subscriber.lock.release()
+            # An event published between the last check and the release would otherwise wait
+            with self._lock:
+                if subscriber.cursor >= len(flight.events):
+                    return
+
+    def _deliver(self, listener, args):
+        try:
+            listener(*args)
+        except Exception as e:
+            print(f"{self.name} listener failed: {e}")
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+        FLIGHTS.labels(name=self.name, role=key).inc()
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop.
+
+    Same contract as SingleFlight, except fn(publish) is a coroutine
+    function, publish(*args) is awaited, and listeners may be coroutine
+    functions; they are awaited in order so batches arrive in sequence.
+    A joiner is registered before its catch-up, and each listener keeps a
+    cursor into the flight's events, so nothing published while a listener
+    is being awaited is lost.
+    """
+
+    def __init__(self, name, timeout=10.0):
+        self.name = name
+        self.timeout = timeout
+        self._flights = {}
+        self._stats = {'leaders': 0, 'coalesced': 0, 'timeouts': 0}
+
+    async def do(self, key, fn, listener=None, timeout=None):
+        subscriber = _Subscriber(listener) if listener is not None else None
+        flight = self._flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = self._flights[key] = _Flight()
+            flight.done = asyncio.Event()
+        if subscriber is not None:
+            flight.listeners.append(subscriber)
+        self._count('leaders' if leader else 'coalesced')
+
+        if leader:
+            return await self._lead(key, flight, fn)
+
+        if subscriber is not None:
+            # Catch up on what was already published
+            await self._drain(flight, subscriber)
+        try:
+            await asyncio.wait_for(flight.done.wait(), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            if subscriber in flight.listeners:
+                flight.listeners.remove(subscriber)
+            self._count('timeouts')
+            raise TimeoutError(f"{self.name} call for {key} still running after {timeout or self.timeout}s")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats['in_flight'] = len(self._flights)
+        return stats
+
+    async def _lead(self, key, flight, fn):
+        async def publish(*args):
+            flight.events.append(args)
+            for subscriber in list(flight.listeners):
+                await self._drain(flight, subscriber)
+
+        try:
+            flight.result = await fn(publish)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            del self._flights[key]
+            flight.done.set()
+
+    async def _drain(self, flight, subscriber):
+        """Deliver the events subscriber has not seen yet, unless a caller already is"""
+        if not subscriber.lock.acquire(blocking=False):
+            return
+        try:
+            while subscriber.cursor < len(flight.events):
+                args = flight.events[subscriber.cursor]
+                subscriber.cursor += 1
+                await self._deliver(subscriber.listener, args)
+        finally:
+            subscriber.lock.release()
+
+    async def _deliver(self, listener, args):
+        try:
+            result = listener(*args)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            print(f"{self.name} listener failed: {e}")
+
+    def _count(self, key):
+        self._stats[key] += 1
+        FLIGHTS.labels(name=self.name, role=key).inc()
@@ -0,0 +1,249 @@
+"""Publish/subscribe between backend worker processes.
+
+Every bus delivers each message to every subscriber of its channel, the
+publisher's own included, in one global order. LocalBus does that inside a
+single process (one worker, or tests); SocketBus does it across processes
+through a BusHub, a small TCP relay started with `python message_bus.py`.
+BusClientManager plugs a bus into python-socketio, so emits to clients of
+other workers reach them.
+"""
+import argparse
+import json
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import defaultdict
+
+import socketio
+
+from telemetry import REGISTRY
+
+BUS_MESSAGES = REGISTRY.counter('bus_messages_total', 'Message bus traffic by channel and direction')
+
+
+class LocalBus:
+    """In-process bus: publish() calls every subscriber before returning"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel, callback):
+        with self._lock:
+            self._subscribers[channel].append(callback)
+
+    def publish(self, channel, message):
+        BUS_MESSAGES.labels(channel=channel, direction='out').inc()
+        self._dispatch(channel, message)
+
+    def close(self):
+        pass
+
+    def _dispatch(self, channel, message):
+        BUS_MESSAGES.labels(channel=channel, direction='in').inc()
+        with self._lock:
+            callbacks = list(self._subscribers.get(channel, ()))
+        for callback in callbacks:
+            try:
+                callback(message)
+            except Exception as e:
+                print(f"Bus subscriber on {channel} failed: {e}")
+
+
+class SocketBus(LocalBus):
+    """Bus client for a BusHub: messages are JSON lines over one TCP connection.
+
+    The hub echoes every line to every connection, this one included, so
+    all workers see the same order. A reader thread dispatches them, and
+    when the connection drops it reconnects with exponential backoff (up to
+    `max_retry_delay` seconds). Messages published while disconnected are
+    dropped and logged rather than raised, so a publish after a committed
+    write never turns it into an error.
+    """
+
+    def __init__(self, host="127.0.0.1", port=5600, retry_delay=0.5, max_retry_delay=10.0):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._send_lock = threading.Lock()
+        self._closed = False
+        self._sock = self._connect()
+        threading.Thread(target=self._read_loop, daemon=True, name="bus-reader").start()
+
+    def publish(self, channel, message):
+        """Send message to the hub; returns False (and logs) if it could not be sent"""
+        line = json.dumps({'channel': channel, 'message': message}) + "\n"
+        with self._send_lock:
+            sock = self._sock
+            if sock is not None:
+                try:
+                    sock.sendall(line.encode('utf-8'))
+                    BUS_MESSAGES.labels(channel=channel, direction='out').inc()
+                    return True
+                except OSError as e:
+                    print(f"Message bus publish on {channel} failed: {e}")
+                    # Make sure the reader notices and reconnects
+                    self._drop(sock)
+        BUS_MESSAGES.labels(channel=channel, direction='dropped').inc()
+        return False
+
+    def close(self):
+        self._closed = True
+        with self._send_lock:
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _drop(self, sock):
+        """Take sock out of use; call with _send_lock held"""
+        if self._sock is sock:
+            self._sock = None
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _read_loop(self):
+        sock = self._sock
+        while not self._closed:
+            try:
+                for line in sock.makefile('r', encoding='utf-8'):
+                    envelope = json.loads(line)
+                    self._dispatch(envelope['channel'], envelope['message'])
+                error = "closed by hub"
+            except (OSError, ValueError) as e:
+                error = e
+            if self._closed:
+                return
+            print(f"Message bus connection lost: {error}")
+            with self._send_lock:
+                self._drop(sock)
+            sock.close()
+            sock = self._reconnect()
+
+    def _reconnect(self):
+        """Connect again, backing off between attempts; None once closed"""
+        delay = self.retry_delay
+        while not self._closed:
+            time.sleep(delay)
+            try:
+                sock = self._connect()
+            except OSError:
+                delay = min(delay * 2, self.max_retry_delay)
+                continue
+            with self._send_lock:
+                if self._closed:
+                    sock.close()
+                    return None
+                self._sock = sock
+            print(f"Message bus reconnected to {self.host}:{self.port}")
+            return sock
+        return None
+
+
+class _HubHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.server.join(self.connection)
+        try:
+            for line in self.rfile:
+                self.server.relay(line)
+        finally:
+            self.server.leave(self.connection)
+
+
+class BusHub(socketserver.ThreadingTCPServer):
+    """Relays every line from any connection to all connections, in arrival order"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=5600):
+        super().__init__((host, port), _HubHandler)
+        self._connections = set()
+        self._lock = threading.Lock()
+
+    def join(self, connection):
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._lock:
+            self._connections.add(connection)
+
+    def leave(self, connection):
+        with self._lock:
+            self._connections.discard(connection)
+
+    def relay(self, line):
+        # One lock around the fan-out is what gives every worker the same order
+        with self._lock:
+            for connection in list(self._connections):
+                try:
+                    connection.sendall(line)
+                except OSError:
+                    self._connections.discard(connection)
+
+
+def serve_hub(port=5600, host="127.0.0.1"):
+    """Start a BusHub on a background thread and return it"""
+    hub = BusHub(host, port)
+    threading.Thread(target=hub.serve_forever, daemon=True, name="bus-hub").start()
+    return hub
+
+
+def open_bus(url):
+    """'local' for a LocalBus, or tcp://host:port for a SocketBus"""
+    if not url or url == "local":
+        return LocalBus()
+    if url.startswith("tcp://"):
+        host, _, port = url[len("tcp://"):].rpartition(":")
+        return SocketBus(host or "127.0.0.1", int(port))
+    raise ValueError(f"Unknown message bus {url!r}")
+
+
+class BusClientManager(socketio.PubSubManager):
+    """python-socketio client manager that fans emits out over a message bus.
+
+    Emits to a client connected to this worker go straight to it; broadcasts
+    and emits to clients of other workers go over the bus, and every worker
+    delivers them to whichever of its own clients they address.
+    """
+    name = 'bus'
+
+    def __init__(self, bus, channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.bus = bus
+        self._inbox = queue.Queue()
+        bus.subscribe(channel, self._inbox.put)
+
+    def emit(self, event, data, namespace=None, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        room = to or room
+        if room is not None and callback is None and room in self.rooms.get(namespace or '/', {}):
+            kwargs['ignore_queue'] = True
+        return super().emit(event, data, namespace=namespace, room=room, skip_sid=skip_sid,
+                            callback=callback, **kwargs)
+
+    def _publish(self, data):
+        self.bus.publish(self.channel, data)
+
+    def _listen(self):
+        while True:
+            yield self._inbox.get()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Message bus hub for multi-worker backends")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5600)
+    args = parser.parse_args()
+    print(f"Message bus hub on tcp://{args.host}:{args.port}")
+    BusHub(args.host, args.port).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
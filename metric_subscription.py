@@ -0,0 +1,55 @@
+import threading
+import time
+
+
+class MetricSubscription:
+    """Calls callback(metrics) on a background thread when a monitor's metrics move.
+
+    `monitor` is anything with wait_for_update/wake_subscribers (BiometricsMonitor
+    or ProcessBiometricsMonitor). A callback fires when heart rate or blinks/min
+    moved by at least `min_delta` since the last callback, or the blink count
+    changed, and at most `max_rate` times per second; changes arriving inside
+    the rate limit are coalesced into the next callback.
+    """
+
+    def __init__(self, monitor, callback, min_delta=0.5, max_rate=5.0):
+        self.monitor = monitor
+        self.callback = callback
+        self.min_delta = min_delta
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancelled.set()
+        self.monitor.wake_subscribers()
+
+    def _moved(self, last, metrics):
+        return (last is None
+                or metrics['blink_count'] != last['blink_count']
+                or abs(metrics['heart_rate'] - last['heart_rate']) >= self.min_delta
+                or abs(metrics['blinks_per_minute'] - last['blinks_per_minute']) >= self.min_delta)
+
+    def _run(self):
+        version = None
+        last = None
+        next_allowed = 0.0
+        while not self._cancelled.is_set():
+            version, metrics = self.monitor.wait_for_update(version)
+            if self._cancelled.is_set() or not self._moved(last, metrics):
+                continue
+
+            delay = next_allowed - time.monotonic()
+            if delay > 0:
+                if self._cancelled.wait(delay):
+                    return
+                # Pick up whatever arrived while rate limited
+                version, metrics = self.monitor.wait_for_update(version, timeout=0)
+
+            next_allowed = time.monotonic() + self.min_interval
+            last = metrics
+            try:
+                self.callback(metrics)
+            except Exception as e:
+                print(f"Metric subscriber failed: {e}")
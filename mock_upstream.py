@@ -0,0 +1,165 @@
+"""Offline stand-in for the Last.fm and iTunes APIs used by backend.py.
+
+Serves `tag.gettoptracks` on /2.0/ and iTunes `search` on /search with the
+same response shapes as the real services, plus configurable latency,
+error rate and catalog size. Point the backend at it with
+
+    python mock_upstream.py --port 8765 --latency 0.08
+    LASTFM_API_URL=http://localhost:8765/2.0/ ITUNES_API_URL=http://localhost:8765/search python backend.py
+
+Request counts are available as JSON on /stats.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class MockUpstream:
+    """Deterministic fake catalog: every tag has `catalog_size` tracks"""
+
+    def __init__(self, latency=0.05, jitter=0.5, error_rate=0.0, catalog_size=500, miss_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.catalog_size = catalog_size
+        self.miss_rate = miss_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {'lastfm': 0, 'itunes': 0, 'errors': 0}
+
+    def delay(self):
+        """Sleep for latency +/- jitter (a fraction of latency)"""
+        with self._lock:
+            spread = self._rng.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, self.latency * (1 + spread)))
+
+    def should_fail(self):
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.counts['errors'] += 1
+        return failed
+
+    def count(self, api):
+        with self._lock:
+            self.counts[api] += 1
+
+    def top_tracks(self, tag, limit, page):
+        total_pages = max(1, math.ceil(self.catalog_size / limit))
+        start = (page - 1) * limit
+        tracks = []
+        for rank in range(start, min(start + limit, self.catalog_size)):
+            tracks.append({
+                'name': f"{tag.title()} Track {rank + 1}",
+                'duration': '0',
+                'mbid': '',
+                'url': f"https://www.last.fm/music/mock/_/{tag}-{rank + 1}",
+                'artist': {'name': f"Mock Artist {rank % 97 + 1}", 'mbid': '', 'url': ''},
+                '@attr': {'rank': str(rank + 1)},
+            })
+        return {'tracks': {
+            'track': tracks,
+            '@attr': {'tag': tag, 'page': str(page), 'perPage': str(limit),
+                      'totalPages': str(total_pages), 'total': str(self.catalog_size)},
+        }}
+
+    def search(self, term, limit, base_url):
+        # Misses are a stable function of the term, like a real catalog gap
+        key = zlib.crc32(term.encode())
+        if (key % 1000) / 1000 < self.miss_rate:
+            return {'resultCount': 0, 'results': []}
+        results = [{
+            'wrapperType': 'track',
+            'kind': 'song',
+            'trackName': term,
+            'artistName': 'Mock Artist',
+            'previewUrl': f"{base_url}/preview/{key:08x}.m4a",
+            'artworkUrl100': f"{base_url}/artwork/{key:08x}/100x100bb.jpg",
+            'trackTimeMillis': 30000,
+        }][:limit]
+        return {'resultCount': len(results), 'results': results}
+
+
+def make_handler(upstream):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the real APIs
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+            if url.path == '/stats':
+                return self._send(200, upstream.counts)
+            if url.path.rstrip('/') == '/2.0':
+                upstream.count('lastfm')
+                upstream.delay()
+                if upstream.should_fail():
+                    return self._send(500, {'error': 8, 'message': 'Operation failed - Most likely the backend service failed'})
+                if params.get('method') != 'tag.gettoptracks':
+                    return self._send(400, {'error': 3, 'message': 'Invalid Method - No method with that name in this package'})
+                limit = max(1, int(params.get('limit', 50)))
+                page = max(1, int(params.get('page', 1)))
+                return self._send(200, upstream.top_tracks(params.get('tag', ''), limit, page))
+            if url.path == '/search':
+                upstream.count('itunes')
+                upstream.delay()
+                if upstream.should_fail():
+                    return self._send(503, None)
+                base_url = f"http://{self.headers.get('Host', 'localhost')}"
+                return self._send(200, upstream.search(params.get('term', ''), int(params.get('limit', 1)), base_url))
+            self._send(404, {'error': 'not found'})
+
+        def _send(self, status, body):
+            data = json.dumps(body).encode() if body is not None else b'Service Unavailable'
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json' if body is not None else 'text/plain')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port=8765, host='127.0.0.1', **options):
+    """Start the mock server on a background thread; returns (server, upstream)"""
+    upstream = MockUpstream(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(upstream))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, upstream
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="mean response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.5, help="delay spread as a fraction of --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail")
+    parser.add_argument("--catalog-size", type=int, default=500, help="tracks per Last.fm tag")
+    parser.add_argument("--miss-rate", type=float, default=0.0, help="share of iTunes searches with no result")
+    args = parser.parse_args()
+
+    server, upstream = serve(args.port, args.host, latency=args.latency, jitter=args.jitter,
+                             error_rate=args.error_rate, catalog_size=args.catalog_size,
+                             miss_rate=args.miss_rate)
+    print(f"Mock Last.fm/iTunes on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"Requests served: {upstream.counts}")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
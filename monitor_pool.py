@@ -0,0 +1,109 @@
+import threading
+import time
+
+
+class MonitorPool:
+    """Paused BiometricsMonitors kept warm between monitoring sessions.
+
+    release() pauses a monitor instead of stopping it, so its face models
+    stay loaded, its rPPG buffer intact and (if it keeps the camera open)
+    its camera settled; acquire() hands back the most recently released
+    one, which resumes on its next start(), and only calls factory() when
+    none is idle. At most `max_idle` monitors are kept, each for
+    `keep_warm` seconds, after which a reaper stops them for real.
+    Monitors that cannot pause (worker processes, replays, remote feeds)
+    are simply stopped.
+    """
+
+    def __init__(self, factory, max_idle=1, keep_warm=300.0, reap_interval=10.0):
+        self.factory = factory
+        self.max_idle = max_idle
+        self.keep_warm = keep_warm
+        self.reap_interval = reap_interval
+
+        self._lock = threading.Lock()
+        self._idle = []  # (released_at, monitor), oldest first
+        self._stats = {'created': 0, 'reused': 0, 'expired': 0}
+        self._reaper = None
+
+    def acquire(self):
+        """A warm monitor if one is idle, otherwise a new one; either way, start() it"""
+        with self._lock:
+            if self._idle:
+                self._stats['reused'] += 1
+                return self._idle.pop()[1]
+            self._stats['created'] += 1
+        return self.factory()
+
+    def release(self, monitor):
+        """Take back a monitor its session is done with"""
+        if self.max_idle <= 0 or self.keep_warm <= 0 or not hasattr(monitor, 'pause'):
+            monitor.stop()
+            return
+        monitor.pause()
+        self._keep(monitor)
+
+    def prewarm(self, prepare=None):
+        """Build a monitor ahead of the first acquire(), so its models are loaded before anyone asks.
+
+        prepare(monitor), if given, runs before the monitor can be acquired.
+        Returns False when nothing was built (pooling is off, or one is idle already).
+        """
+        if self.max_idle <= 0 or self.keep_warm <= 0:
+            return False
+        with self._lock:
+            if self._idle:
+                return False
+            self._stats['created'] += 1
+        monitor = self.factory()
+        if prepare is not None:
+            prepare(monitor)
+        self._keep(monitor)
+        return True
+
+    def expire(self, max_age=None):
+        """Stop monitors idle for longer than max_age (default keep_warm); all of them with max_age=0"""
+        cutoff = time.monotonic() - (self.keep_warm if max_age is None else max_age)
+        with self._lock:
+            expired = [monitor for released_at, monitor in self._idle if released_at <= cutoff]
+            self._idle = [(released_at, monitor) for released_at, monitor in self._idle if released_at > cutoff]
+            self._stats['expired'] += len(expired)
+        for monitor in expired:
+            monitor.stop()
+        return len(expired)
+
+    def close(self):
+        self.expire(max_age=0)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        return stats
+
+    def _keep(self, monitor):
+        with self._lock:
+            self._idle.append((time.monotonic(), monitor))
+            surplus = [entry[1] for entry in self._idle[:-self.max_idle]]
+            del self._idle[:-self.max_idle]
+            self._stats['expired'] += len(surplus)
+        for old in surplus:
+            old.stop()
+        self._start_reaper()
+
+    def _start_reaper(self):
+        if self._reaper is not None:
+            return
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, daemon=True, name="monitor-pool-reaper")
+        self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                self.expire()
+            except Exception as e:
+                print(f"Error expiring idle monitors: {e}")
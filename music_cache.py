@@ -0,0 +1,243 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from telemetry import REGISTRY
+
+CACHE_LOOKUPS = REGISTRY.counter('music_cache_lookups_total', 'Music cache lookups by tier and outcome')
+
+
+def normalize_query(text):
+    """Cache key form of a free-text search: lowercase, single spaces"""
+    return " ".join(text.lower().split())
+
+
+def connect_wal(path, attempts=50):
+    """SQLite connection in WAL mode, shareable between threads and worker processes.
+
+    Switching a new file to WAL needs a moment of exclusive access and does
+    not wait on the busy timeout, so workers starting together retry it.
+    """
+    db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+    for attempt in range(attempts):
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            break
+        except sqlite3.OperationalError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.1)
+    return db
+
+class TieredCache:
+    """In-memory LRU with TTL in front of an on-disk SQLite store.
+
+    Every entry has a fresh window (`ttl`) followed by a stale window
+    (`stale_ttl`). Fresh hits are returned directly; stale hits are returned
+    too, while a background thread refreshes the key (stale-while-revalidate).
+    A loader returning None is cached as a negative entry for `negative_ttl`
+    so repeated misses do not hit the network. Loader exceptions are not cached.
+    """
+
+    def __init__(self, path="music_cache.db", max_entries=2048, ttl=86400,
+                 negative_ttl=3600, stale_ttl=86400, name="music"):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.name = name
+
+        self._memory = OrderedDict()  # key -> (value, fresh_until, stale_until)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0,
+                       'stale_served': 0, 'negative_hits': 0, 'refreshes': 0}
+
+        self._db_lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = connect_wal(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT, fresh_until REAL, stale_until REAL)"
+            )
+            self._db.commit()
+
+        REGISTRY.gauge('music_cache_hit_ratio', 'Share of lookups served from cache',
+                       fn=self.hit_rate, cache=name)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Cached value for key, calling loader() on a miss (None results are cached negatively)"""
+        hit, value, stale = self._lookup(key)
+        if not hit:
+            return self._load(key, loader, ttl)
+        if stale:
+            self._refresh_in_background(key, loader, ttl)
+        return value
+
+    async def get_or_load_async(self, key, loader, ttl=None):
+        """get_or_load for a coroutine function loader; stale keys are refreshed in a task.
+
+        Memory hits are answered on the event loop; the SQLite tier is read
+        and written on worker threads so it never blocks the loop.
+        """
+        result = self._lookup(key, disk=False)
+        if result is None:
+            result = await asyncio.to_thread(self._lookup, key)
+        hit, value, stale = result
+        if not hit:
+            return await self._store_async(key, await loader(), ttl)
+        if stale and self._begin_refresh(key):
+            asyncio.ensure_future(self._refresh_async(key, loader, ttl))
+        return value
+
+    def _lookup(self, key, disk=True):
+        """(hit, value, stale) from memory then disk, recording the outcome.
+
+        With disk=False, None (nothing recorded) when the key is not in memory but may be on disk.
+        """
+        now = time.time()
+        entry = self._memory_get(key)
+        tier = 'memory'
+        if entry is None:
+            if not disk and self._db is not None:
+                return None
+            entry = self._disk_get(key)
+            tier = 'disk'
+            if entry is not None:
+                self._memory_put(key, entry)
+
+        if entry is not None and now < entry[2]:
+            value, fresh_until, _ = entry
+            stale = now >= fresh_until
+            self._record(tier, 'stale' if stale else 'negative' if value is None else 'hit')
+            return True, value, stale
+
+        self._record('none', 'miss')
+        return False, None, False
+
+    def invalidate(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        stats['hit_rate'] = round(self.hit_rate(), 4)
+        return stats
+
+    def hit_rate(self):
+        hits = self._stats['memory_hits'] + self._stats['disk_hits']
+        total = hits + self._stats['misses']
+        return hits / total if total else 0.0
+
+    def _record(self, tier, outcome):
+        with self._lock:
+            if outcome == 'miss':
+                self._stats['misses'] += 1
+            else:
+                self._stats[f'{tier}_hits'] += 1
+            if outcome == 'stale':
+                self._stats['stale_served'] += 1
+            elif outcome == 'negative':
+                self._stats['negative_hits'] += 1
+        CACHE_LOOKUPS.labels(cache=self.name, tier=tier, outcome=outcome).inc()
+
+    def _load(self, key, loader, ttl):
+        return self._store(key, loader(), ttl)
+
+    def _entry(self, value, ttl):
+        now = time.time()
+        fresh_for = (ttl or self.ttl) if value is not None else self.negative_ttl
+        return value, now + fresh_for, now + fresh_for + self.stale_ttl
+
+    def _store(self, key, value, ttl):
+        entry = self._entry(value, ttl)
+        self._memory_put(key, entry)
+        self._disk_put(key, entry)
+        return value
+
+    async def _store_async(self, key, value, ttl):
+        entry = self._entry(value, ttl)
+        self._memory_put(key, entry)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put, key, entry)
+        return value
+
+    def _begin_refresh(self, key):
+        """Claim the refresh of key; False if one is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self._stats['refreshes'] += 1
+            return True
+
+    def _refresh_in_background(self, key, loader, ttl):
+        if not self._begin_refresh(key):
+            return
+
+        def refresh():
+            try:
+                self._load(key, loader, ttl)
+            except Exception as e:
+                print(f"Cache refresh failed for {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    async def _refresh_async(self, key, loader, ttl):
+        try:
+            await self._store_async(key, await loader(), ttl)
+        except Exception as e:
+            print(f"Cache refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _memory_get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            return entry
+
+    def _memory_put(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_get(self, key):
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, fresh_until, stale_until FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def _disk_put(self, key, entry):
+        if self._db is None:
+            return
+        value, fresh_until, stale_until = entry
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, fresh_until, stale_until) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), fresh_until, stale_until),
+            )
+            self._db.commit()
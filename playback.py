@@ -0,0 +1,147 @@
+import heapq
+import threading
+import time
+
+
+class PlaybackTracker:
+    """Where each session is in its current song, from the client's own reports.
+
+    Clients report play (with the track and its duration), pause, seek and
+    skip, plus song_ended. For a playing song the tracker schedules
+    `on_due(sid, queue_length)` `lead` seconds before the song will really
+    end, re-arming it whenever a pause, seek or new track moves that point.
+    It fires at most once per play of a track; a skip or song_ended that
+    comes before the scheduled time fires it straight away. A play or seek
+    back to within `restart_within` seconds of the start after it fired
+    (repeat-one, or a queue that replays the track) counts as a new play.
+    on_due runs on the tracker's thread or the reporting handler's, so it
+    should only hand work off.
+    """
+
+    def __init__(self, on_due, lead=5.0, restart_within=1.0):
+        self.on_due = on_due
+        self.lead = lead
+        self.restart_within = restart_within
+        self._sessions = {}
+        self._heap = []  # (due_at, sid, generation)
+        self._cond = threading.Condition()
+        self._stats = {'scheduled': 0, 'fired': 0, 'fired_late': 0}
+        threading.Thread(target=self._run, daemon=True, name="playback-tracker").start()
+
+    def update(self, sid, action, position=0.0, duration=None, track=None, queue_length=None):
+        """Apply one client report: action is play, pause, seek or skip"""
+        now = time.monotonic()
+        with self._cond:
+            state = self._sessions.get(sid)
+            if state is None:
+                state = self._sessions[sid] = {
+                    'track': None, 'playing': False, 'position': 0.0, 'duration': None,
+                    'updated_at': now, 'queue_length': None, 'fired': False, 'generation': 0,
+                }
+            if queue_length is not None:
+                state['queue_length'] = queue_length
+
+            if action == 'skip':
+                due = self._end(state)
+            else:
+                due = None
+                position = float(position or 0.0)
+                if action == 'play' and track is not None and track != state['track']:
+                    state.update(track=track, fired=False, duration=duration)
+                else:
+                    if duration:
+                        state['duration'] = duration
+                    if action in ('play', 'seek') and state['fired'] and position < self.restart_within:
+                        # Same track from the top again: it gets its own decision
+                        state['fired'] = False
+                state['position'] = position
+                state['updated_at'] = now
+                if action in ('play', 'pause'):
+                    state['playing'] = action == 'play'
+                self._schedule(sid, state)
+        if due is not None:
+            self._call(sid, due)
+
+    def ended(self, sid, queue_length=None):
+        """The client's song finished playing"""
+        with self._cond:
+            state = self._sessions.get(sid)
+            if state is None:
+                return
+            if queue_length is not None:
+                state['queue_length'] = queue_length
+            due = self._end(state)
+        if due is not None:
+            self._call(sid, due)
+
+    def forget(self, sid):
+        with self._cond:
+            self._sessions.pop(sid, None)
+
+    def active(self, sid=None):
+        """Whether sid (or with no sid, any client) is reporting playback"""
+        with self._cond:
+            return sid in self._sessions if sid is not None else bool(self._sessions)
+
+    def remaining(self, sid):
+        """Seconds left in sid's current song, or None if unknown"""
+        with self._cond:
+            state = self._sessions.get(sid)
+            return self._remaining(state, time.monotonic()) if state else None
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['sessions'] = len(self._sessions)
+            stats['playing'] = sum(1 for s in self._sessions.values() if s['playing'])
+        return stats
+
+    def _remaining(self, state, now):
+        if not state['duration']:
+            return None
+        elapsed = now - state['updated_at'] if state['playing'] else 0.0
+        return max(0.0, state['duration'] - state['position'] - elapsed)
+
+    def _schedule(self, sid, state):
+        """Re-arm sid's timer for the current position; call with _cond held"""
+        state['generation'] += 1
+        remaining = self._remaining(state, time.monotonic())
+        if not state['playing'] or state['fired'] or remaining is None:
+            return
+        heapq.heappush(self._heap, (time.monotonic() + max(0.0, remaining - self.lead), sid, state['generation']))
+        self._stats['scheduled'] += 1
+        self._cond.notify()
+
+    def _end(self, state):
+        """Stop the clock for a finished or skipped song; returns queue_length if on_due is owed"""
+        state['playing'] = False
+        state['generation'] += 1
+        if state['fired']:
+            return None
+        self._stats['fired_late'] += 1
+        return self._fire(state)
+
+    def _fire(self, state):
+        state['fired'] = True
+        self._stats['fired'] += 1
+        # 0 rather than None so callers can always compare it
+        return state['queue_length'] or 0
+
+    def _call(self, sid, queue_length):
+        try:
+            self.on_due(sid, queue_length)
+        except Exception as e:
+            print(f"Playback callback for {sid} failed: {e}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._cond.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, sid, generation = heapq.heappop(self._heap)
+                state = self._sessions.get(sid)
+                # Superseded by a later pause/seek/track change
+                if state is None or state['generation'] != generation or state['fired']:
+                    continue
+                due = self._fire(state)
+            self._call(sid, due)
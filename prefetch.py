@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import Counter, deque
+
+from telemetry import REGISTRY
+
+POOL_TAKES = REGISTRY.counter('prefetch_takes_total', 'Track pool takes by outcome')
+
+
+class TrackPrefetcher:
+    """Warm pools of ready-to-play tracks for every mood category.
+
+    `fetch(category)` resolves a batch of tracks over the network; background
+    workers call it whenever a pool drops below `low_water` and keep filling
+    until the pool reaches `target`. Each listener's biometric trend is kept
+    separately (see set_trend); every category at least one of them is
+    heading into gets a larger target and goes first, the most popular
+    ahead of the rest, so a mood switch or queue refill is a pop from memory.
+    """
+
+    def __init__(self, categories, fetch, low_water=4, target=12, trend_boost=2.0,
+                 workers=2, retry_delay=30.0):
+        self.fetch = fetch
+        self.low_water = low_water
+        self.target = target
+        self.trend_boost = trend_boost
+        self.workers = workers
+        self.retry_delay = retry_delay
+
+        self._cond = threading.Condition()
+        self._pools = {category: deque() for category in categories}
+        self._keys = {category: set() for category in categories}
+        self._filling = set(categories)  # start with every pool cold
+        self._in_flight = set()
+        self._retry_at = {}
+        self._trends = {}  # source -> category it is heading into
+        self._heading = Counter()  # category -> sources heading into it
+        self._running = False
+        self._threads = []
+
+        for category in categories:
+            REGISTRY.gauge('prefetch_pool_size', 'Ready-to-play tracks per mood pool',
+                           fn=lambda category=category: len(self._pools[category]), category=category)
+
+    def start(self):
+        """Start the background refill workers"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._threads = [threading.Thread(target=self._refill_loop, daemon=True) for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+
+    def take(self, category, count, exclude=None):
+        """Pop up to count ready tracks for category (may return fewer, or none).
+
+        Tracks matching exclude(track) stay in the pool for other callers.
+        """
+        with self._cond:
+            pool = self._pools.get(category)
+            if pool is None:
+                return []
+            tracks = []
+            skipped = []
+            while pool and len(tracks) < count:
+                track = pool.popleft()
+                if exclude is not None and exclude(track):
+                    skipped.append(track)
+                    continue
+                self._keys[category].discard((track['name'], track['artist']))
+                tracks.append(track)
+            pool.extend(skipped)
+            if len(pool) < self.low_water:
+                self._filling.add(category)
+                self._cond.notify_all()
+        POOL_TAKES.labels(category=category, outcome='hit' if tracks else 'empty').inc()
+        return tracks
+
+    def set_trend(self, category, source=None):
+        """Weight refills toward the category `source` (e.g. a session id) is heading into"""
+        with self._cond:
+            previous = self._trends.get(source)
+            if category == previous or category not in self._pools:
+                return
+            if previous is not None:
+                self._heading[previous] -= 1
+            self._trends[source] = category
+            self._heading[category] += 1
+            if len(self._pools[category]) < self._target_for(category):
+                self._filling.add(category)
+                self._cond.notify_all()
+
+    def clear_trend(self, source=None):
+        """Forget source's trend, e.g. when its session stops monitoring"""
+        with self._cond:
+            category = self._trends.pop(source, None)
+            if category is not None:
+                self._heading[category] -= 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pools': {category: len(pool) for category, pool in self._pools.items()},
+                'filling': sorted(self._filling),
+                'heading': {category: count for category, count in self._heading.items() if count > 0},
+            }
+
+    def _target_for(self, category):
+        if self._heading[category] > 0:
+            return int(self.target * self.trend_boost)
+        return self.target
+
+    def _next_category(self):
+        """Most urgent pool to refill: largest deficit, trend categories weighted up, then the most popular"""
+        now = time.time()
+        candidates = [c for c in self._filling
+                      if c not in self._in_flight and self._retry_at.get(c, 0) <= now]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda c: ((self._target_for(c) - len(self._pools[c]))
+                                              * (self.trend_boost if self._heading[c] > 0 else 1.0),
+                                              self._heading[c]))
+
+    def _refill_loop(self):
+        while True:
+            with self._cond:
+                category = None
+                while self._running:
+                    category = self._next_category()
+                    if category is not None:
+                        break
+                    self._cond.wait(timeout=1.0)
+                if not self._running:
+                    return
+                self._in_flight.add(category)
+
+            try:
+                tracks = self.fetch(category)
+            except Exception as e:
+                print(f"Prefetch for {category} failed: {e}")
+                tracks = []
+
+            with self._cond:
+                self._in_flight.discard(category)
+                added = 0
+                for track in tracks:
+                    key = (track['name'], track['artist'])
+                    if key not in self._keys[category]:
+                        self._keys[category].add(key)
+                        self._pools[category].append(track)
+                        added += 1
+                if added == 0:
+                    # Nothing new upstream right now; back off instead of spinning
+                    self._retry_at[category] = time.time() + self.retry_delay
+                if len(self._pools[category]) >= self._target_for(category):
+                    self._filling.discard(category)
+                self._cond.notify_all()
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from metric_subscription import MetricSubscription
+
+
+class RemoteFeed:
+    """Metrics pushed by the client itself, behind the BiometricsMonitor interface.
+
+    For listeners whose heart rate and blink rate are measured somewhere
+    else (in the browser, or on another machine): each push() replaces the
+    current metrics and wakes subscribers, so the rest of the backend treats
+    it exactly like a local camera monitor. Costs no CPU between pushes.
+    Listeners added with add_listener() are called on the pushing thread
+    after each push (and on stop), for callers that cannot spare a thread
+    per feed the way subscribe() does.
+    """
+
+    def __init__(self):
+        self._changed = threading.Condition()
+        self._metrics = {'heart_rate': 0.0, 'blinks_per_minute': 0.0, 'blink_count': 0}
+        self._version = 0
+        self._wakeups = 0
+        self._running = False
+        self._listeners = []
+        self.last_push = None
+
+    def start(self):
+        self._running = True
+
+    def stop(self):
+        self._running = False
+        self.wake_subscribers()
+        self._notify_listeners()
+
+    def push(self, heart_rate, blinks_per_minute, blink_count=None):
+        with self._changed:
+            if blink_count is None:
+                blink_count = self._metrics['blink_count']
+            self._metrics = {
+                'heart_rate': float(heart_rate),
+                'blinks_per_minute': float(blinks_per_minute),
+                'blink_count': int(blink_count),
+            }
+            self._version += 1
+            self.last_push = time.time()
+            self._changed.notify_all()
+        self._notify_listeners()
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify_listeners(self):
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                print(f"Remote feed listener failed: {e}")
+
+    def get_metrics(self):
+        with self._changed:
+            return self._metrics['heart_rate'], self._metrics['blinks_per_minute']
+
+    def get_blink_count(self):
+        with self._changed:
+            return self._metrics['blink_count']
+
+    def wait_for_update(self, version, timeout=None):
+        """Block until a push newer than `version` (or timeout / wake_subscribers)"""
+        with self._changed:
+            wakeups = self._wakeups
+            self._changed.wait_for(lambda: self._version != version or self._wakeups != wakeups, timeout)
+            return self._version, dict(self._metrics)
+
+    def wake_subscribers(self):
+        with self._changed:
+            self._wakeups += 1
+            self._changed.notify_all()
+
+    def subscribe(self, callback, min_delta=0.5, max_rate=5.0):
+        return MetricSubscription(self, callback, min_delta=min_delta, max_rate=max_rate)
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import numpy as np
+
+from metric_subscription import MetricSubscription
+from session_store import SessionReader
+
+
+class Clock:
+    """Wall-clock time; the default clock for the backend decision loop"""
+    speed = 1.0
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class ScaledClock(Clock):
+    """Virtual time that runs `speed` times faster than the wall clock"""
+
+    def __init__(self, speed=1.0, start=None):
+        self.speed = speed
+        self.start = start if start is not None else time.time()
+        self._origin = time.monotonic()
+
+    def time(self):
+        return self.start + (time.monotonic() - self._origin) * self.speed
+
+    def sleep(self, seconds):
+        time.sleep(seconds / self.speed)
+
+
+class ReplayMonitor:
+    """Plays a recorded session back through the BiometricsMonitor interface.
+
+    Reads the columns written by session_store.SessionRecorder and exposes
+    get_metrics/get_blink_count/subscribe like a live monitor, with the
+    metrics at any moment being the last sample recorded at or before the
+    same offset into the session. Time comes from `clock` (a ScaledClock for
+    1x-100x replay), so code reading the same clock sees consistent timing.
+    With loop=True the session restarts when it runs out.
+    """
+
+    def __init__(self, session_path, clock=None, loop=False):
+        self.session = SessionReader(session_path)
+        self.clock = clock or Clock()
+        self.loop = loop
+
+        self._t = np.asarray(self.session.column('t')) - self.session.meta['started_at']
+        self._hr = np.asarray(self.session.column('hr'), dtype=np.float64)
+        self._blinks_per_minute = np.asarray(self.session.column('blinks_per_minute'), dtype=np.float64)
+        self._blink_count = np.asarray(self.session.column('blink_count'), dtype=np.int64)
+        self.duration = float(self._t[-1]) if len(self._t) else 0.0
+
+        self._changed = threading.Condition()
+        self._wakeups = 0
+        self._started_at = None
+        self._running = False
+
+    def start(self):
+        self._started_at = self.clock.time()
+        self._running = True
+        print(f"ReplayMonitor started ({len(self._t)} samples, {self.duration:.0f} s at {self.clock.speed:g}x)")
+
+    def stop(self):
+        self._running = False
+        self.wake_subscribers()
+        print("ReplayMonitor stopped")
+
+    def _position(self):
+        """(index of the current sample, session offset of the next one or None)"""
+        if self._started_at is None or not len(self._t):
+            return -1, None
+        offset = self.clock.time() - self._started_at
+        laps = 0
+        if self.loop and self.duration > 0:
+            laps, offset = divmod(offset, self.duration)
+        elif offset > self.duration:
+            self._running = False
+        index = int(np.searchsorted(self._t, offset, side='right')) - 1
+        if index + 1 < len(self._t):
+            next_at = self._t[index + 1]
+        else:
+            next_at = self.duration if self.loop else None
+        # Versions must keep increasing across laps
+        return index + int(laps) * len(self._t), (next_at - offset if next_at is not None else None)
+
+    def _metrics(self, index):
+        if index < 0:
+            return {'heart_rate': 0.0, 'blinks_per_minute': 0.0, 'blink_count': 0}
+        i = index % len(self._t)
+        return {
+            'heart_rate': float(self._hr[i]),
+            'blinks_per_minute': float(self._blinks_per_minute[i]),
+            'blink_count': int(self._blink_count[i]),
+        }
+
+    def get_metrics(self):
+        metrics = self._metrics(self._position()[0])
+        return metrics['heart_rate'], metrics['blinks_per_minute']
+
+    def get_blink_count(self):
+        return self._metrics(self._position()[0])['blink_count']
+
+    def wait_for_update(self, version, timeout=None):
+        """Block until playback reaches a sample past `version` (or timeout / wake_subscribers)"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._changed:
+            wakeups = self._wakeups
+            while True:
+                index, until_next = self._position()
+                if index != version or self._wakeups != wakeups:
+                    break
+                waits = [until_next / self.clock.speed] if until_next is not None else []
+                if deadline is not None:
+                    waits.append(deadline - time.monotonic())
+                wait = min(waits) if waits else None
+                if wait is not None and wait <= 0:
+                    break
+                self._changed.wait(wait)
+        return index, self._metrics(index)
+
+    def wake_subscribers(self):
+        with self._changed:
+            self._wakeups += 1
+            self._changed.notify_all()
+
+    def subscribe(self, callback, min_delta=0.5, max_rate=5.0):
+        return MetricSubscription(self, callback, min_delta=min_delta, max_rate=max_rate)
@@ -0,0 +1,145 @@
+import bisect
+import threading
+
+import numpy as np
+
+
+class RollingSeries:
+    """Mean, variance, EWMA and percentiles over the last `window` values.
+
+    Values live in a fixed NumPy ring buffer with running sums, so mean,
+    variance and EWMA are O(1) to read. A sorted copy of the window is kept
+    alongside for percentiles, which makes a push O(window): bisect finds
+    the slots in O(log window), but inserting the new value and removing
+    the evicted one shift the list. The running sums are recomputed from
+    the buffer every `window` pushes to stop floating-point drift.
+    """
+
+    def __init__(self, window=10, alpha=0.5):
+        self.window = window
+        self.alpha = alpha
+        self._values = np.zeros(window, dtype=np.float64)
+        self._sorted = []
+        self._head = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._ewma = None
+        self._pushes = 0
+
+    def __len__(self):
+        return self._count
+
+    def push(self, value):
+        value = float(value)
+        if self._count == self.window:
+            old = self._values[self._head]
+            self._sum -= old
+            self._sum_sq -= old * old
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+        else:
+            self._count += 1
+
+        self._values[self._head] = value
+        self._head = (self._head + 1) % self.window
+        self._sum += value
+        self._sum_sq += value * value
+        bisect.insort(self._sorted, value)
+        self._ewma = value if self._ewma is None else self.alpha * value + (1 - self.alpha) * self._ewma
+
+        self._pushes += 1
+        if self._pushes % self.window == 0:
+            self._resync()
+
+    def clear(self):
+        self._values[:] = 0.0
+        self._sorted = []
+        self._head = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._ewma = None
+
+    @property
+    def mean(self):
+        return self._sum / self._count if self._count else 0.0
+
+    @property
+    def variance(self):
+        if self._count < 2:
+            return 0.0
+        mean = self.mean
+        return max(0.0, (self._sum_sq - self._count * mean * mean) / (self._count - 1))
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+    @property
+    def ewma(self):
+        return self._ewma if self._ewma is not None else 0.0
+
+    def percentile(self, q):
+        """q-th percentile (0-100) of the window, linearly interpolated"""
+        if not self._count:
+            return 0.0
+        rank = q / 100 * (self._count - 1)
+        lower = int(rank)
+        upper = min(lower + 1, self._count - 1)
+        return self._sorted[lower] + (self._sorted[upper] - self._sorted[lower]) * (rank - lower)
+
+    def summary(self):
+        return {
+            'mean': self.mean,
+            'std': self.std,
+            'ewma': self.ewma,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+        }
+
+    def _resync(self):
+        filled = self._values[:self._count] if self._count < self.window else self._values
+        self._sum = float(filled.sum())
+        self._sum_sq = float(np.dot(filled, filled))
+
+
+class BiometricStats:
+    """Rolling heart rate and blink rate statistics shared by every consumer.
+
+    add() is called once per reading; snapshot() returns the statistics
+    for both series, computed once per reading and reused by every reader
+    until the next add().
+    """
+
+    def __init__(self, window=10, ewma_span=3):
+        alpha = 2 / (ewma_span + 1)
+        self.hr = RollingSeries(window, alpha)
+        self.blinks = RollingSeries(window, alpha)
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def __len__(self):
+        return len(self.hr)
+
+    def add(self, hr, blinks):
+        with self._lock:
+            self.hr.push(hr)
+            self.blinks.push(blinks)
+            self._snapshot = None
+
+    def clear(self):
+        with self._lock:
+            self.hr.clear()
+            self.blinks.clear()
+            self._snapshot = None
+
+    def snapshot(self):
+        """{'count', 'hr': {mean, std, ewma, p50, p90}, 'blinks': {...}}"""
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = {
+                    'count': len(self.hr),
+                    'hr': self.hr.summary(),
+                    'blinks': self.blinks.summary(),
+                }
+            return self._snapshot
@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import OrderedDict
+
+from rolling_stats import BiometricStats
+
+
+class ListenerSession:
+    """Everything the backend keeps for one connected client.
+
+    The metric feed (a BiometricsMonitor, ReplayMonitor or RemoteFeed) and
+    the subscriptions and recorder attached to it are owned here and torn
+    down by stop_monitoring(), which hands the feed to `release_monitor`
+    when given (e.g. MonitorPool.release) and otherwise stops it. Memory is
+    bounded: the rolling statistics are fixed-size windows and recordings
+    go to disk.
+    """
+
+    def __init__(self, sid, history_readings=10, ewma_span=3, release_monitor=None):
+        self.sid = sid
+        self.release_monitor = release_monitor
+        self.monitor = None
+        self.monitoring = False
+        self.mood = None
+        self.stats = BiometricStats(window=history_readings, ewma_span=ewma_span)
+        self.recorder = None
+        self.subscriptions = []
+        self.last_music_change = None
+        self.created_at = time.time()
+        self.last_active = time.monotonic()
+
+    def start_monitoring(self, monitor):
+        self.stop_monitoring()
+        self.monitor = monitor
+        self.monitor.start()
+        self.monitoring = True
+        self.mood = None
+        self.stats.clear()
+
+    def stop_monitoring(self):
+        self.monitoring = False
+        for subscription in self.subscriptions:
+            subscription.cancel()
+        self.subscriptions = []
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+        if self.monitor:
+            if self.release_monitor:
+                self.release_monitor(self.monitor)
+            else:
+                self.monitor.stop()
+            self.monitor = None
+
+    def info(self):
+        return {
+            'sid': self.sid,
+            'monitoring': self.monitoring,
+            'feed': type(self.monitor).__name__ if self.monitor else None,
+            'mood': self.mood,
+            'readings': len(self.stats),
+            'recording': self.recorder.session_id if self.recorder else None,
+            'created_at': self.created_at,
+            'idle_seconds': round(time.monotonic() - self.last_active, 1),
+        }
+
+
+class SessionManager:
+    """ListenerSessions keyed by Socket.IO sid.
+
+    Lookups are dict operations on an OrderedDict kept in least-recently-
+    active order, so touching a session is O(1). A background reaper closes
+    sessions with no client activity for `idle_timeout` seconds, and opening
+    a session beyond `max_sessions` closes the least recently active one
+    first. Sessions that are monitoring are never reaped for being idle (a
+    listener just listening sends nothing) and are only evicted when every
+    session is monitoring. `on_close(session, reason)`
+    runs after a session is removed and its monitoring stopped, and
+    `release_monitor` is passed on to every ListenerSession.
+    """
+
+    def __init__(self, idle_timeout=600.0, max_sessions=500, on_close=None, reap_interval=30.0,
+                 history_readings=10, ewma_span=3, release_monitor=None):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.on_close = on_close
+        self.reap_interval = reap_interval
+        self.history_readings = history_readings
+        self.ewma_span = ewma_span
+        self.release_monitor = release_monitor
+
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._stats = {'opened': 0, 'closed': 0, 'evicted_idle': 0, 'evicted_full': 0}
+        self._reaper = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, sid):
+        return self._sessions.get(sid)
+
+    def open(self, sid):
+        """The session for sid, created if needed, marked as just active"""
+        evicted = []
+        with self._lock:
+            session = self._sessions.get(sid)
+            if session is None:
+                while len(self._sessions) >= self.max_sessions:
+                    evicted.append(self._sessions.pop(self._eviction_candidate()))
+                    self._stats['evicted_full'] += 1
+                session = self._sessions[sid] = ListenerSession(sid, self.history_readings, self.ewma_span,
+                                                                self.release_monitor)
+                self._stats['opened'] += 1
+            else:
+                self._sessions.move_to_end(sid)
+            session.last_active = time.monotonic()
+        for old in evicted:
+            self._finish(old, 'evicted')
+        self._start_reaper()
+        return session
+
+    def close(self, sid, reason='closed'):
+        with self._lock:
+            session = self._sessions.pop(sid, None)
+        if session:
+            self._finish(session, reason)
+        return session
+
+    def monitoring(self):
+        """Sessions whose feed is running"""
+        with self._lock:
+            return [session for session in self._sessions.values() if session.monitoring]
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['active'] = len(self._sessions)
+            stats['monitoring'] = sum(1 for session in self._sessions.values() if session.monitoring)
+        return stats
+
+    def reap(self):
+        """Close every session idle for longer than idle_timeout, unless it is monitoring"""
+        cutoff = time.monotonic() - self.idle_timeout
+        idle = []
+        with self._lock:
+            # Oldest activity first, so stop at the first recent one
+            for sid, session in self._sessions.items():
+                if session.last_active > cutoff:
+                    break
+                if not session.monitoring:
+                    idle.append(sid)
+            idle = [self._sessions.pop(sid) for sid in idle]
+            self._stats['evicted_idle'] += len(idle)
+        for session in idle:
+            self._finish(session, 'idle')
+        return len(idle)
+
+    def _eviction_candidate(self):
+        """Least recently active sid, preferring sessions that are not monitoring; call with _lock held"""
+        for sid, session in self._sessions.items():
+            if not session.monitoring:
+                return sid
+        return next(iter(self._sessions))
+
+    def _finish(self, session, reason):
+        try:
+            session.stop_monitoring()
+        except Exception as e:
+            print(f"Error stopping session {session.sid}: {e}")
+        with self._lock:
+            self._stats['closed'] += 1
+        if self.on_close:
+            self.on_close(session, reason)
+
+    def _start_reaper(self):
+        if self._reaper is not None:
+            return
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, daemon=True, name="session-reaper")
+        self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"Error reaping sessions: {e}")
@@ -0,0 +1,227 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+# Fixed-width columns, one memory-mapped file each
+COLUMNS = (
+    ('t', np.float64),                 # wall-clock seconds
+    ('hr', np.float32),                # heart rate, BPM
+    ('blinks_per_minute', np.float32),
+    ('blink_count', np.uint32),        # running total; blink events are where it steps up
+    ('mood', np.uint8),                # index into meta['moods']
+)
+SERIES = ('hr', 'blinks_per_minute', 'blink_count')
+
+
+def lttb(x, y, points):
+    """Largest-Triangle-Three-Buckets downsampling of (x, y) to `points` points"""
+    n = len(x)
+    if points >= n or n < 3:
+        return x, y
+    if points < 3:
+        return x[[0, n - 1]], y[[0, n - 1]]
+
+    # First and last points are kept; points - 2 buckets in between
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        # Pick the point forming the largest triangle with the last kept point and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+def min_max(x, y, points):
+    """Keep the minimum and maximum of each of points // 2 buckets, in time order"""
+    n = len(x)
+    if points >= n:
+        return x, y
+    edges = np.linspace(0, n, max(1, points // 2) + 1).astype(np.int64)
+    keep = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi <= lo:
+            continue
+        segment = y[lo:hi]
+        keep.extend(sorted({lo + int(np.argmin(segment)), lo + int(np.argmax(segment))}))
+    keep = np.asarray(keep, dtype=np.int64)
+    return x[keep], y[keep]
+
+
+DOWNSAMPLERS = {'lttb': lttb, 'minmax': min_max}
+
+
+class SessionRecorder:
+    """Appends biometric samples to memory-mapped columnar files.
+
+    Each session is a directory with one fixed-width file per column plus
+    meta.json (start time, row count, mood names). Files grow in chunks of
+    `chunk_rows`, so appends are O(1) and resident memory stays flat no
+    matter how long the session runs; the OS pages the data out.
+    """
+
+    def __init__(self, directory="sessions", chunk_rows=65536, meta_interval=1.0):
+        self.started_at = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        os.makedirs(directory, exist_ok=True)
+        # Claim the directory atomically; several listeners can start in the same second
+        suffix = 1
+        while True:
+            self.session_id = stamp if suffix == 1 else f"{stamp}-{suffix}"
+            self.path = os.path.join(directory, self.session_id)
+            try:
+                os.mkdir(self.path)
+                break
+            except FileExistsError:
+                suffix += 1
+        self.chunk_rows = chunk_rows
+        self.meta_interval = meta_interval
+
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._capacity = 0
+        self._columns = {}
+        self._moods = ['']
+        self._meta_written = 0.0
+        self._grow()
+        self._write_meta()
+
+    def append(self, hr, blinks_per_minute, blink_count, mood=None, t=None):
+        with self._lock:
+            if self._columns is None:
+                return
+            if self._rows == self._capacity:
+                self._grow()
+            if mood not in self._moods:
+                self._moods.append(mood)
+            row = self._rows
+            self._columns['t'][row] = t if t is not None else time.time()
+            self._columns['hr'][row] = hr
+            self._columns['blinks_per_minute'][row] = blinks_per_minute
+            self._columns['blink_count'][row] = blink_count
+            self._columns['mood'][row] = self._moods.index(mood) if mood else 0
+            self._rows += 1
+            if time.time() - self._meta_written >= self.meta_interval:
+                self._write_meta()
+
+    def close(self):
+        with self._lock:
+            if self._columns is None:
+                return
+            for column in self._columns.values():
+                column.flush()
+            self._write_meta()
+            self._columns = None
+
+    def _grow(self):
+        """Extend every column file by chunk_rows and remap it"""
+        for column in self._columns.values():
+            column.flush()
+        self._capacity += self.chunk_rows
+        for name, dtype in COLUMNS:
+            filename = os.path.join(self.path, f"{name}.bin")
+            with open(filename, 'ab') as f:
+                f.truncate(self._capacity * np.dtype(dtype).itemsize)
+            self._columns[name] = np.memmap(filename, dtype=dtype, mode='r+', shape=(self._capacity,))
+
+    def _write_meta(self):
+        meta = {
+            'id': self.session_id,
+            'started_at': self.started_at,
+            'rows': self._rows,
+            'moods': self._moods,
+            'columns': {name: np.dtype(dtype).str for name, dtype in COLUMNS},
+        }
+        tmp = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, 'meta.json'))
+        self._meta_written = time.time()
+
+
+class SessionReader:
+    """Read-only view of a recorded (or still recording) session"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.rows = self.meta['rows']
+
+    def column(self, name):
+        dtype = dict(COLUMNS)[name]
+        if self.rows == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, f"{name}.bin"), dtype=dtype, mode='r', shape=(self.rows,))
+
+    def _range(self, start, end):
+        """Row slice for [start, end] seconds since the session started"""
+        t = self.column('t')
+        origin = self.meta['started_at']
+        lo = int(np.searchsorted(t, origin + start)) if start is not None else 0
+        hi = int(np.searchsorted(t, origin + end, side='right')) if end is not None else self.rows
+        return lo, hi
+
+    def series(self, metric, start=None, end=None, points=500, method='lttb'):
+        """{'t': [...], 'values': [...]} for one metric, downsampled to at most `points`"""
+        lo, hi = self._range(start, end)
+        t = np.asarray(self.column('t')[lo:hi]) - self.meta['started_at']
+        values = np.asarray(self.column(metric)[lo:hi], dtype=np.float64)
+        t, values = DOWNSAMPLERS[method](t, values, points)
+        return {'t': np.round(t, 3).tolist(), 'values': np.round(values, 2).tolist()}
+
+    def blink_events(self, start=None, end=None):
+        """Seconds since session start at which the blink count went up"""
+        lo, hi = self._range(start, end)
+        counts = self.column('blink_count')[lo:hi].astype(np.int64)
+        steps = np.nonzero(np.diff(counts) > 0)[0] + 1
+        return np.round(self.column('t')[lo:hi][steps] - self.meta['started_at'], 3).tolist()
+
+    def mood_changes(self, start=None, end=None):
+        """[(seconds since start, mood)] wherever the chosen mood changed"""
+        lo, hi = self._range(start, end)
+        moods = self.column('mood')[lo:hi]
+        if len(moods) == 0:
+            return []
+        changes = np.concatenate(([0], np.nonzero(np.diff(moods))[0] + 1))
+        t = self.column('t')[lo:hi]
+        return [(round(float(t[i] - self.meta['started_at']), 3), self.meta['moods'][moods[i]]) for i in changes]
+
+
+def prune_sessions(directory="sessions", keep=50, active=()):
+    """Delete the oldest recordings beyond the newest `keep`, never those in `active`; returns the ids removed"""
+    if not os.path.isdir(directory):
+        return []
+    recorded = [meta['id'] for meta in list_sessions(directory)]
+    removed = []
+    for name in recorded[keep:]:
+        if name in active:
+            continue
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        removed.append(name)
+    return removed
+
+
+def list_sessions(directory="sessions"):
+    """Metadata of every recorded session, newest first"""
+    if not os.path.isdir(directory):
+        return []
+    sessions = []
+    for name in os.listdir(directory):
+        meta_path = os.path.join(directory, name, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                sessions.append(json.load(f))
+    # Ids sort by second only ("...-10" before "...-2"), so order by the recorded start time
+    sessions.sort(key=lambda meta: meta['started_at'], reverse=True)
+    return sessions
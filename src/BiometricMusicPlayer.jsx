@@ -2,6 +2,19 @@ import React, { useState, useEffect, useRef } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import io from 'socket.io-client';
 
+// Apply favorites_delta changes ({op, track}) to the local favorites list
+const applyFavoriteChanges = (favorites, changes) => {
+  let next = favorites;
+  for (const change of changes) {
+    const { name, artist } = change.track;
+    next = next.filter(f => !(f.name === name && f.artist === artist));
+    if (change.op === 'add') {
+      next = [...next, change.track];
+    }
+  }
+  return next;
+};
+
 const MOOD_CONFIG = {
   low_energy: {
     name: "Energy Boost",
@@ -61,6 +74,7 @@ const BiometricMusicPlayer = () => {
   const audioRef = useRef(null);
   const socketRef = useRef(null);
   const queueFetchTimeoutRef = useRef(null);
+  const favoritesSyncRef = useRef(null); // { epoch, version } of the favorites we hold
 
   // WebSocket connection
   useEffect(() => {
@@ -68,7 +82,9 @@ const BiometricMusicPlayer = () => {
     
     socketRef.current = io('http://localhost:5000', {
       transports: ['polling', 'websocket'],
-      reconnection: true
+      reconnection: true,
+      // Sent on every (re)connect so the backend only sends missed favorites changes
+      auth: (cb) => cb({ favorites: favoritesSyncRef.current })
     });
 
     socketRef.current.on('connect', () => {
@@ -93,6 +109,21 @@ const BiometricMusicPlayer = () => {
     socketRef.current.on('music_update', (data) => {
       console.log('🎵 Music update:', data);
       
+      // Mood changed ahead of the song boundary: replace what plays next, keep the current song
+      if (data.upcoming) {
+        const upcomingTracks = (data.tracks || [])
+          .filter(t => t.previewUrl)
+          .map((track, index) => ({
+            ...track,
+            id: `${track.name}-${track.artist}-${index}-${Date.now()}`
+          }));
+        if (upcomingTracks.length > 0) {
+          setCurrentMood(data.mood);
+          setNextTracks(upcomingTracks);
+        }
+        return;
+      }
+      
       // Only accept music_update for initial load or when queue is empty
       if (!data.initial && currentTrack && currentTrack.id !== 'loading' && nextTracks.length > 0) {
         console.log('⏸ Ignoring music_update - using existing queue');
@@ -154,8 +185,28 @@ const BiometricMusicPlayer = () => {
       setIsMonitoring(data.status === 'started');
     });
 
-    socketRef.current.on('favorites_updated', (data) => {
-      setFavorites(data);
+    socketRef.current.on('favorites_snapshot', (data) => {
+      favoritesSyncRef.current = { epoch: data.epoch, version: data.version };
+      setFavorites(data.favorites);
+    });
+
+    socketRef.current.on('favorites_delta', (data) => {
+      const sync = favoritesSyncRef.current;
+      if (!sync || data.epoch !== sync.epoch) {
+        socketRef.current.emit('sync_favorites', sync || {});
+        return;
+      }
+      
+      const changes = data.changes.filter(c => c.version > sync.version);
+      if (changes.length === 0) return;
+      if (changes[0].version !== sync.version + 1) {
+        // Missed a change; ask for everything after what we have
+        socketRef.current.emit('sync_favorites', sync);
+        return;
+      }
+      
+      favoritesSyncRef.current = { epoch: data.epoch, version: changes[changes.length - 1].version };
+      setFavorites(prev => applyFavoriteChanges(prev, changes));
     });
 
     socketRef.current.on('mood_change', (data) => {
@@ -264,6 +315,10 @@ const BiometricMusicPlayer = () => {
   };
 
   const skipTrack = () => {
+    if (socketRef.current && currentTrack && currentTrack.id !== 'loading') {
+      socketRef.current.emit('playback', { action: 'skip', queue_length: nextTracks.length });
+    }
+    
     // Check if we need to fetch more songs BEFORE we skip
     if (nextTracks.length <= 2) {
       console.log('⚠️ Queue getting low, fetching more...');
@@ -374,6 +429,24 @@ const BiometricMusicPlayer = () => {
       }
     };
 
+    // Report playback so the backend can time the next mood decision to the real song end
+    const reportPlayback = (action) => {
+      if (!socketRef.current || !currentTrack || currentTrack.id === 'loading') return;
+      socketRef.current.emit('playback', {
+        action,
+        name: currentTrack.name,
+        artist: currentTrack.artist,
+        position: audio.currentTime,
+        duration: audio.duration && !isNaN(audio.duration) ? audio.duration : (currentTrack.duration || 30),
+        queue_length: nextTracks.length
+      });
+    };
+    const handlePlay = () => reportPlayback('play');
+    const handlePause = () => {
+      if (!audio.ended) reportPlayback('pause');
+    };
+    const handleSeeked = () => reportPlayback('seek');
+
     const handleEnded = () => {
       console.log('🎵 Song ended');
       
@@ -402,10 +475,16 @@ const BiometricMusicPlayer = () => {
 
     audio.addEventListener('timeupdate', updateProgress);
     audio.addEventListener('ended', handleEnded);
+    audio.addEventListener('playing', handlePlay);
+    audio.addEventListener('pause', handlePause);
+    audio.addEventListener('seeked', handleSeeked);
 
     return () => {
       audio.removeEventListener('timeupdate', updateProgress);
       audio.removeEventListener('ended', handleEnded);
+      audio.removeEventListener('playing', handlePlay);
+      audio.removeEventListener('pause', handlePause);
+      audio.removeEventListener('seeked', handleSeeked);
     };
   }, [nextTracks, currentTrack, repeatMode, currentMood, manualMood]);
 
@@ -0,0 +1,199 @@
+import bisect
+import threading
+import time
+
+import numpy as np
+
+# Latency bucket upper bounds in seconds (Prometheus "le" values)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Timer:
+    """Context manager that observes the elapsed time into a histogram"""
+    __slots__ = ('_histogram', '_start')
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts live in a preallocated NumPy array"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.bounds = tuple(buckets)
+        self._counts = np.zeros(len(self.bounds) + 1, dtype=np.int64)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def time(self):
+        return _Timer(self)
+
+    def snapshot(self):
+        with self._lock:
+            counts = self._counts.copy()
+            total = self._sum
+        count = int(counts.sum())
+        return {
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else 0.0,
+            'p50': self._quantile(counts, 0.50),
+            'p95': self._quantile(counts, 0.95),
+            'p99': self._quantile(counts, 0.99),
+            'cumulative': np.cumsum(counts).tolist(),
+        }
+
+    def _quantile(self, counts, q):
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        count = counts.sum()
+        if count == 0:
+            return 0.0
+        cumulative = np.cumsum(counts)
+        rank = q * count
+        i = int(np.searchsorted(cumulative, rank))
+        if i >= len(self.bounds):
+            return self.bounds[-1]
+        lower = self.bounds[i - 1] if i > 0 else 0.0
+        below = cumulative[i - 1] if i > 0 else 0
+        in_bucket = counts[i]
+        fraction = (rank - below) / in_bucket if in_bucket else 0.0
+        return lower + (self.bounds[i] - lower) * fraction
+
+
+class Counter:
+    """Monotonic counter"""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def snapshot(self):
+        return {'value': self._value}
+
+
+class Gauge:
+    """Point-in-time value, either set directly or read from a callback at scrape time"""
+
+    def __init__(self, fn=None):
+        self._fn = fn
+        self._value = 0.0
+
+    def set(self, value):
+        self._value = value
+
+    def snapshot(self):
+        value = self._value
+        if self._fn is not None:
+            try:
+                value = self._fn()
+            except Exception:
+                value = 0.0
+        return {'value': float(value or 0.0)}
+
+
+class MetricFamily:
+    """All series of one metric name, one child per label set"""
+
+    def __init__(self, name, help_text, kind, factory):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(sorted(labels.items()))
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._factory())
+        return child
+
+    def series(self):
+        return [(dict(key), child) for key, child in list(self._children.items())]
+
+
+class Registry:
+    """Process-wide collection of metrics, rendered as JSON or Prometheus text"""
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name, help_text, kind, factory):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(name, help_text, kind, factory)
+            return family
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._family(name, help_text, 'histogram', lambda: Histogram(buckets))
+
+    def counter(self, name, help_text):
+        return self._family(name, help_text, 'counter', Counter)
+
+    def gauge(self, name, help_text, fn=None, **labels):
+        family = self._family(name, help_text, 'gauge', Gauge)
+        gauge = family.labels(**labels)
+        if fn is not None:
+            gauge._fn = fn
+        return gauge
+
+    def to_json(self):
+        result = {}
+        for name, family in sorted(self._families.items()):
+            series = []
+            for labels, child in family.series():
+                snapshot = child.snapshot()
+                snapshot.pop('cumulative', None)
+                series.append({'labels': labels, **snapshot})
+            result[name] = {'type': family.kind, 'help': family.help, 'series': series}
+        return result
+
+    def to_prometheus(self):
+        lines = []
+        for name, family in sorted(self._families.items()):
+            lines.append(f"# HELP {name} {family.help}")
+            lines.append(f"# TYPE {name} {family.kind}")
+            for labels, child in family.series():
+                snapshot = child.snapshot()
+                if family.kind == 'histogram':
+                    bounds = [str(b) for b in child.bounds] + ['+Inf']
+                    for le, cumulative in zip(bounds, snapshot['cumulative']):
+                        lines.append(f"{name}_bucket{_format_labels(labels, le=le)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {snapshot['sum']}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {snapshot['count']}")
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {snapshot['value']}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+REGISTRY = Registry()
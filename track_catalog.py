@@ -0,0 +1,169 @@
+import hashlib
+import math
+import threading
+import time
+
+import numpy as np
+
+from jobs import JobExecutor
+from telemetry import REGISTRY
+
+DUPLICATES_SKIPPED = REGISTRY.counter('catalog_duplicates_skipped_total', 'Tracks withheld because a session had already seen them')
+
+
+def track_key(track):
+    return f"{track['name']}\x1f{track['artist']}".lower()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, bits packed in a NumPy array"""
+
+    def __init__(self, capacity=2000, error_rate=0.01):
+        self.num_bits = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class TrackCatalog:
+    """Per-tag pagination cursor over Last.fm top tracks plus per-session seen-sets.
+
+    `fetch_page(tag, page, timeout=None)` returns {'tracks': [{'name', 'artist'}], 'total_pages': n}.
+    Each call to next_candidates hands out the next unvisited tracks for a tag,
+    walking pages in order and wrapping after `max_pages`. Whenever the cursor
+    enters a page, the following page is fetched and handed to `warm(tracks)`
+    on a small pool of its own (`warm_workers` threads, at most `warm_queue`
+    pages waiting, extra pages dropped), so warm-up never competes with
+    foreground lookups for their workers.
+    """
+
+    def __init__(self, fetch_page, warm=None, max_pages=10, seen_capacity=2000, warm_workers=1, warm_queue=4):
+        self.fetch_page = fetch_page
+        self.warm = warm
+        self.max_pages = max_pages
+        self.seen_capacity = seen_capacity
+
+        self._warmer = JobExecutor(workers=warm_workers, max_queue=warm_queue, name="catalog-warm")
+        self._warming = set()  # (tag, page) queued or running on the warmer
+
+        self._lock = threading.Lock()
+        self._tag_locks = {}
+        self._cursors = {}  # tag -> (page, offset)
+        self._total_pages = {}
+        self._seen = {}  # session id -> BloomFilter
+
+    def next_candidates(self, tag, count, deadline_at=None):
+        """Next `count` not-yet-handed-out tracks for tag, advancing its cursor.
+
+        With deadline_at (a time.monotonic() value) each page fetch gets only
+        the time left, and no page is fetched once it has passed.
+        """
+        with self._lock:
+            tag_lock = self._tag_locks.setdefault(tag, threading.Lock())
+
+        # One caller per tag at a time so concurrent refills never share a slice
+        if not tag_lock.acquire(timeout=-1 if deadline_at is None else max(0, deadline_at - time.monotonic())):
+            return []
+        try:
+            candidates = []
+            pages_tried = 0
+            page, offset = self._cursors.get(tag, (1, 0))
+            while len(candidates) < count and pages_tried <= self.max_pages:
+                timeout = None
+                if deadline_at is not None:
+                    timeout = deadline_at - time.monotonic()
+                    if timeout <= 0:
+                        break
+                result = self.fetch_page(tag, page, timeout=timeout)
+                self._total_pages[tag] = result.get('total_pages') or self.max_pages
+                tracks = result['tracks']
+                if offset == 0:
+                    self._warm_page(tag, page + 1)
+
+                take = tracks[offset:offset + count - len(candidates)]
+                candidates.extend(take)
+                offset += len(take)
+                if offset >= len(tracks):
+                    page, offset = self._next_page(tag, page), 0
+                    pages_tried += 1
+            with self._lock:
+                self._cursors[tag] = (page, offset)
+            return candidates
+        finally:
+            tag_lock.release()
+
+    def filter_unseen(self, session_id, tracks):
+        """Tracks this session has not been sent yet; marks the returned ones as seen"""
+        if session_id is None:
+            return tracks
+        with self._lock:
+            seen = self._seen.get(session_id)
+            if seen is None:
+                seen = self._seen[session_id] = BloomFilter(self.seen_capacity)
+            fresh = []
+            for track in tracks:
+                key = track_key(track)
+                if key in seen:
+                    continue
+                seen.add(key)
+                fresh.append(track)
+        if len(fresh) < len(tracks):
+            DUPLICATES_SKIPPED.labels().inc(len(tracks) - len(fresh))
+        return fresh
+
+    def has_seen(self, session_id, track):
+        with self._lock:
+            seen = self._seen.get(session_id)
+            return seen is not None and track_key(track) in seen
+
+    def forget_session(self, session_id):
+        with self._lock:
+            self._seen.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'cursors': {tag: {'page': page, 'offset': offset} for tag, (page, offset) in self._cursors.items()},
+                'sessions': len(self._seen),
+            }
+
+    def _next_page(self, tag, page):
+        total = min(self._total_pages.get(tag) or self.max_pages, self.max_pages)
+        return page + 1 if page < total else 1
+
+    def _warm_page(self, tag, page):
+        """Queue the following page for warm-up, unless it is already queued"""
+        if self.warm is None or page > min(self._total_pages.get(tag) or self.max_pages, self.max_pages):
+            return
+        with self._lock:
+            if (tag, page) in self._warming:
+                return
+            self._warming.add((tag, page))
+        if not self._warmer.submit(tag, self._warm, page):
+            with self._lock:
+                self._warming.discard((tag, page))
+
+    def _warm(self, tag, page):
+        """Fetch and resolve one page; runs on the warmer"""
+        try:
+            result = self.fetch_page(tag, page)
+            if result['tracks']:
+                self.warm(result['tracks'])
+        except Exception as e:
+            print(f"Catalog warm-up for {tag} page {page} failed: {e}")
+        finally:
+            with self._lock:
+                self._warming.discard((tag, page))